@@ -0,0 +1,278 @@
+##############################################################################
+#
+# Copyright (c) 2006 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Benchmarks of buildout internals
+
+Synthetic profiles are generated in a temporary directory, optionally
+served by a local HTTP server, and the time taken by the main steps of a
+buildout run that don't install anything is measured.  Run with::
+
+  python -m zc.buildout.benchmark [options] [benchmark ...]
+
+Use ``--json`` to get results suitable for regression tracking.
+"""
+
+import json
+import logging
+import optparse
+import os
+import pkg_resources
+import platform
+import shutil
+import tempfile
+import time
+
+import zc.buildout.buildout
+
+
+class Profile:
+    """A synthetic buildout profile
+
+    The options of section ``i`` refer to the options of section
+    ``i // 2``, so that values are expanded through chains of
+    ``log2(sections)`` references.  ``density`` is the fraction of the
+    options of each section that use a substitution.  Sections are
+    spread over a chain of ``extends`` extended files, and ``develop``
+    develop eggs are listed in the buildout section.
+    """
+
+    def __init__(self, directory, sections=500, options=20, extends=1,
+                 density=1.0, develop=0, url=None):
+        self.directory = directory
+        self.sections = sections
+        self.options = options
+        self.extends = extends
+        self.density = density
+        self.develop = develop
+        self.url = url
+        self.parts = ['s%d' % i for i in range(sections)]
+        self.develop_paths = []
+        self._write()
+
+    def info(self):
+        return dict(sections=self.sections, options=self.options,
+                    extends=self.extends, density=self.density,
+                    develop=self.develop, remote=bool(self.url))
+
+    def _write(self):
+        os.mkdir(os.path.join(self.directory, 'eggs'))
+        substituted = int(round(self.options * self.density))
+        files = [[] for i in range(self.extends + 1)]
+        for i in range(self.sections):
+            lines = files[i % len(files)]
+            lines.append('[s%d]' % i)
+            lines.append('recipe = zc.buildout:debug')
+            for j in range(self.options):
+                if i and j < substituted:
+                    lines.append('o%d = ${s%d:o%d}/${:name}/$${literal} %d'
+                                 % (j, i // 2, j, i))
+                else:
+                    lines.append('o%d = %d %d' % (j, i, j))
+            lines.append('name = s%d' % i)
+            lines.append('')
+
+        for i in range(self.develop):
+            path = os.path.join(self.directory, 'develop', 'd%d' % i)
+            os.makedirs(os.path.join(path, 'd%d' % i))
+            with open(os.path.join(path, 'setup.py'), 'w') as f:
+                f.write("from setuptools import setup\n"
+                        "setup(name='d%d', packages=['d%d'])\n" % (i, i))
+            for j in range(10):
+                with open(os.path.join(path, 'd%d' % i, 'm%d.py' % j),
+                          'w') as f:
+                    f.write('x = %r\n' % ('x' * 1000))
+            self.develop_paths.append(path)
+
+        base = self.url or ''
+        for i, lines in enumerate(files):
+            if i == 0:
+                name = 'buildout.cfg'
+                header = ['[buildout]', 'parts = ' + ' '.join(self.parts)]
+                if self.develop_paths:
+                    header.append('develop = ' + ' '.join(self.develop_paths))
+            else:
+                name = 'base%d.cfg' % i
+                header = ['[buildout]']
+            if i < self.extends:
+                header.append('extends = %sbase%d.cfg'
+                              % (base if i == 0 else '', i + 1))
+            with open(os.path.join(self.directory, name), 'w') as f:
+                f.write('\n'.join(header + [''] + lines))
+        self.config = os.path.join(self.directory, 'buildout.cfg')
+
+    def buildout(self):
+        return zc.buildout.buildout.Buildout(
+            self.config, [], user_defaults=False)
+
+
+def _initialized(profile):
+    buildout = profile.buildout()
+    for name in profile.parts:
+        buildout[name]
+    return buildout
+
+
+def bench_load(profile):
+    start = time.time()
+    profile.buildout()
+    return time.time() - start
+
+def bench_open(profile):
+    zc.buildout.buildout._open_download_cache.clear()
+    options = zc.buildout.buildout._buildout_default_options.copy()
+    start = time.time()
+    zc.buildout.buildout._open(
+        profile.directory, profile.config, [], options, {}, set())
+    return time.time() - start
+
+def bench_initialize(profile):
+    buildout = profile.buildout()
+    start = time.time()
+    for name in profile.parts:
+        buildout[name]
+    return time.time() - start
+
+def bench_signatures(profile):
+    buildout = _initialized(profile)
+    start = time.time()
+    buildout._compute_part_signatures(profile.parts)
+    return time.time() - start
+
+def bench_save(profile):
+    buildout = _initialized(profile)
+    buildout._compute_part_signatures(profile.parts)
+    installed = dict((name, buildout[name]) for name in profile.parts)
+    for options in installed.values():
+        options['__buildout_installed__'] = ''
+    installed['buildout'] = dict(parts=' '.join(profile.parts),
+                                 installed_develop_eggs='')
+    buildout.installed_part_options = installed
+    path = buildout['buildout']['installed']
+    if os.path.exists(path):
+        os.remove(path)
+    start = time.time()
+    buildout._save_installed_options()
+    return time.time() - start
+
+def bench_develop_hash(profile):
+    zc.buildout.buildout._dir_hashes.clear()
+    start = time.time()
+    for path in profile.develop_paths:
+        zc.buildout.buildout._dir_hash(path)
+    return time.time() - start
+
+benchmarks = [
+    ('load', bench_load),
+    ('open', bench_open),
+    ('initialize', bench_initialize),
+    ('signatures', bench_signatures),
+    ('save', bench_save),
+    ('develop-hash', bench_develop_hash),
+    ]
+
+
+def run(profile, names=None, repeat=5):
+    """Run the benchmarks and return a dictionary of results
+    """
+    results = []
+    for name, bench in benchmarks:
+        if names and name not in names:
+            continue
+        zc.buildout.buildout.Options._compiled.clear()
+        timings = [bench(profile) for i in range(repeat)]
+        results.append(dict(name=name, timings=timings,
+                            first=timings[0], best=min(timings),
+                            mean=sum(timings) / len(timings)))
+    return dict(
+        profile=profile.info(),
+        python=platform.python_version(),
+        version=pkg_resources.working_set.find(
+            pkg_resources.Requirement.parse('zc.buildout')).version,
+        time=time.time(),
+        benchmarks=results,
+        )
+
+
+def main(args=None):
+    parser = optparse.OptionParser(
+        usage="%prog [options] [benchmark ...]",
+        description="Time buildout on a synthetic profile. Benchmarks: "
+        + ', '.join(name for name, _ in benchmarks) + '.')
+    parser.add_option('--sections', type='int', default=500,
+                      help="number of sections (default: %default)")
+    parser.add_option('--options', type='int', default=20,
+                      help="number of options per section (default: %default)")
+    parser.add_option('--extends', type='int', default=1,
+                      help="depth of extended files (default: %default)")
+    parser.add_option('--density', type='float', default=1.0,
+                      help="fraction of options using substitutions"
+                      " (default: %default)")
+    parser.add_option('--develop', type='int', default=0,
+                      help="number of develop eggs (default: %default)")
+    parser.add_option('--remote', action='store_true', default=False,
+                      help="serve extended files with a local HTTP server")
+    parser.add_option('--repeat', type='int', default=5,
+                      help="number of runs (default: %default)")
+    parser.add_option('--json', metavar='FILE',
+                      help="write results as JSON to FILE ('-' for stdout)")
+    opts, args = parser.parse_args(args)
+    known = [name for name, _ in benchmarks]
+    for name in args:
+        if name not in known:
+            parser.error("unknown benchmark: %s" % name)
+    if opts.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    directory = tempfile.mkdtemp('benchmark')
+    here = os.getcwd()
+    url = None
+    logger = logging.getLogger('zc.buildout')
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        os.chdir(directory)
+        if opts.remote:
+            import zc.buildout.testing
+            port, thread = zc.buildout.testing._start_server(directory)
+            url = 'http://localhost:%s/' % port
+        try:
+            profile = Profile(directory, opts.sections, opts.options,
+                              opts.extends, opts.density, opts.develop, url)
+            results = run(profile, args, opts.repeat)
+        finally:
+            if url:
+                zc.buildout.testing.stop_server(url, thread)
+    finally:
+        logger.setLevel(level)
+        os.chdir(here)
+        shutil.rmtree(directory)
+
+    if opts.json:
+        data = json.dumps(results, indent=2, sort_keys=True)
+        if opts.json == '-':
+            print(data)
+        else:
+            with open(opts.json, 'w') as f:
+                f.write(data + '\n')
+        return
+
+    print("profile: " + ', '.join('%s=%s' % item for item in
+                                  sorted(results['profile'].items())))
+    for result in results['benchmarks']:
+        print("%-12s first: %.4fs  best: %.4fs  mean: %.4fs"
+              % (result['name'], result['first'],
+                 result['best'], result['mean']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,722 @@
+##############################################################################
+#
+# Copyright (c) 2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Buildout download infrastructure"""
+
+try:
+    from hashlib import md5
+except ImportError:
+    from md5 import new as md5
+
+import hashlib
+
+try:
+    # Python 3
+    from urllib.request import FancyURLopener, URLopener, urlopen
+    from urllib.error import HTTPError
+    from urllib.parse import urlparse
+    from urllib import request
+
+    class PatchedURLopener(FancyURLopener):
+        http_error_default = URLopener.http_error_default
+
+    request._urlopener = PatchedURLopener()  # Ook! Monkey patch!
+
+    def _urlopen(url, headers={}):
+        return zc.buildout.httpclient.urlopen(
+            request.Request(url, headers=headers), urlopen)
+
+except ImportError:
+    # Python 2
+    import base64
+    from urlparse import urlparse
+    from urlparse import urlunparse
+    import urllib2
+    from urllib2 import HTTPError
+
+    def _urlopen(url, headers={}):
+        """Work around Python issue 24599 includig basic auth support
+        """
+        scheme, netloc, path, params, query, frag = urlparse(url)
+        auth, host = urllib2.splituser(netloc)
+        if auth:
+            url = urlunparse((scheme, host, path, params, query, frag))
+            req = urllib2.Request(url, headers=headers)
+            base64string = base64.encodestring(auth)[:-1]
+            basic = "Basic " + base64string
+            req.add_header("Authorization", basic)
+        else:
+            req = urllib2.Request(url, headers=headers)
+        return zc.buildout.httpclient.urlopen(req, urllib2.urlopen)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from zc.buildout.cache import _read_digest
+from zc.buildout.easy_install import realpath
+from zc.buildout.timing import phase
+import logging
+import multiprocessing.pool
+import os
+import os.path
+import re
+import shutil
+import sys
+import tempfile
+import zc.buildout
+import zc.buildout.cache
+import zc.buildout.httpclient
+
+
+class ChecksumError(zc.buildout.UserError):
+    pass
+
+def urlretrieve(url, tmp_path, checksum=None):
+    """Like urllib's urlretrieve, updating checksum with the data
+    """
+    url_obj = _urlopen(url)
+    try:
+        _copy_response(url_obj, tmp_path, checksum)
+        return tmp_path, url_obj.info()
+    finally:
+        url_obj.close()
+
+def _copy_response(url_obj, tmp_path, checksum):
+    """Write a response to a file in chunks, updating checksum with them
+    """
+    with open(tmp_path, 'wb') as fp:
+        _copy_to(url_obj, fp, checksum)
+
+def _copy_to(url_obj, fp, checksum):
+    size = 0
+    for chunk in iter(lambda: url_obj.read(1<<16), b''):
+        fp.write(chunk)
+        if checksum is not None:
+            checksum.update(chunk)
+        size += len(chunk)
+    length = url_obj.info().get('Content-Length')
+    if length is not None and size < int(length):
+        raise IOError("retrieval incomplete: got only %i out of %i bytes"
+                      % (size, int(length)))
+
+def _validator(headers):
+    """Return the validator of a file usable in If-Range, if any
+    """
+    etag = headers.get('ETag')
+    if etag and etag.startswith('W/'):
+        etag = None # Weak validators can't be used in If-Range
+    return etag or headers.get('Last-Modified')
+
+# Files are split into segments of at least this size.
+_min_segment_size = 1 << 20
+
+def segmentedretrieve(url, tmp_path, segments, checksum=None):
+    """Like urlretrieve, fetching byte ranges of the file concurrently
+
+    The file is split into at most the given number of segments, which
+    are written in place in a preallocated file, and checksum is updated
+    once the file is complete.  A single stream is used if the server
+    doesn't support range requests or gives no validator of the file.
+    """
+    url_obj = _urlopen(url, {'Range': 'bytes=0-'})
+    try:
+        headers = url_obj.info()
+        match = re.match(r'bytes 0-\d+/(\d+)$',
+                         headers.get('Content-Range') or '')
+        size = int(match.group(1)) if match else 0
+        count = min(segments, size // _min_segment_size)
+        validator = _validator(headers)
+        if (getattr(url_obj, 'code', None) != 206 or count < 2
+            or not validator):
+            _copy_response(url_obj, tmp_path, checksum)
+            return tmp_path, headers
+    finally:
+        # Closed before fetching the segments, so that its connection
+        # is available to them if connections per host are limited.
+        url_obj.close()
+
+    with open(tmp_path, 'wb') as fp:
+        fp.truncate(size)
+
+    def fetch(i):
+        start = size * i // count
+        end = size * (i + 1) // count
+        segment = _urlopen(url, {
+            'Range': 'bytes=%d-%d' % (start, end - 1),
+            'If-Range': validator})
+        try:
+            if not (getattr(segment, 'code', None) == 206 and
+                    segment.info().get('Content-Range') ==
+                    'bytes %d-%d/%d' % (start, end - 1, size)):
+                raise IOError("%s changed during the download" % url)
+            with open(tmp_path, 'r+b') as fp:
+                fp.seek(start)
+                remaining = end - start
+                while remaining:
+                    chunk = segment.read(min(remaining, 1<<16))
+                    if not chunk:
+                        raise IOError(
+                            "retrieval incomplete: got only %i out of %i"
+                            " bytes" % (size - remaining, size))
+                    fp.write(chunk)
+                    remaining -= len(chunk)
+        finally:
+            segment.close()
+
+    pool = multiprocessing.pool.ThreadPool(count)
+    try:
+        pool.map(fetch, range(count))
+    finally:
+        pool.close()
+        pool.join()
+    if checksum is not None:
+        with open(tmp_path, 'rb') as fp:
+            for chunk in iter(lambda: fp.read(1<<16), b''):
+                checksum.update(chunk)
+    return tmp_path, headers
+
+def resumeretrieve(url, tmp_path, partial, checksum=None):
+    """Like urlretrieve, resuming the download kept in partial, if any
+
+    The data are written to partial, then moved to tmp_path, which must be
+    on the same file system, once complete.  If the download fails, they
+    are kept if the server gave a validator of the file (ETag or
+    Last-Modified header), which is saved in ``partial + '.info'``, and
+    the next download asks for the rest of the file with a Range request.
+    The data kept are discarded if the server gives neither the rest of
+    the same file nor the whole file.  If partial is being downloaded by
+    another process, this is like urlretrieve.
+    """
+    info_path = partial + '.info'
+    fd = os.open(partial, os.O_RDWR | os.O_CREAT, 0o666)
+    with os.fdopen(fd, 'r+b') as fp:
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except (IOError, OSError):
+                return urlretrieve(url, tmp_path, checksum)
+            if not os.fstat(fd).st_nlink:
+                # Removed from the cache by a collection meanwhile.
+                return urlretrieve(url, tmp_path, checksum)
+        try:
+            with open(info_path) as f:
+                validator = f.read().strip()
+        except IOError:
+            validator = None
+        size = os.fstat(fd).st_size if validator else 0
+        discard = False
+        try:
+            url_obj = None
+            if size:
+                try:
+                    url_obj = _urlopen(url, {'Range': 'bytes=%d-' % size,
+                                             'If-Range': validator})
+                except HTTPError:
+                    err = sys.exc_info()[1]
+                    if err.code != 416:
+                        # The data kept can't be used anymore.
+                        discard = True
+                        raise
+                    # Not satisfiable, the file changed.
+                    if getattr(err, 'fp', None) is not None:
+                        err.close()
+                    size = 0
+            if size:
+                headers = url_obj.info()
+                code = getattr(url_obj, 'code', None)
+                if not (code == 206 and
+                        (headers.get('Content-Range') or '').startswith(
+                            'bytes %d-' % size) and
+                        _validator(headers) == validator):
+                    size = 0
+                    if code != 200:
+                        # Not the rest of the same file, nor all of it.
+                        url_obj.close()
+                        url_obj = None
+            if url_obj is None:
+                url_obj = _urlopen(url)
+            try:
+                headers = url_obj.info()
+                if size and checksum is not None:
+                    for chunk in iter(lambda: fp.read(1<<16), b''):
+                        checksum.update(chunk)
+                fp.seek(size)
+                fp.truncate()
+                validator = _validator(headers)
+                if validator:
+                    with open(info_path, 'w') as f:
+                        f.write(validator)
+                elif os.path.exists(info_path):
+                    os.remove(info_path)
+                _copy_to(url_obj, fp, checksum)
+            finally:
+                url_obj.close()
+        except Exception:
+            fp.flush()
+            if discard or not (os.path.exists(info_path)
+                               and os.fstat(fd).st_size):
+                remove(info_path)
+                os.remove(partial)
+            raise
+        fp.flush()
+        remove(info_path)
+        os.rename(partial, tmp_path)
+    return tmp_path, headers
+
+def download_segments(options):
+    """Return the number of segments set by the download-segments option
+    """
+    from zc.buildout.buildout import _positive_int_option
+    return _positive_int_option(options, 'download-segments')
+
+class Download(object):
+    """Configurable download utility.
+
+    Handles the download cache and offline mode.
+
+    Download(options=None, cache=None, namespace=None,
+             offline=False, fallback=False, hash_name=False, logger=None)
+
+    options: mapping of buildout options (e.g. a ``buildout`` config section)
+    cache: path to the download cache (excluding namespaces)
+    namespace: namespace directory to use inside the cache
+    offline: whether to operate in offline mode
+    fallback: whether to use the cache as a fallback (try downloading first)
+    hash_name: whether to use a hash of the URL as cache file name
+    logger: an optional logger to receive download-related log messages
+
+    """
+
+    def __init__(self, options={}, cache=-1, namespace=None,
+                 offline=-1, fallback=False, hash_name=False, logger=None):
+        self.directory = options.get('directory', '')
+        self.cache = cache
+        if cache == -1:
+            self.cache = options.get('download-cache')
+        self.namespace = namespace
+        self.offline = offline
+        if offline == -1:
+            self.offline = (options.get('offline') == 'true'
+                            or options.get('install-from-cache') == 'true')
+        self.fallback = fallback
+        self.hash_name = hash_name
+        self.segments = download_segments(options)
+        self.cache_layout = options.get('download-cache-layout', 'name')
+        self.logger = logger or logging.getLogger('zc.buildout')
+
+    @property
+    def download_cache(self):
+        if self.cache is not None:
+            return realpath(os.path.join(self.directory, self.cache))
+
+    @property
+    def cache_dir(self):
+        if self.download_cache is not None:
+            return os.path.join(self.download_cache, self.namespace or '')
+
+    def __call__(self, url, md5sum=None, path=None):
+        """Download a file according to the utility's configuration.
+
+        url: URL to download
+        md5sum: checksum to match, see parse_checksum; by default, a
+                ``md5=``, ``sha256=`` or ``sha512=`` URL fragment is used
+        path: where to place the downloaded file
+
+        Returns the path to the downloaded file.
+
+        """
+        if md5sum is None:
+            md5sum = _checksum_from_url(url)
+        with phase('download', 'download', url=url):
+            if self.cache:
+                local_path, is_temp = self.download_cached(url, md5sum)
+            else:
+                local_path, is_temp = self.download(url, md5sum, path)
+
+        return locate_at(local_path, path), is_temp
+
+    def download_cached(self, url, md5sum=None):
+        """Download a file from a URL using the cache.
+
+        This method assumes that the cache has been configured. Optionally, it
+        raises a ChecksumError if a cached copy of a file has an MD5 mismatch,
+        but will not remove the copy in that case.
+
+        """
+        if not os.path.exists(self.download_cache):
+            raise zc.buildout.UserError(
+                'The directory:\n'
+                '%r\n'
+                "to be used as a download cache doesn't exist.\n"
+                % self.download_cache)
+        if self.cache_layout == 'content':
+            return self._download_stored(url, md5sum)
+        cache_dir = self.cache_dir
+        if not os.path.exists(cache_dir):
+            os.mkdir(cache_dir)
+        cache_key = self.filename(url)
+        cached_path = os.path.join(cache_dir, cache_key)
+
+        self.logger.debug('Searching cache at %s' % cache_dir)
+        if os.path.exists(cached_path):
+            is_temp = False
+            if self.fallback:
+                try:
+                    _, is_temp = self.download(url, md5sum, cached_path)
+                except ChecksumError:
+                    raise
+                except Exception:
+                    pass
+
+            if not check_md5sum(cached_path, md5sum):
+                raise ChecksumError(
+                    '%s checksum mismatch for cached download '
+                    'from %r at %r' % (_checksum_label(md5sum),
+                                       url, cached_path))
+            zc.buildout.cache.touch(cached_path)
+            self.logger.debug('Using cache file %s' % cached_path)
+        else:
+            self.logger.debug('Cache miss; will cache %s as %s' %
+                              (url, cached_path))
+            _, is_temp = self.download(url, md5sum, cached_path, resume=True)
+
+        return cached_path, is_temp
+
+    def download(self, url, md5sum=None, path=None, resume=False):
+        """Download a file from a URL to a given or temporary path.
+
+        An online resource is always downloaded to a temporary file and moved
+        to the specified path only after the download is complete and the
+        checksum (if given) matches. If path is None, the temporary file is
+        returned and the client code is responsible for cleaning it up.
+
+        With resume, a failed download is kept next to path, and resumed
+        by the next download of the same URL to the same path (see
+        resumeretrieve).
+
+        """
+        return self._download(url, md5sum, path,
+                              path + '.part' if resume and path else None)
+
+    def _download(self, url, md5sum, path, partial, checksums=()):
+        """Like download, resuming the download kept in partial if given
+
+        The hash objects in checksums are updated with the content of the
+        file, while it's downloaded if possible.
+
+        """
+        # Make sure the drive letter in windows-style file paths isn't
+        # interpreted as a URL scheme.
+        if re.match(r"^[A-Za-z]:\\", url):
+            url = 'file:' + url
+
+        parsed_url = urlparse(url, 'file')
+        url_scheme, _, url_path = parsed_url[:3]
+        if url_scheme == 'file':
+            self.logger.debug('Using local resource %s' % url)
+            if not check_md5sum(url_path, md5sum):
+                raise ChecksumError(
+                    '%s checksum mismatch for local resource at %r.' %
+                    (_checksum_label(md5sum), url_path))
+            path = locate_at(url_path, path)
+            _hash_file(path, checksums)
+            return path, False
+
+        if self.offline:
+            raise zc.buildout.UserError(
+                "Couldn't download %r in offline mode." % url)
+
+        self.logger.info('Downloading %s' % url)
+        handle, tmp_path = tempfile.mkstemp(
+            prefix='buildout-',
+            dir=os.path.dirname(partial) if partial else None)
+        os.close(handle)
+        try:
+            from .buildout import network_cache_parameter_dict as nc
+            if not download_network_cached(
+                nc.get('download-dir-url'),
+                nc.get('download-cache-url'),
+                tmp_path, url, self.logger,
+                nc.get('signature-certificate-list'), md5sum):
+                # Download from original url if not cached or md5sum doesn't match.
+                # The checksum is computed while the file is written.
+                checksum = expected = None
+                if md5sum is not None:
+                    name, expected = parse_checksum(md5sum)
+                    checksum = hashlib.new(name)
+                hashes = [checksum] if checksum is not None else []
+                hashes.extend(checksums)
+                hashes = _Checksums(hashes) if hashes else None
+                if self.segments > 1:
+                    tmp_path, headers = segmentedretrieve(
+                        url, tmp_path, self.segments, hashes)
+                elif partial:
+                    tmp_path, headers = resumeretrieve(
+                        url, tmp_path, partial, hashes)
+                else:
+                    tmp_path, headers = urlretrieve(url, tmp_path, hashes)
+                checksums = ()
+                if checksum is not None and checksum.hexdigest() != expected:
+                    raise ChecksumError(
+                        '%s checksum mismatch downloading %r' %
+                        (_checksum_label(md5sum), url))
+                # Upload the file to network cache.
+                if nc.get('upload-cache-url') and nc.get('upload-dir-url'):
+                    upload_network_cached(
+                        nc.get('upload-dir-url'),
+                        nc.get('upload-cache-url'), url, tmp_path, self.logger,
+                        nc.get('signature-private-key-file'),
+                        nc.get('shacache-ca-file'),
+                        nc.get('shacache-cert-file'),
+                        nc.get('shacache-key-file'),
+                        nc.get('shadir-ca-file'),
+                        nc.get('shadir-cert-file'),
+                        nc.get('shadir-key-file'))
+        except IOError:
+            e = sys.exc_info()[1]
+            os.remove(tmp_path)
+            raise zc.buildout.UserError("Error downloading extends for URL "
+                              "%s: %s" % (url, e))
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+        _hash_file(tmp_path, checksums)
+        if path:
+            shutil.move(tmp_path, path)
+            return path, False
+        else:
+            return tmp_path, True
+
+    def _download_stored(self, url, md5sum=None):
+        """Download a file from a URL using a content-addressed cache.
+
+        Files are stored once in the download cache, whatever the
+        namespace, as ``blobs/<xx>/<sha256>``.  The SHA-256 digest of the
+        files downloaded from each URL is kept in ``urls/``, and the
+        digest of files with a given MD5 or SHA-512 checksum in
+        ``checksums/``, so that a file whose checksum is known is found
+        without network access, whatever its URL.
+
+        """
+        store = self.download_cache
+        blob = None
+        if md5sum is not None:
+            name, digest = parse_checksum(md5sum)
+            if name == 'sha256':
+                blob = self._blob(store, digest)
+            else:
+                blob = self._blob(store, _read_digest(
+                    os.path.join(store, 'checksums', name + '-' + digest)))
+        if blob is None:
+            blob = self._blob(store, _read_digest(
+                os.path.join(store, 'urls', md5(url.encode()).hexdigest()),
+                url))
+
+        self.logger.debug('Searching cache at %s' % store)
+        is_temp = False
+        if blob is not None:
+            if self.fallback:
+                try:
+                    blob, is_temp = self._store(store, url, md5sum)
+                except ChecksumError:
+                    raise
+                except Exception:
+                    pass
+            if not check_md5sum(blob, md5sum):
+                raise ChecksumError(
+                    '%s checksum mismatch for cached download '
+                    'from %r at %r' % (_checksum_label(md5sum), url, blob))
+            zc.buildout.cache.touch(blob)
+            self.logger.debug('Using cache file %s' % blob)
+        else:
+            self.logger.debug('Cache miss; will cache %s in %s' %
+                              (url, store))
+            blob, is_temp = self._store(store, url, md5sum)
+        return blob, is_temp
+
+    def _blob(self, store, digest):
+        if digest:
+            path = os.path.join(store, 'blobs', digest[:2], digest)
+            if os.path.exists(path):
+                return path
+
+    def _store(self, store, url, md5sum):
+        """Download url and add the file to the content-addressed store
+        """
+        incoming = os.path.join(store, 'incoming')
+        if not os.path.isdir(incoming):
+            os.makedirs(incoming)
+        key = md5(url.encode()).hexdigest()
+        checksums = dict((name, hashlib.new(name)) for name in
+                         _checksum_names)
+        # Staged at a path of its own, since other processes may be
+        # storing the same URL.
+        handle, path = tempfile.mkstemp(prefix='buildout-', dir=incoming)
+        os.close(handle)
+        try:
+            path, is_temp = self._download(
+                url, md5sum, path, os.path.join(incoming, key + '.part'),
+                list(checksums.values()))
+            digest = checksums.pop('sha256').hexdigest()
+            blob = os.path.join(store, 'blobs', digest[:2], digest)
+            if not os.path.exists(blob):
+                if not os.path.isdir(os.path.dirname(blob)):
+                    os.makedirs(os.path.dirname(blob))
+                os.rename(path, blob)
+        finally:
+            remove(path)
+        for name, checksum in checksums.items():
+            _write_digest(os.path.join(
+                store, 'checksums', name + '-' + checksum.hexdigest()),
+                digest)
+        _write_digest(os.path.join(store, 'urls', key), digest, url)
+        return blob, is_temp
+
+    def filename(self, url):
+        """Determine a file name from a URL according to the configuration.
+
+        """
+        if self.hash_name:
+            return md5(url.encode()).hexdigest()
+        else:
+            if re.match(r"^[A-Za-z]:\\", url):
+                url = 'file:' + url
+            parsed = urlparse(url, 'file')
+            url_path = parsed[2]
+
+            if parsed[0] == 'file':
+                while True:
+                    url_path, name = os.path.split(url_path)
+                    if name:
+                        return name
+                    if not url_path:
+                        break
+            else:
+                for name in reversed(url_path.split('/')):
+                    if name:
+                        return name
+
+            url_host, url_port = parsed[-2:]
+            return '%s:%s' % (url_host, url_port)
+
+
+_checksum_names = 'md5', 'sha256', 'sha512'
+_checksum_name_by_length = dict(
+    (hashlib.new(name).digest_size * 2, name) for name in _checksum_names)
+_checksum_re = re.compile(r'(%s)[=:]([0-9a-fA-F]+)$' %
+                          '|'.join(_checksum_names))
+_checksum_fragment_re = re.compile(r'#(?:.*&)?((?:%s)=[0-9a-fA-F]+)(?:&|$)' %
+                                   '|'.join(_checksum_names))
+
+def parse_checksum(checksum):
+    """Return the algorithm name and the hex digest of a checksum.
+
+    The checksum may be prefixed by the name of the algorithm and ``=``
+    or ``:``, like ``sha256=...``.  Otherwise, the algorithm is guessed
+    from the length of the digest, MD5 being the default.
+
+    """
+    match = _checksum_re.match(checksum)
+    if match:
+        name, digest = match.groups()
+    else:
+        digest = checksum
+        name = _checksum_name_by_length.get(len(digest), 'md5')
+    return name, digest.lower()
+
+def _checksum_label(checksum):
+    return parse_checksum(checksum)[0].upper()
+
+def _checksum_from_url(url):
+    match = _checksum_fragment_re.search(url)
+    if match:
+        return match.group(1)
+
+def check_md5sum(path, md5sum):
+    """Tell whether the checksum of the file at path matches.
+
+    No checksum being given is considered a match.  Despite its name,
+    any checksum supported by parse_checksum can be given.
+
+    """
+    if md5sum is None:
+        return True
+
+    name, digest = parse_checksum(md5sum)
+    f = open(path, 'rb')
+    checksum = hashlib.new(name)
+    try:
+        chunk = f.read(2**16)
+        while chunk:
+            checksum.update(chunk)
+            chunk = f.read(2**16)
+        return checksum.hexdigest() == digest
+    finally:
+        f.close()
+
+
+class _Checksums(object):
+    """Update several hash objects at once
+    """
+
+    def __init__(self, checksums):
+        self.checksums = checksums
+
+    def update(self, data):
+        for checksum in self.checksums:
+            checksum.update(data)
+
+def _hash_file(path, checksums):
+    """Update the hash objects in checksums with the content of a file
+    """
+    if checksums:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1<<16), b''):
+                for checksum in checksums:
+                    checksum.update(chunk)
+
+def _write_digest(path, digest, url=None):
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    fd, tmp = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(digest + '\n' + (url + '\n' if url else ''))
+        os.rename(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def remove(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+from zc.buildout.networkcache import download_network_cached, \
+                                     upload_network_cached
+
+def locate_at(source, dest):
+    if dest is None or realpath(dest) == realpath(source):
+        return source
+
+    if os.path.isdir(source):
+        shutil.copytree(source, dest)
+    else:
+        try:
+            os.link(source, dest)
+        except (AttributeError, OSError):
+            shutil.copyfile(source, dest)
+    return dest
@@ -0,0 +1,162 @@
+##############################################################################
+#
+# Copyright (c) 2006 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+
+
+import multiprocessing.pool
+import shutil
+import os
+import doctest
+
+def rmtree (path, jobs=1):
+    """
+    A variant of shutil.rmtree which tries hard to be successful
+    On windows shutil.rmtree aborts when it tries to delete a
+    read only file.
+    This tries to chmod the file to writeable and retries before giving up.
+
+    Also it tries to remove symlink itself if a symlink as passed as
+    path argument.
+    >>> from tempfile import mkdtemp
+
+    Let's make a directory ...
+
+    >>> d = mkdtemp()
+
+    and make sure it is actually there
+
+    >>> os.path.isdir (d)
+    1
+
+    Now create a file ...
+
+    >>> foo = os.path.join (d, 'foo')
+    >>> _ = open (foo, 'w').write ('huhu')
+    >>> bar = os.path.join (d, 'bar')
+    >>> os.symlink(bar, bar)
+
+    and make it unwriteable
+
+    >>> os.chmod (foo, 256) # 0400
+
+    rmtree should be able to remove it:
+
+    >>> rmtree (d)
+
+    and now the directory is gone
+
+    >>> os.path.isdir (d)
+    0
+
+    Let's make a directory ...
+
+    >>> d = mkdtemp()
+
+    and make sure it is actually there
+
+    >>> os.path.isdir (d)
+    1
+
+    Now create a broken symlink ...
+
+    >>> foo = os.path.join (d, 'foo')
+    >>> os.symlink(foo + '.not_exist', foo)
+
+    rmtree should be able to remove it:
+
+    >>> rmtree (foo)
+
+    and now the directory is gone
+
+    >>> os.path.isdir (foo)
+    0
+
+    cleanup directory
+
+    >>> rmtree (d)
+
+    and now the directory is gone
+
+    >>> os.path.isdir (d)
+    0
+
+    With several jobs, files are removed by as many threads, after
+    which directories are removed bottom-up.  Symbolic links to
+    directories are not followed:
+
+    >>> d = mkdtemp()
+    >>> other = mkdtemp()
+    >>> for i in range(10):
+    ...     sub = os.path.join (d, str(i), 'sub')
+    ...     os.makedirs (sub)
+    ...     for j in range(10):
+    ...         _ = open (os.path.join (sub, str(j)), 'w').write ('huhu')
+    >>> os.symlink (other, os.path.join (d, 'link'))
+    >>> rmtree (d, 4)
+    >>> os.path.isdir (d), os.path.isdir (other)
+    (False, True)
+    >>> rmtree (other)
+    """
+    def retry_writeable (func, path, exc):
+        if func is os.path.islink:
+            os.unlink(path)
+        elif func is os.lstat:
+            if not os.path.islink(path):
+                raise
+            os.unlink(path)
+        else:
+            os.chmod(path, 0o600)
+            func(path)
+
+    if jobs > 1 and os.path.isdir(path) and not os.path.islink(path):
+        _parallel_remove(path, jobs)
+        if not os.path.lexists(path):
+            return
+
+    shutil.rmtree (path, onerror = retry_writeable)
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def _parallel_remove(path, jobs):
+    # Errors are ignored: whatever is left is removed by shutil.rmtree
+    files = []
+    dirs = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirs.append(dirpath)
+        for name in dirnames:
+            name = os.path.join(dirpath, name)
+            if os.path.islink(name):
+                files.append(name)
+        files.extend(os.path.join(dirpath, name) for name in filenames)
+    pool = multiprocessing.pool.ThreadPool(jobs)
+    try:
+        pool.map(_unlink, files, 256)
+    finally:
+        pool.close()
+        pool.join()
+    for dirpath in reversed(dirs):
+        try:
+            os.rmdir(dirpath)
+        except OSError:
+            pass
+
+def test_suite():
+    return doctest.DocTestSuite()
+
+if "__main__" == __name__:
+    doctest.testmod()
+
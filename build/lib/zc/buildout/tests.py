@@ -0,0 +1,5386 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+# Copyright (c) 2004-2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+from zc.buildout.buildout import print_
+from zope.testing import renormalizing
+
+import doctest
+import manuel.capture
+import manuel.doctest
+import manuel.testing
+import os
+import pkg_resources
+import re
+import shutil
+import sys
+import tempfile
+import unittest
+import zc.buildout.easy_install
+import zc.buildout.testing
+import zipfile
+
+os_path_sep = os.path.sep
+if os_path_sep == '\\':
+    os_path_sep *= 2
+
+
+def develop_w_non_setuptools_setup_scripts():
+    """
+We should be able to deal with setup scripts that aren't setuptools based.
+
+    >>> mkdir('foo')
+    >>> write('foo', 'setup.py',
+    ... '''
+    ... from distutils.core import setup
+    ... setup(name="foo")
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = foo
+    ... parts =
+    ... ''')
+
+    >>> print_(system(join('bin', 'buildout')), end='')
+    Develop: '/sample-buildout/foo'
+
+    >>> ls('develop-eggs')
+    -  foo.egg-link
+    -  zc.recipe.egg.egg-link
+
+    """
+
+def develop_verbose():
+    """
+We should be able to deal with setup scripts that aren't setuptools based.
+
+    >>> mkdir('foo')
+    >>> write('foo', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name="foo")
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = foo
+    ... parts =
+    ... ''')
+
+    >>> print_(system(join('bin', 'buildout')+' -vv'), end='')
+    ... # doctest: +ELLIPSIS
+    Installing...
+    Develop: '/sample-buildout/foo'
+    ...
+    Installed /sample-buildout/foo
+    ...
+
+    >>> ls('develop-eggs')
+    -  foo.egg-link
+    -  zc.recipe.egg.egg-link
+
+    >>> print_(system(join('bin', 'buildout')+' -vvv'), end='')
+    ... # doctest: +ELLIPSIS
+    Installing...
+    Develop: '/sample-buildout/foo'
+    in: '/sample-buildout/foo'
+    ... -q develop -mN -d /sample-buildout/develop-eggs/...
+
+
+    """
+
+def buildout_error_handling():
+    r"""Buildout error handling
+
+Asking for a section that doesn't exist, yields a missing section error:
+
+    >>> import os
+    >>> os.chdir(sample_buildout)
+    >>> import zc.buildout.buildout
+    >>> buildout = zc.buildout.buildout.Buildout('buildout.cfg', [])
+    >>> buildout['eek']
+    Traceback (most recent call last):
+    ...
+    MissingSection: The referenced section, 'eek', was not defined.
+
+Asking for an option that doesn't exist, a MissingOption error is raised:
+
+    >>> buildout['buildout']['eek']
+    Traceback (most recent call last):
+    ...
+    MissingOption: Missing option: buildout:eek
+
+It is an error to create a variable-reference cycle:
+
+    >>> write(sample_buildout, 'buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ... x = ${buildout:y}
+    ... y = ${buildout:z}
+    ... z = ${buildout:x}
+    ... ''')
+
+    >>> print_(system(os.path.join(sample_buildout, 'bin', 'buildout')),
+    ...        end='')
+    ... # doctest: +NORMALIZE_WHITESPACE +ELLIPSIS
+    While:
+      Initializing.
+      Getting section buildout.
+      Initializing section buildout.
+      Getting option buildout:x.
+      Getting option buildout:y.
+      Getting option buildout:z.
+      Getting option buildout:x.
+    Error: Circular reference in substitutions.
+
+It is an error to use funny characters in variable references:
+
+    >>> write(sample_buildout, 'buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipes
+    ... parts = data_dir debug
+    ... x = ${bui$ldout:y}
+    ... ''')
+
+    >>> print_(system(os.path.join(sample_buildout, 'bin', 'buildout')),
+    ...        end='')
+    While:
+      Initializing.
+      Getting section buildout.
+      Initializing section buildout.
+      Getting option buildout:x.
+    Error: The section name in substitution, ${bui$ldout:y},
+    has invalid characters.
+
+    >>> write(sample_buildout, 'buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipes
+    ... parts = data_dir debug
+    ... x = ${buildout:y{z}
+    ... ''')
+
+    >>> print_(system(os.path.join(sample_buildout, 'bin', 'buildout')),
+    ...        end='')
+    While:
+      Initializing.
+      Getting section buildout.
+      Initializing section buildout.
+      Getting option buildout:x.
+    Error: The option name in substitution, ${buildout:y{z},
+    has invalid characters.
+
+and too have too many or too few colons:
+
+    >>> write(sample_buildout, 'buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipes
+    ... parts = data_dir debug
+    ... x = ${parts}
+    ... ''')
+
+    >>> print_(system(os.path.join(sample_buildout, 'bin', 'buildout')),
+    ...        end='')
+    While:
+      Initializing.
+      Getting section buildout.
+      Initializing section buildout.
+      Getting option buildout:x.
+    Error: The substitution, ${parts},
+    doesn't contain a colon.
+
+    >>> write(sample_buildout, 'buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipes
+    ... parts = data_dir debug
+    ... x = ${buildout:y:z}
+    ... ''')
+
+    >>> print_(system(os.path.join(sample_buildout, 'bin', 'buildout')),
+    ...        end='')
+    While:
+      Initializing.
+      Getting section buildout.
+      Initializing section buildout.
+      Getting option buildout:x.
+    Error: The substitution, ${buildout:y:z},
+    has too many colons.
+
+All parts have to have a section:
+
+    >>> write(sample_buildout, 'buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = x
+    ... ''')
+
+    >>> print_(system(os.path.join(sample_buildout, 'bin', 'buildout')),
+    ...        end='')
+    While:
+      Installing.
+      Getting section x.
+    Error: The referenced section, 'x', was not defined.
+
+and all parts have to have a specified recipe:
+
+
+    >>> write(sample_buildout, 'buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = x
+    ...
+    ... [x]
+    ... foo = 1
+    ... ''')
+
+    >>> print_(system(os.path.join(sample_buildout, 'bin', 'buildout')),
+    ...        end='')
+    While:
+      Installing.
+    Error: Missing option: x:recipe
+
+"""
+
+make_dist_that_requires_setup_py_template = """
+from setuptools import setup
+setup(name=%r, version=%r,
+      install_requires=%r,
+      )
+"""
+
+def make_dist_that_requires(dest, name, requires=[], version=1, egg=''):
+    os.mkdir(os.path.join(dest, name))
+    open(os.path.join(dest, name, 'setup.py'), 'w').write(
+        make_dist_that_requires_setup_py_template
+        % (name, version, requires)
+        )
+
+def show_who_requires_when_there_is_a_conflict():
+    """
+It's a pain when we require eggs that have requirements that are
+incompatible. We want the error we get to tell us what is missing.
+
+Let's make a few develop distros, some of which have incompatible
+requirements.
+
+    >>> make_dist_that_requires(sample_buildout, 'sampley',
+    ...                         ['demoneeded ==1.0'])
+    >>> make_dist_that_requires(sample_buildout, 'samplez',
+    ...                         ['demoneeded ==1.1'])
+
+Now, let's create a buildout that requires y and z:
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = eggs
+    ... develop = sampley samplez
+    ... find-links = %(link_server)s
+    ...
+    ... [eggs]
+    ... recipe = zc.recipe.egg
+    ... eggs = sampley
+    ...        samplez
+    ... ''' % globals())
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/sampley'
+    Develop: '/sample-buildout/samplez'
+    Installing eggs.
+    Getting distribution for 'demoneeded==1.1'.
+    Got demoneeded 1.1.
+    Version and requirements information containing demoneeded:
+      Requirement of samplez: demoneeded==1.1
+      Requirement of sampley: demoneeded==1.0
+    While:
+      Installing eggs.
+    Error: There is a version conflict.
+    We already have: demoneeded 1.1
+    but sampley 1 requires 'demoneeded==1.0'.
+
+Here, we see that sampley required an older version of demoneeded. What
+if we hadn't required sampley ourselves:
+
+    >>> make_dist_that_requires(sample_buildout, 'samplea', ['sampleb'])
+    >>> make_dist_that_requires(sample_buildout, 'sampleb',
+    ...                         ['sampley', 'samplea'])
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = eggs
+    ... develop = sampley samplez samplea sampleb
+    ... find-links = %(link_server)s
+    ...
+    ... [eggs]
+    ... recipe = zc.recipe.egg
+    ... eggs = samplea
+    ...        samplez
+    ... ''' % globals())
+
+If we use the verbose switch, we can see where requirements are coming from:
+
+    >>> print_(system(buildout+' -v'), end='') # doctest: +ELLIPSIS
+    Installing 'zc.buildout', 'setuptools'.
+    We have a develop egg: zc.buildout 1.0.0
+    We have the best distribution that satisfies 'setuptools'.
+    Picked: setuptools = 0.7
+    Develop: '/sample-buildout/sampley'
+    Develop: '/sample-buildout/samplez'
+    Develop: '/sample-buildout/samplea'
+    Develop: '/sample-buildout/sampleb'
+    ...Installing eggs.
+    Installing 'samplea', 'samplez'.
+    We have a develop egg: samplea 1
+    We have a develop egg: samplez 1
+    Getting required 'demoneeded==1.1'
+      required by samplez 1.
+    We have the distribution that satisfies 'demoneeded==1.1'.
+    Getting required 'sampleb'
+      required by samplea 1.
+    We have a develop egg: sampleb 1
+    Getting required 'sampley'
+      required by sampleb 1.
+    We have a develop egg: sampley 1
+    Version and requirements information containing demoneeded:
+      Requirement of samplez: demoneeded==1.1
+      Requirement of sampley: demoneeded==1.0
+    While:
+      Installing eggs.
+    Error: There is a version conflict.
+    We already have: demoneeded 1.1
+    but sampley 1 requires 'demoneeded==1.0'.
+    """
+
+def version_conflict_rendering():
+    """
+
+We use the arguments passed by pkg_resources.VersionConflict to construct a
+nice error message:
+
+    >>> error = pkg_resources.VersionConflict('pkg1 2.1', 'pkg1 1.0')
+    >>> ws = []  # Not relevant for this test
+    >>> print_(zc.buildout.easy_install.VersionConflict(
+    ...     error, ws)) # doctest: +ELLIPSIS
+    There is a version conflict...
+
+But sometimes pkg_resources passes a nicely formatted string itself already.
+Extracting the original arguments fails in that case, so we just show the string.
+
+    >>> error = pkg_resources.VersionConflict('pkg1 2.1 is simply wrong')
+    >>> ws = []  # Not relevant for this test
+    >>> print_(zc.buildout.easy_install.VersionConflict(
+    ...     error, ws)) # doctest: +ELLIPSIS
+    There is a version conflict.
+    pkg1 2.1 is simply wrong
+
+    """
+
+def show_who_requires_missing_distributions():
+    """
+
+When working with a lot of eggs, which require eggs recursively, it
+can be hard to tell why we're requiring things we can't
+find. Fortunately, buildout will tell us who's asking for something
+that we can't find. when run in verbose mode
+
+    >>> make_dist_that_requires(sample_buildout, 'sampley', ['demoneeded'])
+    >>> make_dist_that_requires(sample_buildout, 'samplea', ['sampleb'])
+    >>> make_dist_that_requires(sample_buildout, 'sampleb',
+    ...                         ['sampley', 'samplea'])
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = eggs
+    ... develop = sampley samplea sampleb
+    ...
+    ... [eggs]
+    ... recipe = zc.recipe.egg
+    ... eggs = samplea
+    ... ''')
+
+    >>> print_(system(buildout+' -v'), end='') # doctest: +ELLIPSIS
+    Installing ...
+    Installing 'samplea'.
+    We have a develop egg: samplea 1
+    Getting required 'sampleb'
+      required by samplea 1.
+    We have a develop egg: sampleb 1
+    Getting required 'sampley'
+      required by sampleb 1.
+    We have a develop egg: sampley 1
+    Getting required 'demoneeded'
+      required by sampley 1.
+    We have no distributions for demoneeded that satisfies 'demoneeded'.
+    ...
+    While:
+      Installing eggs.
+      Getting distribution for 'demoneeded'.
+    Error: Couldn't find a distribution for 'demoneeded'.
+    """
+
+def show_who_requires_picked_versions():
+    """
+
+The show-picked-versions prints the versions, but it also prints who
+required the picked distributions.
+We do not need to run in verbose mode for that to work:
+
+    >>> make_dist_that_requires(sample_buildout, 'sampley', ['setuptools'])
+    >>> make_dist_that_requires(sample_buildout, 'samplea', ['sampleb'])
+    >>> make_dist_that_requires(sample_buildout, 'sampleb',
+    ...                         ['sampley', 'samplea'])
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = eggs
+    ... show-picked-versions = true
+    ... develop = sampley samplea sampleb
+    ...
+    ... [eggs]
+    ... recipe = zc.recipe.egg
+    ... eggs = samplea
+    ... ''')
+
+    >>> print_(system(buildout), end='') # doctest: +ELLIPSIS
+    Develop: ...
+    Installing eggs.
+    Versions had to be automatically picked.
+    The following part definition lists the versions picked:
+    [versions]
+    <BLANKLINE>
+    # Required by:
+    # sampley==1
+    setuptools = 0.7
+    """
+
+def test_comparing_saved_options_with_funny_characters():
+    """
+If an option has newlines, extra/odd spaces or a %, we need to make sure
+the comparison with the saved value works correctly.
+
+    >>> mkdir(sample_buildout, 'recipes')
+    >>> write(sample_buildout, 'recipes', 'debug.py',
+    ... '''
+    ... class Debug:
+    ...     def __init__(self, buildout, name, options):
+    ...         options['debug'] = \"\"\"  <zodb>
+    ...
+    ...   <filestorage>
+    ...     path foo
+    ...   </filestorage>
+    ...
+    ... </zodb>
+    ...      \"\"\"
+    ...         options['debug1'] = \"\"\"
+    ... <zodb>
+    ...
+    ...   <filestorage>
+    ...     path foo
+    ...   </filestorage>
+    ...
+    ... </zodb>
+    ... \"\"\"
+    ...         options['debug2'] = '  x  '
+    ...         options['debug3'] = '42'
+    ...         options['format'] = '%3d'
+    ...
+    ...     def install(self):
+    ...         open('t', 'w').write('t')
+    ...         return 't'
+    ...
+    ...     update = install
+    ... ''')
+
+
+    >>> write(sample_buildout, 'recipes', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(
+    ...     name = "recipes",
+    ...     entry_points = {'zc.buildout': ['default = debug:Debug']},
+    ...     )
+    ... ''')
+
+    >>> write(sample_buildout, 'recipes', 'README.txt', " ")
+
+    >>> write(sample_buildout, 'buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipes
+    ... parts = debug
+    ...
+    ... [debug]
+    ... recipe = recipes
+    ... ''')
+
+    >>> os.chdir(sample_buildout)
+    >>> buildout = os.path.join(sample_buildout, 'bin', 'buildout')
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipes'
+    Installing debug.
+
+If we run the buildout again, we shoudn't get a message about
+uninstalling anything because the configuration hasn't changed.
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipes'
+    Updating debug.
+"""
+
+def finding_eggs_as_local_directories():
+    r"""
+It is possible to set up find-links so that we could install from
+a local directory that may contained unzipped eggs.
+
+    >>> src = tmpdir('src')
+    >>> write(src, 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='demo', py_modules=[''],
+    ...    zip_safe=False, version='1.0', author='bob', url='bob',
+    ...    author_email='bob')
+    ... ''')
+
+    >>> write(src, 't.py', '#\n')
+    >>> write(src, 'README.txt', '')
+    >>> _ = system(join('bin', 'buildout')+' setup ' + src + ' bdist_egg')
+
+Install it so it gets unzipped:
+
+    >>> d1 = tmpdir('d1')
+    >>> ws = zc.buildout.easy_install.install(
+    ...     ['demo'], d1, links=[join(src, 'dist')],
+    ...     )
+
+    >>> ls(d1)
+    d  demo-1.0-py2.4.egg
+
+Then try to install it again:
+
+    >>> d2 = tmpdir('d2')
+    >>> ws = zc.buildout.easy_install.install(
+    ...     ['demo'], d2, links=[d1],
+    ...     )
+
+    >>> ls(d2)
+    d  demo-1.0-py2.4.egg
+
+    """
+
+def create_sections_on_command_line():
+    """
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ... x = ${foo:bar}
+    ... ''')
+
+    >>> print_(system(buildout + ' foo:bar=1 -vv'), end='')
+    ...        # doctest: +ELLIPSIS
+    Installing 'zc.buildout', 'setuptools'.
+    ...
+    [foo]
+    bar = 1
+    ...
+
+    """
+
+def test_help():
+    """
+    >>> print_(system(os.path.join(sample_buildout, 'bin', 'buildout')+' -h'))
+    ... # doctest: +ELLIPSIS
+    Usage: buildout [options] [assignments] [command [command arguments]]
+    <BLANKLINE>
+    Options:
+    <BLANKLINE>
+      -h, --help
+    ...
+
+    >>> print_(system(os.path.join(sample_buildout, 'bin', 'buildout')
+    ...              +' --help'))
+    ... # doctest: +ELLIPSIS
+    Usage: buildout [options] [assignments] [command [command arguments]]
+    <BLANKLINE>
+    Options:
+    <BLANKLINE>
+      -h, --help
+    ...
+    """
+
+def test_version():
+    """
+    >>> buildout = os.path.join(sample_buildout, 'bin', 'buildout')
+    >>> print_(system(buildout+' --version'))
+    ... # doctest: +ELLIPSIS
+    buildout version ...
+
+    """
+
+def test_bootstrap_with_extension():
+    """
+We had a problem running a bootstrap with an extension.  Let's make
+sure it is fixed.  Basically, we don't load extensions when
+bootstrapping.
+
+    >>> d = tmpdir('sample-bootstrap')
+
+    >>> write(d, 'buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... extensions = some_awsome_extension
+    ... parts =
+    ... ''')
+
+    >>> os.chdir(d)
+    >>> print_(system(os.path.join(sample_buildout, 'bin', 'buildout')
+    ...              + ' bootstrap'), end='')
+    Creating directory '/sample-bootstrap/eggs'.
+    Creating directory '/sample-bootstrap/bin'.
+    Creating directory '/sample-bootstrap/parts'.
+    Creating directory '/sample-bootstrap/develop-eggs'.
+    Generated script '/sample-bootstrap/bin/buildout'.
+    """
+
+
+def bug_92891_bootstrap_crashes_with_egg_recipe_in_buildout_section():
+    """
+    >>> d = tmpdir('sample-bootstrap')
+
+    >>> write(d, 'buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = buildout
+    ... eggs-directory = eggs
+    ...
+    ... [buildout]
+    ... recipe = zc.recipe.egg
+    ... eggs = zc.buildout
+    ... scripts = buildout=buildout
+    ... ''')
+
+    >>> os.chdir(d)
+    >>> print_(system(os.path.join(sample_buildout, 'bin', 'buildout')
+    ...              + ' bootstrap'), end='')
+    Creating directory '/sample-bootstrap/eggs'.
+    Creating directory '/sample-bootstrap/bin'.
+    Creating directory '/sample-bootstrap/parts'.
+    Creating directory '/sample-bootstrap/develop-eggs'.
+    Generated script '/sample-bootstrap/bin/buildout'.
+
+    >>> print_(system(os.path.join('bin', 'buildout')), end='')
+    Unused options for buildout: 'scripts' 'eggs'.
+
+    """
+
+def removing_eggs_from_develop_section_causes_egg_link_to_be_removed():
+    '''
+    >>> cd(sample_buildout)
+
+Create a develop egg:
+
+    >>> mkdir('foo')
+    >>> write('foo', 'setup.py',
+    ... """
+    ... from setuptools import setup
+    ... setup(name='foox')
+    ... """)
+    >>> write('buildout.cfg',
+    ... """
+    ... [buildout]
+    ... develop = foo
+    ... parts =
+    ... """)
+
+    >>> print_(system(join('bin', 'buildout')), end='')
+    Develop: '/sample-buildout/foo'
+
+    >>> ls('develop-eggs')
+    -  foox.egg-link
+    -  zc.recipe.egg.egg-link
+
+Create another:
+
+    >>> mkdir('bar')
+    >>> write('bar', 'setup.py',
+    ... """
+    ... from setuptools import setup
+    ... setup(name='fooy')
+    ... """)
+    >>> write('buildout.cfg',
+    ... """
+    ... [buildout]
+    ... develop = foo bar
+    ... parts =
+    ... """)
+
+    >>> print_(system(join('bin', 'buildout')), end='')
+    Develop: '/sample-buildout/foo'
+    Develop: '/sample-buildout/bar'
+
+    >>> ls('develop-eggs')
+    -  foox.egg-link
+    -  fooy.egg-link
+    -  zc.recipe.egg.egg-link
+
+Remove one:
+
+    >>> write('buildout.cfg',
+    ... """
+    ... [buildout]
+    ... develop = bar
+    ... parts =
+    ... """)
+    >>> print_(system(join('bin', 'buildout')), end='')
+    Develop: '/sample-buildout/bar'
+
+It is gone
+
+    >>> ls('develop-eggs')
+    -  fooy.egg-link
+    -  zc.recipe.egg.egg-link
+
+Remove the other:
+
+    >>> write('buildout.cfg',
+    ... """
+    ... [buildout]
+    ... parts =
+    ... """)
+    >>> print_(system(join('bin', 'buildout')), end='')
+
+All gone
+
+    >>> ls('develop-eggs')
+    -  zc.recipe.egg.egg-link
+    '''
+
+
+def add_setuptools_to_dependencies_when_namespace_packages():
+    '''
+Often, a package depends on setuptools solely by virtue of using
+namespace packages. In this situation, package authors often forget to
+declare setuptools as a dependency. This is a mistake, but,
+unfortunately, a common one that we need to work around.  If an egg
+uses namespace packages and does not include setuptools as a dependency,
+we will still include setuptools in the working set.  If we see this for
+a develop egg, we will also generate a warning.
+
+    >>> mkdir('foo')
+    >>> mkdir('foo', 'src')
+    >>> mkdir('foo', 'src', 'stuff')
+    >>> write('foo', 'src', 'stuff', '__init__.py',
+    ... """__import__('pkg_resources').declare_namespace(__name__)
+    ... """)
+    >>> mkdir('foo', 'src', 'stuff', 'foox')
+    >>> write('foo', 'src', 'stuff', 'foox', '__init__.py', '')
+    >>> write('foo', 'setup.py',
+    ... """
+    ... from setuptools import setup
+    ... setup(name='foox',
+    ...       namespace_packages = ['stuff'],
+    ...       package_dir = {'': 'src'},
+    ...       packages = ['stuff', 'stuff.foox'],
+    ...       )
+    ... """)
+    >>> write('foo', 'README.txt', '')
+
+    >>> write('buildout.cfg',
+    ... """
+    ... [buildout]
+    ... develop = foo
+    ... parts =
+    ... """)
+
+    >>> print_(system(join('bin', 'buildout')), end='')
+    Develop: '/sample-buildout/foo'
+
+Now, if we generate a working set using the egg link, we will get a warning
+and we will get setuptools included in the working set.
+
+    >>> import logging, zope.testing.loggingsupport
+    >>> handler = zope.testing.loggingsupport.InstalledHandler(
+    ...        'zc.buildout.easy_install', level=logging.WARNING)
+    >>> logging.getLogger('zc.buildout.easy_install').propagate = False
+
+    >>> [dist.project_name
+    ...  for dist in zc.buildout.easy_install.working_set(
+    ...    ['foox'], sys.executable,
+    ...    [join(sample_buildout, 'eggs'),
+    ...     join(sample_buildout, 'develop-eggs'),
+    ...     ])]
+    ['foox', 'setuptools']
+
+    >>> print_(handler)
+    zc.buildout.easy_install WARNING
+      Develop distribution: foox 0.0.0
+    uses namespace packages but the distribution does not require setuptools.
+
+    >>> handler.clear()
+
+On the other hand, if we have a regular egg, rather than a develop egg:
+
+    >>> os.remove(join('develop-eggs', 'foox.egg-link'))
+
+    >>> _ = system(join('bin', 'buildout') + ' setup foo bdist_egg -d'
+    ...            + join(sample_buildout, 'eggs'))
+
+    >>> ls('develop-eggs')
+    -  zc.recipe.egg.egg-link
+
+    >>> ls('eggs') # doctest: +ELLIPSIS
+    -  foox-0.0.0-py2.4.egg
+    d  setuptools.eggpyN.N.egg
+    ...
+
+We do not get a warning, but we do get setuptools included in the working set:
+
+    >>> [dist.project_name
+    ...  for dist in zc.buildout.easy_install.working_set(
+    ...    ['foox'], sys.executable,
+    ...    [join(sample_buildout, 'eggs'),
+    ...     join(sample_buildout, 'develop-eggs'),
+    ...     ])]
+    ['foox', 'setuptools']
+
+    >>> print_(handler, end='')
+
+We get the same behavior if the it is a dependency that uses a
+namespace package.
+
+
+    >>> mkdir('bar')
+    >>> write('bar', 'setup.py',
+    ... """
+    ... from setuptools import setup
+    ... setup(name='bar', install_requires = ['foox'])
+    ... """)
+    >>> write('bar', 'README.txt', '')
+
+    >>> write('buildout.cfg',
+    ... """
+    ... [buildout]
+    ... develop = foo bar
+    ... parts =
+    ... """)
+
+    >>> print_(system(join('bin', 'buildout')), end='')
+    Develop: '/sample-buildout/foo'
+    Develop: '/sample-buildout/bar'
+
+    >>> [dist.project_name
+    ...  for dist in zc.buildout.easy_install.working_set(
+    ...    ['bar'], sys.executable,
+    ...    [join(sample_buildout, 'eggs'),
+    ...     join(sample_buildout, 'develop-eggs'),
+    ...     ])]
+    ['bar', 'foox', 'setuptools']
+
+    >>> print_(handler, end='')
+    zc.buildout.easy_install WARNING
+      Develop distribution: foox 0.0.0
+    uses namespace packages but the distribution does not require setuptools.
+
+
+    >>> logging.getLogger('zc.buildout.easy_install').propagate = True
+    >>> handler.uninstall()
+
+    '''
+
+def develop_preserves_existing_setup_cfg():
+    """
+
+See "Handling custom build options for extensions in develop eggs" in
+easy_install.txt.  This will be very similar except that we'll have an
+existing setup.cfg:
+
+    >>> write(extdemo, "setup.cfg",
+    ... '''
+    ... # sampe cfg file
+    ...
+    ... [foo]
+    ... bar = 1
+    ...
+    ... [build_ext]
+    ... define = X,Y
+    ... ''')
+
+    >>> mkdir('include')
+    >>> write('include', 'extdemo.h',
+    ... '''
+    ... #define EXTDEMO 42
+    ... ''')
+
+    >>> dest = tmpdir('dest')
+    >>> zc.buildout.easy_install.develop(
+    ...   extdemo, dest,
+    ...   {'include-dirs': os.path.join(sample_buildout, 'include')})
+    '/dest/extdemo.egg-link'
+
+    >>> ls(dest)
+    -  extdemo.egg-link
+
+    >>> cat(extdemo, "setup.cfg")
+    <BLANKLINE>
+    # sampe cfg file
+    <BLANKLINE>
+    [foo]
+    bar = 1
+    <BLANKLINE>
+    [build_ext]
+    define = X,Y
+
+"""
+
+def uninstall_recipes_used_for_removal():
+    r"""
+Uninstall recipes need to be called when a part is removed too:
+
+    >>> mkdir("recipes")
+    >>> write("recipes", "setup.py",
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipes',
+    ...       entry_points={
+    ...          'zc.buildout': ["demo=demo:Install"],
+    ...          'zc.buildout.uninstall': ["demo=demo:uninstall"],
+    ...          })
+    ... ''')
+
+    >>> write("recipes", "demo.py",
+    ... r'''
+    ... import sys
+    ... class Install:
+    ...     def __init__(*args): pass
+    ...     def install(self):
+    ...         sys.stdout.write('installing\n')
+    ...         return ()
+    ... def uninstall(name, options):
+    ...     sys.stdout.write('uninstalling\n')
+    ... ''')
+
+    >>> write('buildout.cfg', '''
+    ... [buildout]
+    ... develop = recipes
+    ... parts = demo
+    ... [demo]
+    ... recipe = recipes:demo
+    ... ''')
+
+    >>> print_(system(join('bin', 'buildout')), end='')
+    Develop: '/sample-buildout/recipes'
+    Installing demo.
+    installing
+
+
+    >>> write('buildout.cfg', '''
+    ... [buildout]
+    ... develop = recipes
+    ... parts = demo
+    ... [demo]
+    ... recipe = recipes:demo
+    ... x = 1
+    ... ''')
+
+    >>> print_(system(join('bin', 'buildout')), end='')
+    Develop: '/sample-buildout/recipes'
+    Uninstalling demo.
+    Running uninstall recipe.
+    uninstalling
+    Installing demo.
+    installing
+    Unused options for demo: 'x'.
+
+
+    >>> write('buildout.cfg', '''
+    ... [buildout]
+    ... develop = recipes
+    ... parts =
+    ... ''')
+
+    >>> print_(system(join('bin', 'buildout')), end='')
+    Develop: '/sample-buildout/recipes'
+    Uninstalling demo.
+    Running uninstall recipe.
+    uninstalling
+
+"""
+
+def extensions_installed_as_eggs_work_in_offline_mode():
+    '''
+    >>> mkdir('demo')
+
+    >>> write('demo', 'demo.py',
+    ... r"""
+    ... import sys
+    ... def print_(*args):
+    ...     sys.stdout.write(' '.join(map(str, args)) + '\\n')
+    ... def ext(buildout):
+    ...     print_('ext', sorted(buildout))
+    ... """)
+
+    >>> write('demo', 'setup.py',
+    ... """
+    ... from setuptools import setup
+    ...
+    ... setup(
+    ...     name = "demo",
+    ...     py_modules=['demo'],
+    ...     entry_points = {'zc.buildout.extension': ['ext = demo:ext']},
+    ...     )
+    ... """)
+
+    >>> bdist_egg(join(sample_buildout, "demo"), sys.executable,
+    ...           join(sample_buildout, "eggs"))
+
+    >>> write(sample_buildout, 'buildout.cfg',
+    ... """
+    ... [buildout]
+    ... extensions = demo
+    ... parts =
+    ... offline = true
+    ... """)
+
+    >>> print_(system(join(sample_buildout, 'bin', 'buildout')), end='')
+    ext ['buildout', 'versions']
+
+
+    '''
+
+def changes_in_svn_or_CVS_dont_affect_sig():
+    """
+
+If we have a develop recipe, it's signature shouldn't be affected to
+changes in .svn or CVS directories.
+
+    >>> mkdir('recipe')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe',
+    ...       entry_points={'zc.buildout': ['default=foo:Foo']})
+    ... ''')
+    >>> write('recipe', 'foo.py',
+    ... '''
+    ... class Foo:
+    ...     def __init__(*args): pass
+    ...     def install(*args): return ()
+    ...     update = install
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = foo
+    ...
+    ... [foo]
+    ... recipe = recipe
+    ... ''')
+
+
+    >>> print_(system(join(sample_buildout, 'bin', 'buildout')), end='')
+    Develop: '/sample-buildout/recipe'
+    Installing foo.
+
+    >>> mkdir('recipe', '.svn')
+    >>> mkdir('recipe', 'CVS')
+    >>> print_(system(join(sample_buildout, 'bin', 'buildout')), end='')
+    Develop: '/sample-buildout/recipe'
+    Updating foo.
+
+    >>> write('recipe', '.svn', 'x', '1')
+    >>> write('recipe', 'CVS', 'x', '1')
+
+    >>> print_(system(join(sample_buildout, 'bin', 'buildout')), end='')
+    Develop: '/sample-buildout/recipe'
+    Updating foo.
+
+    """
+
+if hasattr(os, 'symlink'):
+    def bug_250537_broken_symlink_doesnt_affect_sig():
+        """
+If we have a develop recipe, it's signature shouldn't be affected by
+broken symlinks, and better yet, computing the hash should not break
+because of the missing target file.
+
+    >>> mkdir('recipe')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe',
+    ...       entry_points={'zc.buildout': ['default=foo:Foo']})
+    ... ''')
+    >>> write('recipe', 'foo.py',
+    ... '''
+    ... class Foo:
+    ...     def __init__(*args): pass
+    ...     def install(*args): return ()
+    ...     update = install
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = foo
+    ...
+    ... [foo]
+    ... recipe = recipe
+    ... ''')
+
+
+    >>> print_(system(join(sample_buildout, 'bin', 'buildout')), end='')
+    Develop: '/sample-buildout/recipe'
+    Installing foo.
+
+    >>> write('recipe', 'some-file', '1')
+    >>> os.symlink(join('recipe', 'some-file'),
+    ...            join('recipe', 'another-file'))
+    >>> remove('recipe', 'some-file')
+
+    >>> print_(system(join(sample_buildout, 'bin', 'buildout')), end='')
+    Develop: '/sample-buildout/recipe'
+    Updating foo.
+
+    """
+
+def unicode_filename_doesnt_break_hash():
+    """
+Buildout's _dir_hash() used to break on non-ascii filenames on python 2.
+
+    >>> mkdir('héhé')
+    >>> write('héhé', 'héhé.py',
+    ... '''
+    ... print('Example filename from pyramid tests')
+    ... ''')
+    >>> from zc.buildout.buildout import _dir_hash
+    >>> dont_care = _dir_hash('héhé')
+
+    """
+
+def dir_hash_cache():
+    """
+With the dir-hash-cache option, the digests of the files of develop
+directories are kept in an index, so that files whose size,
+modification time and inode didn't change are not read again:
+
+    >>> import os, time
+    >>> import zc.buildout.buildout
+    >>> mkdir('d')
+    >>> write('d', 'a.py', 'a')
+    >>> write('d', 'b.py', 'b')
+    >>> old = time.time() - 10
+    >>> def age(*path):
+    ...     os.utime(join(*path), (old, old))
+    >>> age('d', 'a.py')
+    >>> age('d', 'b.py')
+
+    >>> zc.buildout.buildout._dir_hash_setup('cache', None)
+    >>> digest = zc.buildout.buildout._dir_hash('d')
+    >>> len(os.listdir('cache'))
+    1
+
+    >>> write('d', 'a.py', 'x')
+    >>> age('d', 'a.py')
+    >>> zc.buildout.buildout._dir_hashes.clear()
+    >>> zc.buildout.buildout._dir_hash('d') == digest
+    True
+
+    >>> write('d', 'a.py', 'xx')
+    >>> age('d', 'a.py')
+    >>> zc.buildout.buildout._dir_hashes.clear()
+    >>> zc.buildout.buildout._dir_hash('d') == digest
+    False
+
+The dir-hash-algorithm option selects the digest used:
+
+    >>> zc.buildout.buildout._dir_hash_setup('cache', 'sha256')
+    >>> len(zc.buildout.buildout._dir_hash('d'))
+    64
+    >>> zc.buildout.buildout._dir_hash_setup(None, None)
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ... dir-hash-algorithm = foo
+    ... ''')
+    >>> print_(system(buildout), end='')
+    While:
+      Initializing.
+    Error: Unsupported dir-hash-algorithm foo
+    """
+
+def o_option_sets_offline():
+    """
+    >>> print_(system(join(sample_buildout, 'bin', 'buildout')+' -vvo'), end='')
+    ... # doctest: +ELLIPSIS
+    <BLANKLINE>
+    ...
+    offline = true
+    ...
+    """
+
+def recipe_upgrade():
+    r"""
+
+The buildout will upgrade recipes in newest (and non-offline) mode.
+
+Let's create a recipe egg
+
+    >>> mkdir('recipe')
+    >>> write('recipe', 'recipe.py',
+    ... r'''
+    ... import sys
+    ... class Recipe:
+    ...     def __init__(*a): pass
+    ...     def install(self):
+    ...         sys.stdout.write('recipe v1\n')
+    ...         return ()
+    ...     update = install
+    ... ''')
+
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe', version='1', py_modules=['recipe'],
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+
+    >>> write('recipe', 'README', '')
+
+    >>> print_(system(buildout+' setup recipe bdist_egg')) # doctest: +ELLIPSIS
+    Running setup script 'recipe/setup.py'.
+    ...
+
+    >>> rmdir('recipe', 'build')
+
+And update our buildout to use it.
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = foo
+    ... find-links = %s
+    ...
+    ... [foo]
+    ... recipe = recipe
+    ... ''' % join('recipe', 'dist'))
+
+    >>> print_(system(buildout), end='')
+    Getting distribution for 'recipe'.
+    Got recipe 1.
+    Installing foo.
+    recipe v1
+
+Now, if we update the recipe egg:
+
+    >>> write('recipe', 'recipe.py',
+    ... r'''
+    ... import sys
+    ... class Recipe:
+    ...     def __init__(*a): pass
+    ...     def install(self):
+    ...         sys.stdout.write('recipe v2\n')
+    ...         return ()
+    ...     update = install
+    ... ''')
+
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe', version='2', py_modules=['recipe'],
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+
+
+    >>> print_(system(buildout+' setup recipe bdist_egg')) # doctest: +ELLIPSIS
+    Running setup script 'recipe/setup.py'.
+    ...
+
+We won't get the update if we specify -N:
+
+    >>> print_(system(buildout+' -N'), end='')
+    Updating foo.
+    recipe v1
+
+or if we use -o:
+
+    >>> print_(system(buildout+' -o'), end='')
+    Updating foo.
+    recipe v1
+
+But we will if we use neither of these:
+
+    >>> print_(system(buildout), end='')
+    Getting distribution for 'recipe'.
+    Got recipe 2.
+    Uninstalling foo.
+    Installing foo.
+    recipe v2
+
+We can also select a particular recipe version:
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = foo
+    ... find-links = %s
+    ...
+    ... [foo]
+    ... recipe = recipe ==1
+    ... ''' % join('recipe', 'dist'))
+
+    >>> print_(system(buildout), end='')
+    Uninstalling foo.
+    Installing foo.
+    recipe v1
+
+    """
+
+def update_adds_to_uninstall_list():
+    """
+
+Paths returned by the update method are added to the list of paths to
+uninstall
+
+    >>> mkdir('recipe')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe',
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+
+    >>> write('recipe', 'recipe.py',
+    ... '''
+    ... import os
+    ... class Recipe:
+    ...     def __init__(*_): pass
+    ...     def install(self):
+    ...         r = ('a', 'b', 'c')
+    ...         for p in r: os.mkdir(p)
+    ...         return r
+    ...     def update(self):
+    ...         r = ('c', 'd', 'e')
+    ...         for p in r:
+    ...             if not os.path.exists(p):
+    ...                os.mkdir(p)
+    ...         return r
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = foo
+    ...
+    ... [foo]
+    ... recipe = recipe
+    ... ''')
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipe'
+    Installing foo.
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipe'
+    Updating foo.
+
+    >>> cat('.installed.cfg') # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
+    [buildout]
+    ...
+    [foo]
+    __buildout_installed__ = a
+    	b
+    	c
+    	d
+    	e
+    __buildout_signature__ = ...
+
+"""
+
+def install_parts_in_parallel():
+    """
+With the jobs option, parts that don't depend on each other are
+installed at the same time, in separate processes:
+
+    >>> mkdir('recipe')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe',
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+
+    >>> write('recipe', 'recipe.py',
+    ... '''
+    ... import os, time, zc.buildout
+    ... class Recipe:
+    ...     def __init__(self, buildout, name, options):
+    ...         self.name, self.options = name, options
+    ...         options.get('after')
+    ...     def install(self):
+    ...         for p in self.options.get('needs', '').split():
+    ...             assert os.path.exists(p), p
+    ...         time.sleep(float(self.options.get('sleep', 0)))
+    ...         if self.options.get('fail'):
+    ...             raise zc.buildout.UserError('%s failed' % self.name)
+    ...         open(self.name, 'w').close()
+    ...         return self.name
+    ...     def update(self):
+    ...         pass
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = a b c
+    ... jobs = 2
+    ...
+    ... [a]
+    ... recipe = recipe
+    ... sleep = 1
+    ...
+    ... [b]
+    ... recipe = recipe
+    ... needs = a
+    ... after = ${a:recipe}
+    ...
+    ... [c]
+    ... recipe = recipe
+    ... fail = 1
+    ... ''')
+
+b references a, so it waits for it. When c fails, no new part is
+started but a is still recorded as installed:
+
+    >>> print_('\\n'.join(sorted(system(buildout).splitlines())))
+      Installing c.
+      Installing.
+    Develop: '/sample-buildout/recipe'
+    Error: c failed
+    Installing a.
+    Installing c.
+    While:
+
+    >>> import zc.buildout.configparser
+    >>> def installed():
+    ...     with open('.installed.cfg') as f:
+    ...         cfg = zc.buildout.configparser.parse(f, '.installed.cfg')
+    ...     print_(sorted(cfg['buildout']['parts'].split()), sorted(cfg))
+    >>> installed()
+    ['a'] ['a', 'buildout']
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = a b c
+    ...
+    ... [a]
+    ... recipe = recipe
+    ... sleep = 1
+    ...
+    ... [b]
+    ... recipe = recipe
+    ... needs = a
+    ... after = ${a:recipe}
+    ...
+    ... [c]
+    ... recipe = recipe
+    ... ''')
+
+    >>> print_('\\n'.join(sorted(system(buildout+' -j 3').splitlines())))
+    Develop: '/sample-buildout/recipe'
+    Installing b.
+    Installing c.
+    Updating a.
+    >>> installed()
+    ['a', 'b', 'c'] ['a', 'b', 'buildout', 'c']
+
+An invalid number of jobs is an error:
+
+    >>> print_(system(buildout+' -j 0'), end='')
+    While:
+      Initializing.
+    Error: Invalid number of jobs 0
+
+Other options giving numbers are checked the same way:
+
+    >>> for option in ('download-jobs=x', 'download-segments=0',
+    ...                'http-connections-per-host=-1',
+    ...                'http-connections-per-host=0'):
+    ...     print_(system(buildout+' '+option), end='')
+    While:
+      Initializing.
+    Error: Invalid number of download jobs x
+    While:
+      Initializing.
+    Error: Invalid number of download segments 0
+    While:
+      Initializing.
+    Error: Invalid number of http connections per host -1
+    Develop: '/sample-buildout/recipe'
+    Updating a.
+    Updating b.
+    Updating c.
+    """
+
+def picked_versions_of_parts_installed_in_parallel():
+    """
+Versions picked by recipes run in child processes are reported, like
+the ones picked by recipes run by buildout itself:
+
+    >>> mkdir('recipe')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe',
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+    >>> write('recipe', 'recipe.py',
+    ... '''
+    ... import zc.buildout.easy_install
+    ... class Recipe:
+    ...     def __init__(self, buildout, name, options):
+    ...         self.buildout, self.options = buildout, options
+    ...     def install(self):
+    ...         zc.buildout.easy_install.install(
+    ...             [self.options['egg']],
+    ...             self.buildout['buildout']['eggs-directory'],
+    ...             links=[self.options['link']],
+    ...             index=self.options['link'] + 'index/')
+    ...         return ()
+    ...     update = install
+    ... ''')
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = a b
+    ... jobs = 2
+    ... show-picked-versions = true
+    ...
+    ... [a]
+    ... recipe = recipe
+    ... egg = demo ==0.2
+    ... link = %(link_server)s
+    ...
+    ... [b]
+    ... recipe = recipe
+    ... egg = demoneeded ==1.1
+    ... link = %(link_server)s
+    ... ''' % globals())
+    >>> print_(system(buildout), end='') # doctest: +ELLIPSIS
+    Develop: '/sample-buildout/recipe'
+    ...
+    Versions had to be automatically picked.
+    The following part definition lists the versions picked:
+    [versions]
+    <BLANKLINE>
+    # Required by:
+    # demo==0.2
+    demoneeded = 1.1
+    ...
+    """
+
+def wait_for_child_done_but_not_exited():
+    """
+Children write to a pipe when they are done.  If one didn't exit yet,
+the parent waits for it instead of polling until it does:
+
+    >>> import time
+    >>> from zc.buildout.buildout import _wait_child
+    >>> done_r, done_w = os.pipe()
+    >>> pid = os.fork()
+    >>> if not pid:
+    ...     try:
+    ...         os.write(done_w, b'.')
+    ...         time.sleep(1)
+    ...     finally:
+    ...         os._exit(3)
+    >>> os.close(done_w)
+
+    >>> waitpid = os.waitpid
+    >>> calls = []
+    >>> def counting_waitpid(pid, options):
+    ...     calls.append(options)
+    ...     return waitpid(pid, options)
+    >>> os.waitpid = counting_waitpid
+    >>> _wait_child({pid: ('part', done_r)}) == (pid, 3 << 8)
+    True
+    >>> os.waitpid = waitpid
+    >>> len(calls) < 10
+    True
+    >>> os.close(done_r)
+    """
+
+def parse_cache():
+    """
+With the parse-cache option, parsed configuration files are kept in a
+directory and reused as long as they don't change.  Like extends-cache,
+the option applies to the files extended by the file defining it:
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... extends = base.cfg
+    ... parse-cache = parse-cache
+    ... ''')
+
+    >>> write('base.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ...
+    ... [x]
+    ... y = 1
+    ...
+    ... [x:os.environ.get('PARSE_CACHE_TEST') == '2']
+    ... y = 2
+    ... ''')
+
+Files modified in the last seconds aren't cached, so let's make it
+older:
+
+    >>> import os, time
+    >>> old = time.time() - 60
+    >>> os.utime('base.cfg', (old, old))
+    >>> from zc.buildout.buildout import Buildout
+    >>> Buildout('buildout.cfg', [])['x']['y']
+    '1'
+    >>> len(os.listdir('parse-cache'))
+    1
+
+The result of section expressions is checked when a cached file is
+used:
+
+    >>> os.environ['PARSE_CACHE_TEST'] = '2'
+    >>> Buildout('buildout.cfg', [])['x']['y']
+    '2'
+    >>> del os.environ['PARSE_CACHE_TEST']
+    >>> Buildout('buildout.cfg', [])['x']['y']
+    '1'
+
+Changing the file also invalidates the cache:
+
+    >>> write('base.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ...
+    ... [x]
+    ... y = 3
+    ... ''')
+    >>> os.utime('base.cfg', (old, old))
+    >>> Buildout('buildout.cfg', [])['x']['y']
+    '3'
+    >>> len(os.listdir('parse-cache'))
+    1
+
+A file modified in the last seconds could change again without its
+size and modification time changing, so its cached result isn't used
+nor replaced:
+
+    >>> now = int(time.time())
+    >>> template = '''
+    ... [buildout]
+    ... parts =
+    ...
+    ... [x]
+    ... y = %s
+    ... '''
+    >>> for y in '45':
+    ...     write('base.cfg', template % y)
+    ...     os.utime('base.cfg', (now, now))
+    ...     print_(Buildout('buildout.cfg', [])['x']['y'])
+    4
+    5
+    >>> os.utime('base.cfg', (old - 60, old - 60))
+    >>> Buildout('buildout.cfg', [])['x']['y']
+    '5'
+    """
+
+def substitution_templates_are_compiled_once():
+    """
+Values are split into literal text and references only once, and the
+result is shared by all sections using the same raw value:
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ...
+    ... [a]
+    ... x = ${b:y} $${c:z} ${:name}
+    ... name = a
+    ...
+    ... [b]
+    ... y = 1
+    ... name = b
+    ... x = ${b:y} $${c:z} ${:name}
+    ... ''')
+
+    >>> from zc.buildout.buildout import Buildout, Options
+    >>> Options._compiled.clear()
+    >>> buildout_ = Buildout('buildout.cfg', [])
+    >>> buildout_['a']['x'], buildout_['b']['x']
+    ('1 ${c:z} a', '1 ${c:z} b')
+    >>> for (literals, refs) in Options._compiled['${b:y} $${c:z} ${:name}']:
+    ...     print_(literals, refs)
+    ('', ' ') (('b', 'y'),)
+    ('{c:z} ', '') (('', 'name'),)
+
+Errors are reported in the order of the references, so an invalid
+reference isn't reported before the expansion of earlier ones fails:
+
+    >>> for template in ('${b:nope} ${b:y:z}', '${b:y} ${b:y:z}'):
+    ...     try:
+    ...         buildout_['a']._sub(template, set())
+    ...     except zc.buildout.UserError:
+    ...         print_(sys.exc_info()[1])
+    Referenced option does not exist: b nope
+    The substitution, ${b:y:z},
+    has too many colons.
+
+    """
+
+def part_signatures_resolve_each_recipe_once():
+    """
+Recipes shared by several parts are resolved once when computing part
+signatures, and dependency sections are hashed once, until they get a
+signature of their own:
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = a b c e
+    ...
+    ... [a]
+    ... recipe = zc.buildout:debug
+    ... x = ${d:y}
+    ...
+    ... [b]
+    ... recipe = zc.buildout:debug
+    ... x = ${d:y} ${c:x}
+    ...
+    ... [c]
+    ... recipe = zc.buildout:debug
+    ... x = ${d:y}
+    ...
+    ... [d]
+    ... y = 1
+    ...
+    ... [e]
+    ... recipe = zc.buildout:debug
+    ... x = ${c:x}
+    ... ''')
+
+    >>> from zc.buildout.buildout import Buildout
+    >>> buildout_ = Buildout('buildout.cfg', [])
+    >>> for part in 'abce':
+    ...     _ = buildout_[part]
+    >>> resolve = pkg_resources.working_set.resolve
+    >>> resolved = []
+    >>> def counting_resolve(requirements, *args, **kw):
+    ...     resolved.extend(requirements)
+    ...     return resolve(requirements, *args, **kw)
+    >>> pkg_resources.working_set.resolve = counting_resolve
+    >>> buildout_._compute_part_signatures(['a', 'b', 'c', 'e'])
+    >>> pkg_resources.working_set.resolve = resolve
+    >>> resolved
+    [Requirement.parse('zc.buildout')]
+
+    >>> def sig(part):
+    ...     return [s for s in buildout_[part]['__buildout_signature__'].split()
+    ...             if ':' in s]
+    >>> sig('a') == sig('c') != sig('b')
+    True
+    >>> import hashlib
+    >>> def digest(section):
+    ...     m = hashlib.md5()
+    ...     for item in sorted(buildout_[section].items()):
+    ...         m.update(('%r\\0%r\\0' % item).encode())
+    ...     return section + ':' + m.hexdigest()
+    >>> sig('a') == [digest('d')]
+    True
+    >>> sig('e') == [digest('c')]
+    True
+    >>> del buildout_['c']._data['__buildout_signature__']
+    >>> sig('b') == [digest('c'), digest('d')]
+    True
+    """
+
+def benchmark():
+    """
+The benchmark suite generates a synthetic profile and times the steps of
+a run that don't install anything:
+
+    >>> import zc.buildout.benchmark
+    >>> zc.buildout.benchmark.main(['--sections', '10', '--repeat', '2',
+    ...                             '--extends', '2', '--develop', '1'])
+    ... # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
+    profile: density=1.0, develop=1, extends=2, options=20, remote=False,
+             sections=10
+    load         first: ...s  best: ...s  mean: ...s
+    open         first: ...s  best: ...s  mean: ...s
+    initialize   first: ...s  best: ...s  mean: ...s
+    signatures   first: ...s  best: ...s  mean: ...s
+    save         first: ...s  best: ...s  mean: ...s
+    develop-hash first: ...s  best: ...s  mean: ...s
+
+Extended files can be served by a local server, benchmarks can be
+selected, and results can be saved as JSON:
+
+    >>> zc.buildout.benchmark.main(['--sections', '10', '--repeat', '2',
+    ...                             '--remote', '--json', 'results.json',
+    ...                             'load', 'open'])
+    >>> import json
+    >>> with open('results.json') as f:
+    ...     results = json.load(f)
+    >>> print_(' '.join(sorted(results)))
+    benchmarks profile python time version
+    >>> results['profile']['remote']
+    True
+    >>> for result in results['benchmarks']:
+    ...     print_(result['name'], len(result['timings']),
+    ...            result['best'] <= result['mean'])
+    load 2 True
+    open 2 True
+    """
+
+def profile_run():
+    """
+The --profile-run option records the time spent in each phase of a run
+and in each part, and writes a report in the trace event format:
+
+    >>> mkdir('recipe')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe',
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+
+    >>> write('recipe', 'recipe.py',
+    ... '''
+    ... class Recipe:
+    ...     def __init__(self, buildout, name, options):
+    ...         self.options = options
+    ...     def install(self):
+    ...         open(self.options['path'], 'w').close()
+    ...         return self.options['path']
+    ...     update = install
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = a b
+    ...
+    ... [a]
+    ... recipe = recipe
+    ... path = a
+    ...
+    ... [b]
+    ... recipe = recipe
+    ... path = b
+    ... ''')
+
+    >>> print_(system(buildout+' --profile-run timing.json'), end='')
+    Develop: '/sample-buildout/recipe'
+    Installing a.
+    Installing b.
+
+    >>> import json
+    >>> with open('timing.json') as f:
+    ...     report = json.load(f)
+    >>> events = report['traceEvents']
+    >>> for event in events:
+    ...     if event['cat'] == 'part':
+    ...         print_(event['name'], event['args']['part'])
+    install a
+    install b
+    >>> names = set(event['name'] for event in events)
+    >>> sorted(name for name in ('initialize', 'load configuration', 'develop',
+    ...                          'signatures', 'install', 'subprocess')
+    ...        if name not in names)
+    []
+    >>> event = events[-1]
+    >>> print_(event['name'], event['ph'], event['dur'] >= 0,
+    ...        ' '.join(sorted(event['args'])))
+    install X True children_cpu cpu
+
+A summary of the time spent by kind of phase is also included:
+
+    >>> for total in report['phases']:
+    ...     if total['category'] == 'part':
+    ...         print_(total['name'], total['count'])
+    install 2
+
+Parts installed in parallel are timed in their processes:
+
+    >>> remove('timing.json')
+    >>> print_('\\n'.join(sorted(system(
+    ...     buildout+' -j2 --profile-run timing.json a:path=c').splitlines())))
+    Develop: '/sample-buildout/recipe'
+    Installing a.
+    Uninstalling a.
+    Updating b.
+    >>> with open('timing.json') as f:
+    ...     events = json.load(f)['traceEvents']
+    >>> for name, part in sorted((event['name'], event['args']['part'])
+    ...                          for event in events
+    ...                          if event['cat'] == 'part'):
+    ...     print_(name, part)
+    install a
+    uninstall a
+    update b
+    >>> pids = set(event['pid'] for event in events)
+    >>> len(pids)
+    3
+    """
+
+def installed_format_sqlite():
+    """
+With installed-format set to sqlite, the options of installed parts are
+saved in an sqlite database rather than a configuration file:
+
+    >>> mkdir('recipe')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe',
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+
+    >>> write('recipe', 'recipe.py',
+    ... '''
+    ... class Recipe:
+    ...     def __init__(self, buildout, name, options):
+    ...         self.options = options
+    ...     def install(self):
+    ...         open(self.options['path'], 'w').close()
+    ...         return self.options['path']
+    ...     update = install
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = a b
+    ... installed-format = sqlite
+    ...
+    ... [a]
+    ... recipe = recipe
+    ... path = a
+    ...
+    ... [b]
+    ... recipe = recipe
+    ... path = b
+    ... ''')
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipe'
+    Installing a.
+    Installing b.
+    >>> with open('.installed.cfg', 'rb') as f:
+    ...     f.read(15) == b'SQLite format 3'
+    True
+
+Parts are read from the database as they are used:
+
+    >>> from zc.buildout.buildout import Buildout
+    >>> installed = Buildout('buildout.cfg', [])._read_installed_part_options()
+    >>> sorted(installed), len(installed)
+    (['a', 'b', 'buildout'], 3)
+    >>> sorted(installed._loaded)
+    []
+    >>> 'a' in installed, 'c' in installed, installed.get('c')
+    (True, False, None)
+    >>> print_(installed['a']['__buildout_installed__'])
+    a
+    >>> sorted(installed._loaded)
+    ['a']
+
+Only the sections whose installed options changed are written when
+saving, so that saving doesn't depend on the number of parts:
+
+    >>> from zc.buildout.buildout import _save_installed
+    >>> installed['a']['path'] = installed['b']['path'] = 'changed'
+    >>> sorted(_save_installed('.installed.cfg', installed, installed.saved,
+    ...                        set(['b'])))
+    ['a', 'b', 'buildout']
+    >>> installed = Buildout('buildout.cfg', [])._read_installed_part_options()
+    >>> print_(installed['a']['path'], installed['b']['path'])
+    a changed
+
+    >>> print_(system(buildout+' b:path=c'), end='')
+    Develop: '/sample-buildout/recipe'
+    Uninstalling b.
+    Updating a.
+    Installing b.
+    >>> ls('.')
+    -  .installed.cfg
+    -  a
+    d  bin
+    -  buildout.cfg
+    -  c
+    d  develop-eggs
+    d  eggs
+    d  parts
+    d  recipe
+
+Going back to the default format converts the file:
+
+    >>> print_(system(buildout+' installed-format=cfg'), end='')
+    Develop: '/sample-buildout/recipe'
+    Uninstalling b.
+    Updating a.
+    Installing b.
+    >>> cat('.installed.cfg') # doctest: +ELLIPSIS
+    [buildout]
+    installed_develop_eggs = /sample-buildout/develop-eggs/recipe.egg-link
+    parts = a b
+    <BLANKLINE>
+    [a]
+    __buildout_installed__ = a
+    ...
+
+Other formats are rejected:
+
+    >>> print_(system(buildout+' installed-format=xml'), end='')
+    While:
+      Initializing.
+    Error: Invalid installed-format xml
+    """
+
+def check_installed_files():
+    """
+Parts whose options didn't change are reinstalled if some of their
+installed files are missing.  The check-installed-files option selects
+how this is checked: ``all`` files one after the other (the default),
+``parallel`` using threads, or only the ``roots``, i.e. files that
+aren't inside an installed directory:
+
+    >>> mkdir('recipe')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe',
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+
+    >>> write('recipe', 'recipe.py',
+    ... '''
+    ... import os
+    ... class Recipe:
+    ...     def __init__(self, buildout, name, options):
+    ...         self.name = name
+    ...     def install(self):
+    ...         os.mkdir(self.name)
+    ...         paths = [self.name]
+    ...         for i in range(3):
+    ...             path = os.path.join(self.name, str(i))
+    ...             open(path, 'w').close()
+    ...             paths.append(path)
+    ...         return paths
+    ...     def update(self):
+    ...         pass
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = a
+    ...
+    ... [a]
+    ... recipe = recipe
+    ... ''')
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipe'
+    Installing a.
+
+    >>> remove('a', '1')
+    >>> print_(system(buildout+' check-installed-files=roots'), end='')
+    Develop: '/sample-buildout/recipe'
+    Updating a.
+    >>> print_(system(buildout+' check-installed-files=parallel'), end='')
+    Develop: '/sample-buildout/recipe'
+    Uninstalling a.
+    Installing a.
+    >>> print_(system(buildout+' check-installed-files=parallel'), end='')
+    Develop: '/sample-buildout/recipe'
+    Updating a.
+
+    >>> remove('a', '1')
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipe'
+    Uninstalling a.
+    Installing a.
+
+    >>> remove('a')
+    >>> print_(system(buildout+' check-installed-files=roots'), end='')
+    Develop: '/sample-buildout/recipe'
+    Uninstalling a.
+    Installing a.
+
+    >>> print_(system(buildout+' check-installed-files=some'), end='')
+    While:
+      Initializing.
+    Error: Invalid check-installed-files some
+
+The threads are created once and used for the checks of all parts:
+
+    >>> buildout_ = zc.buildout.buildout.Buildout(
+    ...     'buildout.cfg',
+    ...     [('buildout', 'check-installed-files', 'parallel')])
+    >>> files = 'a\\na/0\\na/1\\na/2'
+    >>> buildout_._installed_files_exist(files)
+    True
+    >>> pool = buildout_._check_pool
+    >>> buildout_._installed_files_exist(files + '\\na/3')
+    False
+    >>> buildout_._check_pool is pool
+    True
+    >>> buildout_._close_check_pool()
+    >>> buildout_._check_pool is None
+    True
+
+    >>> from zc.buildout.buildout import _installed_roots
+    >>> _installed_roots(['/a', '/a/b', '/a/b/c', '/ab', 'd', 'd/e'])
+    ['/a', '/ab', 'd']
+    """
+
+def uninstall_jobs_and_trash():
+    """
+The uninstall-jobs option sets the number of threads removing the files
+of directories installed by parts.  With uninstall-trash, directories
+are moved to a trash directory and removed in the background while
+parts get installed:
+
+    >>> mkdir('recipe')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe',
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+
+    >>> write('recipe', 'recipe.py',
+    ... '''
+    ... import os
+    ... class Recipe:
+    ...     def __init__(self, buildout, name, options):
+    ...         self.name, self.options = name, options
+    ...     def install(self):
+    ...         print(sorted(os.listdir('.')))
+    ...         for i in range(int(self.options['n'])):
+    ...             path = os.path.join(self.name, str(i))
+    ...             os.makedirs(path)
+    ...             open(os.path.join(path, 'f'), 'w').close()
+    ...         return self.name
+    ...     update = install
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = a
+    ... uninstall-jobs = 4
+    ... uninstall-trash = true
+    ...
+    ... [a]
+    ... recipe = recipe
+    ... n = 20
+    ... ''')
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipe'
+    Installing a.
+    ['bin', 'buildout.cfg', 'develop-eggs', 'eggs', 'parts', 'recipe']
+
+Directories left in the trash by interrupted runs are removed too:
+
+    >>> mkdir('.trash')
+    >>> mkdir('.trash', 'old')
+    >>> print_(system(buildout+' a:n=3'), end='')
+    Develop: '/sample-buildout/recipe'
+    Uninstalling a.
+    Installing a.
+    ['.installed.cfg', '.trash', 'bin', 'buildout.cfg', 'develop-eggs', 'eggs', 'parts', 'recipe']
+    >>> ls('a')
+    d  0
+    d  1
+    d  2
+    >>> os.path.exists('.trash')
+    False
+
+    >>> print_(system(buildout+' uninstall-jobs=0'), end='')
+    While:
+      Initializing.
+    Error: Invalid number of uninstall jobs 0
+    """
+
+def redo_pyc_compiles_in_batch():
+    """
+When installing eggs, modules that were compiled are compiled again, in
+the installing process, and for the other optimization level, in a
+single interpreter per egg:
+
+    >>> mkdir('egg')
+    >>> mkdir('egg', 'pkg')
+    >>> for name in ('a', 'b', 'bad'):
+    ...     write('egg', 'pkg', name + '.py', 'x = 1\\n')
+    ...     write('egg', 'pkg', name + '.pyc', '')
+    >>> write('egg', 'pkg', 'bad.py', 'x = \\n')
+    >>> write('egg', 'pkg', 'c.py', 'x = 1\\n')
+
+    >>> def compiled(name):
+    ...     path = join('egg', 'pkg', name + '.py')
+    ...     if sys.version_info < (3, 2):
+    ...         paths = path + 'c', path + 'o'
+    ...     else:
+    ...         import importlib.util
+    ...         paths = (importlib.util.cache_from_source(path, False),
+    ...                  importlib.util.cache_from_source(path, True))
+    ...     return [os.path.exists(p) for p in paths]
+
+    >>> calls = []
+    >>> import subprocess
+    >>> Popen = subprocess.Popen
+    >>> def counting_Popen(*args, **kw):
+    ...     calls.append(args)
+    ...     return Popen(*args, **kw)
+    >>> subprocess.Popen = counting_Popen
+    >>> from zope.testing.loggingsupport import InstalledHandler
+    >>> handler = InstalledHandler('zc.buildout.easy_install')
+    >>> import logging
+    >>> logger = logging.getLogger('zc.buildout.easy_install')
+    >>> logger.propagate = False
+    >>> zc.buildout.easy_install.redo_pyc('egg')
+    >>> subprocess.Popen = Popen
+    >>> print_(handler)
+    zc.buildout.easy_install WARNING
+      Couldn't compile egg/pkg/bad.py
+    >>> handler.uninstall()
+    >>> logger.propagate = True
+    >>> len(calls) == (sys.version_info < (3, 2))
+    True
+
+    >>> compiled('a'), compiled('b'), compiled('c'), compiled('bad')
+    ([True, True], [True, True], [False, False], [False, False])
+    """
+
+def skip_if_unchanged():
+    """
+With the skip-if-unchanged option, buildout saves a fingerprint of the
+installation and doesn't even load recipes if nothing changed since
+the last run.  This is only done when newest is false:
+
+    >>> mkdir('recipe')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe',
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+
+    >>> write('recipe', 'recipe.py',
+    ... '''
+    ... class Recipe:
+    ...     def __init__(self, buildout, name, options):
+    ...         self.name, self.options = name, options
+    ...         options.get('x')
+    ...     def install(self):
+    ...         open(self.name, 'w').close()
+    ...         return self.name
+    ...     def update(self):
+    ...         print('%s updated' % self.name)
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = a
+    ... newest = false
+    ... skip-if-unchanged = true
+    ...
+    ... [a]
+    ... recipe = recipe
+    ... ''')
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipe'
+    Installing a.
+    >>> print_(system(buildout), end='')
+    Nothing changed.
+
+Changes to the configuration, on the command line, in develop
+directories or in installed files are detected:
+
+    >>> print_(system(buildout+' a:x=1'), end='')
+    Develop: '/sample-buildout/recipe'
+    Uninstalling a.
+    Installing a.
+    >>> print_(system(buildout+' a:x=1'), end='')
+    Nothing changed.
+
+    >>> write('recipe', 'README.txt', '')
+    >>> print_(system(buildout+' a:x=1'), end='')
+    Develop: '/sample-buildout/recipe'
+    Uninstalling a.
+    Installing a.
+    >>> print_(system(buildout+' a:x=1'), end='')
+    Nothing changed.
+
+    >>> remove('a')
+    >>> print_(system(buildout+' a:x=1'), end='')
+    Develop: '/sample-buildout/recipe'
+    Uninstalling a.
+    Installing a.
+
+The check is not done when newest is true:
+
+    >>> print_(system(buildout+' -n a:x=1'), end='')
+    Develop: '/sample-buildout/recipe'
+    Updating a.
+    a updated
+
+The digests of the files of develop directories are indexed next to
+the installed file, so that they aren't read again while they don't
+change.  Files modified in the last seconds aren't indexed, so let's
+make them older:
+
+    >>> import time
+    >>> old = time.time() - 60
+    >>> for dirpath, dirnames, filenames in os.walk('recipe'):
+    ...     for name in filenames:
+    ...         os.utime(os.path.join(dirpath, name), (old, old))
+    >>> buildout_ = zc.buildout.buildout.Buildout(
+    ...     'buildout.cfg', [('a', 'x', '1')])
+    >>> fingerprint = buildout_._fingerprint()
+    >>> len(os.listdir('.installed.cfg.dir-hashes'))
+    1
+
+    >>> file_hash_update = zc.buildout.buildout._file_hash_update
+    >>> read = []
+    >>> def recording_file_hash_update(hash, path):
+    ...     read.append(path)
+    ...     file_hash_update(hash, path)
+    >>> zc.buildout.buildout._file_hash_update = recording_file_hash_update
+    >>> buildout_._fingerprint() == fingerprint
+    True
+    >>> read
+    []
+    >>> zc.buildout.buildout._file_hash_update = file_hash_update
+    """
+
+def prefetch_remote_extends():
+    """
+With the download-jobs option, remote files in the extends tree are
+downloaded concurrently before being merged in the usual order:
+
+    >>> server_data = tmpdir('server_data')
+    >>> server_url = start_server(server_data)
+    >>> write(server_data, 'a.cfg',
+    ... '''
+    ... [buildout]
+    ... extends = c.cfg
+    ... [x]
+    ... a = a
+    ... y = a
+    ... ''')
+    >>> write(server_data, 'b.cfg',
+    ... '''
+    ... [x]
+    ... b = b
+    ... y = b
+    ... ''')
+    >>> write(server_data, 'c.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ... [x]
+    ... c = c
+    ... y = c
+    ... ''')
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... extends = %(url)sa.cfg %(url)sb.cfg
+    ... download-jobs = 2
+    ... ''' % dict(url=server_url))
+
+    >>> import zc.buildout.buildout
+    >>> zc.buildout.buildout._open_download_cache.clear()
+    >>> sorted(zc.buildout.buildout.Buildout('buildout.cfg', [])['x'].items())
+    [('a', 'a'), ('b', 'b'), ('c', 'c'), ('y', 'b')]
+    >>> sorted(url[len(server_url):]
+    ...        for url in zc.buildout.buildout._open_download_cache)
+    ['a.cfg', 'b.cfg', 'c.cfg']
+
+Each file is parsed once, the files found when prefetching being
+reused when they are opened:
+
+    >>> import zc.buildout.configparser
+    >>> parse = zc.buildout.configparser.parse
+    >>> parsed = []
+    >>> def counting_parse(fp, fpname, *args):
+    ...     parsed.append(os.path.basename(fpname))
+    ...     return parse(fp, fpname, *args)
+    >>> zc.buildout.configparser.parse = counting_parse
+    >>> zc.buildout.buildout._open_download_cache.clear()
+    >>> _ = zc.buildout.buildout.Buildout('buildout.cfg', [])
+    ... # doctest: +ELLIPSIS
+    Downloading ...
+    >>> zc.buildout.configparser.parse = parse
+    >>> sorted(parsed)
+    ['a.cfg', 'b.cfg', 'buildout.cfg', 'c.cfg']
+
+Recursive includes are still detected:
+
+    >>> write(server_data, 'c.cfg',
+    ... '''
+    ... [buildout]
+    ... extends = a.cfg
+    ... ''')
+    >>> zc.buildout.buildout._open_download_cache.clear()
+    >>> print_(system(buildout), end='') # doctest: +ELLIPSIS
+    While:
+      Initializing.
+    Error: Recursive file include [...] http://localhost:.../a.cfg
+
+Files that can't be downloaded are only tried once when prefetching,
+then again when they are opened, which reports the error:
+
+    >>> write(server_data, 'c.cfg',
+    ... '''
+    ... [buildout]
+    ... extends = missing.cfg
+    ... ''')
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... extends = %(url)sc.cfg
+    ... download-jobs = 2
+    ... ''' % dict(url=server_url))
+    >>> zc.buildout.buildout._open_download_cache.clear()
+    >>> from zc.buildout.download import Download
+    >>> download_call = Download.__call__
+    >>> downloads = []
+    >>> def call(self, url, *args, **kw):
+    ...     downloads.append(url[len(server_url):])
+    ...     return download_call(self, url, *args, **kw)
+    >>> Download.__call__ = call
+    >>> try:
+    ...     zc.buildout.buildout.Buildout('buildout.cfg', [])
+    ... except zc.buildout.UserError:
+    ...     print_(sys.exc_info()[1]) # doctest: +ELLIPSIS
+    Downloading ...
+    Error downloading extends for URL http://localhost:.../missing.cfg: ...
+    >>> Download.__call__ = download_call
+    >>> downloads
+    ['c.cfg', 'missing.cfg', 'missing.cfg']
+
+    >>> zc.buildout.buildout._open_download_cache.clear()
+    """
+
+def log_when_there_are_not_local_distros():
+    """
+    >>> from zope.testing.loggingsupport import InstalledHandler
+    >>> handler = InstalledHandler('zc.buildout.easy_install')
+    >>> import logging
+    >>> logger = logging.getLogger('zc.buildout.easy_install')
+    >>> old_propogate = logger.propagate
+    >>> logger.propagate = False
+
+    >>> dest = tmpdir('sample-install')
+    >>> import zc.buildout.easy_install
+    >>> ws = zc.buildout.easy_install.install(
+    ...     ['demo==0.2'], dest,
+    ...     links=[link_server], index=link_server+'index/')
+
+    >>> print_(handler) # doctest: +ELLIPSIS
+    zc.buildout.easy_install DEBUG
+      Installing 'demo==0.2'.
+    zc.buildout.easy_install DEBUG
+      We have no distributions for demo that satisfies 'demo==0.2'.
+    ...
+
+    >>> handler.uninstall()
+    >>> logger.propagate = old_propogate
+
+    """
+
+def internal_errors():
+    """Internal errors are clearly marked and don't generate tracebacks:
+
+    >>> mkdir(sample_buildout, 'recipes')
+
+    >>> write(sample_buildout, 'recipes', 'mkdir.py',
+    ... '''
+    ... class Mkdir:
+    ...     def __init__(self, buildout, name, options):
+    ...         self.name, self.options = name, options
+    ...         options['path'] = os.path.join(
+    ...                               buildout['buildout']['directory'],
+    ...                               options['path'],
+    ...                               )
+    ... ''')
+
+    >>> write(sample_buildout, 'recipes', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name = "recipes",
+    ...       entry_points = {'zc.buildout': ['mkdir = mkdir:Mkdir']},
+    ...       )
+    ... ''')
+
+    >>> write(sample_buildout, 'buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipes
+    ... parts = data-dir
+    ...
+    ... [data-dir]
+    ... recipe = recipes:mkdir
+    ... ''')
+
+    >>> print_(system(buildout), end='') # doctest: +ELLIPSIS
+    Develop: '/sample-buildout/recipes'
+    While:
+      Installing.
+      Getting section data-dir.
+      Initializing section data-dir.
+    <BLANKLINE>
+    An internal error occurred due to a bug in either zc.buildout or in a
+    recipe being used:
+    Traceback (most recent call last):
+    ...
+    NameError: global name 'os' is not defined
+    """
+
+def whine_about_unused_options():
+    '''
+
+    >>> write('foo.py',
+    ... """
+    ... class Foo:
+    ...
+    ...     def __init__(self, buildout, name, options):
+    ...         self.name, self.options = name, options
+    ...         options['x']
+    ...
+    ...     def install(self):
+    ...         self.options['y']
+    ...         return ()
+    ... """)
+
+    >>> write('setup.py',
+    ... """
+    ... from setuptools import setup
+    ... setup(name = "foo",
+    ...       entry_points = {'zc.buildout': ['default = foo:Foo']},
+    ...       )
+    ... """)
+
+    >>> write('buildout.cfg',
+    ... """
+    ... [buildout]
+    ... develop = .
+    ... parts = foo
+    ... a = 1
+    ...
+    ... [foo]
+    ... recipe = foo
+    ... x = 1
+    ... y = 1
+    ... z = 1
+    ... """)
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/.'
+    Unused options for buildout: 'a'.
+    Installing foo.
+    Unused options for foo: 'z'.
+    '''
+
+def abnormal_exit():
+    """
+People sometimes hit control-c while running a builout. We need to make
+sure that the installed database Isn't corrupted.  To test this, we'll create
+some evil recipes that exit uncleanly:
+
+    >>> mkdir('recipes')
+    >>> write('recipes', 'recipes.py',
+    ... '''
+    ... import sys
+    ...
+    ... class Clean:
+    ...     def __init__(*_): pass
+    ...     def install(_): return ()
+    ...     def update(_): pass
+    ...
+    ... class EvilInstall(Clean):
+    ...     def install(_): sys.exit(1)
+    ...
+    ... class EvilUpdate(Clean):
+    ...     def update(_): sys.exit(1)
+    ... ''')
+
+    >>> write('recipes', 'setup.py',
+    ... '''
+    ... import setuptools
+    ... setuptools.setup(name='recipes',
+    ...    entry_points = {
+    ...      'zc.buildout': [
+    ...          'clean = recipes:Clean',
+    ...          'evil_install = recipes:EvilInstall',
+    ...          'evil_update = recipes:EvilUpdate',
+    ...          'evil_uninstall = recipes:Clean',
+    ...          ],
+    ...       },
+    ...     )
+    ... ''')
+
+Now let's look at 3 cases:
+
+1. We exit during installation after installing some other parts:
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipes
+    ... parts = p1 p2 p3 p4
+    ...
+    ... [p1]
+    ... recipe = recipes:clean
+    ...
+    ... [p2]
+    ... recipe = recipes:clean
+    ...
+    ... [p3]
+    ... recipe = recipes:evil_install
+    ...
+    ... [p4]
+    ... recipe = recipes:clean
+    ... ''')
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipes'
+    Installing p1.
+    Installing p2.
+    Installing p3.
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipes'
+    Updating p1.
+    Updating p2.
+    Installing p3.
+
+    >>> print_(system(buildout+' buildout:parts='), end='')
+    Develop: '/sample-buildout/recipes'
+    Uninstalling p2.
+    Uninstalling p1.
+
+2. We exit while updating:
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipes
+    ... parts = p1 p2 p3 p4
+    ...
+    ... [p1]
+    ... recipe = recipes:clean
+    ...
+    ... [p2]
+    ... recipe = recipes:clean
+    ...
+    ... [p3]
+    ... recipe = recipes:evil_update
+    ...
+    ... [p4]
+    ... recipe = recipes:clean
+    ... ''')
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipes'
+    Installing p1.
+    Installing p2.
+    Installing p3.
+    Installing p4.
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipes'
+    Updating p1.
+    Updating p2.
+    Updating p3.
+
+    >>> print_(system(buildout+' buildout:parts='), end='')
+    Develop: '/sample-buildout/recipes'
+    Uninstalling p4.
+    Uninstalling p3.
+    Uninstalling p2.
+    Uninstalling p1.
+
+3. We exit while installing or updating after uninstalling:
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipes
+    ... parts = p1 p2 p3 p4
+    ...
+    ... [p1]
+    ... recipe = recipes:evil_update
+    ...
+    ... [p2]
+    ... recipe = recipes:clean
+    ...
+    ... [p3]
+    ... recipe = recipes:clean
+    ...
+    ... [p4]
+    ... recipe = recipes:clean
+    ... ''')
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipes'
+    Installing p1.
+    Installing p2.
+    Installing p3.
+    Installing p4.
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipes
+    ... parts = p1 p2 p3 p4
+    ...
+    ... [p1]
+    ... recipe = recipes:evil_update
+    ...
+    ... [p2]
+    ... recipe = recipes:clean
+    ...
+    ... [p3]
+    ... recipe = recipes:clean
+    ...
+    ... [p4]
+    ... recipe = recipes:clean
+    ... x = 1
+    ... ''')
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipes'
+    Uninstalling p4.
+    Updating p1.
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipes
+    ... parts = p1 p2 p3 p4
+    ...
+    ... [p1]
+    ... recipe = recipes:clean
+    ...
+    ... [p2]
+    ... recipe = recipes:clean
+    ...
+    ... [p3]
+    ... recipe = recipes:clean
+    ...
+    ... [p4]
+    ... recipe = recipes:clean
+    ... ''')
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipes'
+    Uninstalling p1.
+    Installing p1.
+    Updating p2.
+    Updating p3.
+    Installing p4.
+
+    """
+
+def install_source_dist_with_bad_py():
+    r"""
+
+    >>> mkdir('badegg')
+    >>> mkdir('badegg', 'badegg')
+    >>> write('badegg', 'badegg', '__init__.py', '#\\n')
+    >>> mkdir('badegg', 'badegg', 'scripts')
+    >>> write('badegg', 'badegg', 'scripts', '__init__.py', '#\\n')
+    >>> write('badegg', 'badegg', 'scripts', 'one.py',
+    ... '''
+    ... return 1
+    ... ''')
+
+    >>> write('badegg', 'setup.py',
+    ... '''
+    ... from setuptools import setup, find_packages
+    ... setup(
+    ...     name='badegg',
+    ...     version='1',
+    ...     packages = find_packages('.'),
+    ...     zip_safe=False)
+    ... ''')
+
+    >>> print_(system(buildout+' setup badegg sdist'), end='') # doctest: +ELLIPSIS
+    Running setup script 'badegg/setup.py'.
+    ...
+
+    >>> dist = join('badegg', 'dist')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = eggs bo
+    ... find-links = %(dist)s
+    ...
+    ... [eggs]
+    ... recipe = zc.recipe.egg
+    ... eggs = badegg
+    ...
+    ... [bo]
+    ... recipe = zc.recipe.egg
+    ... eggs = zc.buildout
+    ... scripts = buildout=bo
+    ... ''' % globals())
+
+    >>> print_(system(buildout));print_('X') # doctest: +ELLIPSIS
+    Installing eggs.
+    Getting distribution for 'badegg'.
+    Got badegg 1.
+    Installing bo.
+    ...
+    SyntaxError: ...'return' outside function...
+    ...
+    SyntaxError: ...'return' outside function...
+    ...
+
+    >>> ls('eggs') # doctest: +ELLIPSIS
+    d  badegg-1-py2.4.egg
+    ...
+
+    >>> ls('bin')
+    -  bo
+    -  buildout
+    """
+
+def version_requirements_in_build_honored():
+    '''
+
+    >>> update_extdemo()
+    >>> dest = tmpdir('sample-install')
+    >>> mkdir('include')
+    >>> write('include', 'extdemo.h',
+    ... """
+    ... #define EXTDEMO 42
+    ... """)
+
+    >>> zc.buildout.easy_install.build(
+    ...   'extdemo ==1.4', dest,
+    ...   {'include-dirs': os.path.join(sample_buildout, 'include')},
+    ...   links=[link_server], index=link_server+'index/',
+    ...   newest=False)
+    ['/sample-install/extdemo-1.4-py2.4-linux-i686.egg']
+
+    '''
+
+def bug_105081_Specific_egg_versions_are_ignored_when_newer_eggs_are_around():
+    """
+    Buildout might ignore a specific egg requirement for a recipe:
+
+    - Have a newer version of an egg in your eggs directory
+    - Use 'recipe==olderversion' in your buildout.cfg to request an
+      older version
+
+    Buildout will go and fetch the older version, but it will *use*
+    the newer version when installing a part with this recipe.
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = x
+    ... find-links = %(sample_eggs)s
+    ...
+    ... [x]
+    ... recipe = zc.recipe.egg
+    ... eggs = demo
+    ... ''' % globals())
+
+    >>> print_(system(buildout), end='')
+    Installing x.
+    Getting distribution for 'demo'.
+    Got demo 0.3.
+    Getting distribution for 'demoneeded'.
+    Got demoneeded 1.1.
+    Generated script '/sample-buildout/bin/demo'.
+
+    >>> print_(system(join('bin', 'demo')), end='')
+    3 1
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = x
+    ... find-links = %(sample_eggs)s
+    ...
+    ... [x]
+    ... recipe = zc.recipe.egg
+    ... eggs = demo ==0.1
+    ... ''' % globals())
+
+    >>> print_(system(buildout), end='')
+    Uninstalling x.
+    Installing x.
+    Getting distribution for 'demo==0.1'.
+    Got demo 0.1.
+    Generated script '/sample-buildout/bin/demo'.
+
+    >>> print_(system(join('bin', 'demo')), end='')
+    1 1
+    """
+
+if sys.version_info > (2, 4):
+    def test_exit_codes():
+        """
+        >>> import subprocess
+        >>> def call(s):
+        ...     p = subprocess.Popen(s, stdin=subprocess.PIPE,
+        ...                 stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        ...     p.stdin.close()
+        ...     print_(p.stdout.read().decode())
+        ...     print_('Exit:', bool(p.wait()))
+
+        >>> call(buildout)
+        <BLANKLINE>
+        Exit: False
+
+        >>> write('buildout.cfg',
+        ... '''
+        ... [buildout]
+        ... parts = x
+        ... ''')
+
+        >>> call(buildout) # doctest: +NORMALIZE_WHITESPACE
+        While:
+          Installing.
+          Getting section x.
+        Error: The referenced section, 'x', was not defined.
+        <BLANKLINE>
+        Exit: True
+
+        >>> write('setup.py',
+        ... '''
+        ... from setuptools import setup
+        ... setup(name='zc.buildout.testexit', entry_points={
+        ...    'zc.buildout': ['default = testexitrecipe:x']})
+        ... ''')
+
+        >>> write('testexitrecipe.py',
+        ... '''
+        ... x y
+        ... ''')
+
+        >>> write('buildout.cfg',
+        ... '''
+        ... [buildout]
+        ... parts = x
+        ... develop = .
+        ...
+        ... [x]
+        ... recipe = zc.buildout.testexit
+        ... ''')
+
+        >>> call(buildout) # doctest: +NORMALIZE_WHITESPACE +ELLIPSIS
+        Develop: '/sample-buildout/.'
+        While:
+          Installing.
+          Getting section x.
+          Initializing section x.
+          Loading zc.buildout recipe entry zc.buildout.testexit:default.
+        <BLANKLINE>
+        An internal error occurred due to a bug in either zc.buildout or in a
+        recipe being used:
+        Traceback (most recent call last):
+        ...
+             x y
+               ^
+         SyntaxError: invalid syntax
+        <BLANKLINE>
+        Exit: True
+        """
+
+def bug_59270_recipes_always_start_in_buildout_dir():
+    r"""
+    Recipes can rely on running from buildout directory
+
+    >>> mkdir('bad_start')
+    >>> write('bad_recipe.py',
+    ... r'''
+    ... import os, sys
+    ... def print_(*args):
+    ...     sys.stdout.write(' '.join(map(str, args)) + '\n')
+    ... class Bad:
+    ...     def __init__(self, *_):
+    ...         print_(os.getcwd())
+    ...     def install(self):
+    ...         sys.stdout.write(os.getcwd()+'\n')
+    ...         os.chdir('bad_start')
+    ...         sys.stdout.write(os.getcwd()+'\n')
+    ...         return ()
+    ... ''')
+
+    >>> write('setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='bad.test',
+    ...       entry_points={'zc.buildout': ['default=bad_recipe:Bad']},)
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = .
+    ... parts = b1 b2
+    ... [b1]
+    ... recipe = bad.test
+    ... [b2]
+    ... recipe = bad.test
+    ... ''')
+
+    >>> os.chdir('bad_start')
+    >>> print_(system(join(sample_buildout, 'bin', 'buildout')
+    ...              +' -c '+join(sample_buildout, 'buildout.cfg')), end='')
+    Develop: '/sample-buildout/.'
+    /sample-buildout
+    /sample-buildout
+    Installing b1.
+    /sample-buildout
+    /sample-buildout/bad_start
+    Installing b2.
+    /sample-buildout
+    /sample-buildout/bad_start
+    """
+
+def bug_61890_file_urls_dont_seem_to_work_in_find_dash_links():
+    """
+
+    This bug arises from the fact that setuptools is overly restrictive
+    about file urls, requiring that file urls pointing at directories
+    must end in a slash.
+
+    >>> dest = tmpdir('sample-install')
+    >>> import zc.buildout.easy_install
+    >>> sample_eggs = sample_eggs.replace(os.path.sep, '/')
+    >>> ws = zc.buildout.easy_install.install(
+    ...     ['demo==0.2'], dest,
+    ...     links=['file://'+sample_eggs], index=link_server+'index/')
+
+
+    >>> for dist in ws:
+    ...     print_(dist)
+    demo 0.2
+    demoneeded 1.1
+
+    >>> ls(dest)
+    d  demo-0.2-py2.4.egg
+    d  demoneeded-1.1-py2.4.egg
+
+    """
+
+def bug_75607_buildout_should_not_run_if_it_creates_an_empty_buildout_cfg():
+    """
+    >>> remove('buildout.cfg')
+    >>> print_(system(buildout), end='')
+    While:
+      Initializing.
+    Error: Couldn't open /sample-buildout/buildout.cfg
+
+
+
+    """
+
+def dealing_with_extremely_insane_dependencies():
+    r"""
+
+    There was a problem with analysis of dependencies taking a long
+    time, in part because the analysis would get repeated every time a
+    package was encountered in a dependency list.  Now, we don't do
+    the analysis any more:
+
+    >>> import os
+    >>> for i in range(5):
+    ...     p = 'pack%s' % i
+    ...     deps = [('pack%s' % j) for j in range(5) if j is not i]
+    ...     if i == 4:
+    ...         deps.append('pack5')
+    ...     mkdir(p)
+    ...     write(p, 'setup.py',
+    ...           'from setuptools import setup\n'
+    ...           'setup(name=%r, install_requires=%r,\n'
+    ...           '      url="u", author="a", author_email="e")\n'
+    ...           % (p, deps))
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = pack0 pack1 pack2 pack3 pack4
+    ... parts = pack1
+    ...
+    ... [pack1]
+    ... recipe = zc.recipe.egg:eggs
+    ... eggs = pack0
+    ... ''')
+
+    >>> print_(system(buildout), end='') # doctest: +ELLIPSIS
+    Develop: '/sample-buildout/pack0'
+    Develop: '/sample-buildout/pack1'
+    Develop: '/sample-buildout/pack2'
+    Develop: '/sample-buildout/pack3'
+    Develop: '/sample-buildout/pack4'
+    Installing pack1.
+    ...
+    While:
+      Installing pack1.
+      Getting distribution for 'pack5'.
+    Error: Couldn't find a distribution for 'pack5'.
+
+    However, if we run in verbose mode, we can see why packages were included:
+
+    >>> print_(system(buildout+' -v'), end='') # doctest: +ELLIPSIS
+    Installing 'zc.buildout', 'setuptools'.
+    We have a develop egg: zc.buildout 1.0.0
+    We have the best distribution that satisfies 'setuptools'.
+    Picked: setuptools = 0.7
+    Develop: '/sample-buildout/pack0'
+    Develop: '/sample-buildout/pack1'
+    Develop: '/sample-buildout/pack2'
+    Develop: '/sample-buildout/pack3'
+    Develop: '/sample-buildout/pack4'
+    ...Installing pack1.
+    Installing 'pack0'.
+    We have a develop egg: pack0 0.0.0
+    Getting required 'pack4'
+      required by pack0 0.0.0.
+    We have a develop egg: pack4 0.0.0
+    Getting required 'pack3'
+      required by pack0 0.0.0.
+      required by pack4 0.0.0.
+    We have a develop egg: pack3 0.0.0
+    Getting required 'pack2'
+      required by pack0 0.0.0.
+      required by pack3 0.0.0.
+      required by pack4 0.0.0.
+    We have a develop egg: pack2 0.0.0
+    Getting required 'pack1'
+      required by pack0 0.0.0.
+      required by pack2 0.0.0.
+      required by pack3 0.0.0.
+      required by pack4 0.0.0.
+    We have a develop egg: pack1 0.0.0
+    Getting required 'pack5'
+      required by pack4 0.0.0.
+    We have no distributions for pack5 that satisfies 'pack5'.
+    ...
+    While:
+      Installing pack1.
+      Getting distribution for 'pack5'.
+    Error: Couldn't find a distribution for 'pack5'.
+    """
+
+def test_part_pulled_by_recipe():
+    """
+    >>> mkdir(sample_buildout, 'recipes')
+    >>> write(sample_buildout, 'recipes', 'test.py',
+    ... '''
+    ... class Recipe:
+    ...
+    ...     def __init__(self, buildout, name, options):
+    ...         self.x = buildout[options['x']][name]
+    ...
+    ...     def install(self):
+    ...         print self.x
+    ...         return ()
+    ...
+    ...     update = install
+    ... ''')
+
+
+    >>> write(sample_buildout, 'recipes', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(
+    ...     name = "recipes",
+    ...     entry_points = {'zc.buildout': ['test = test:Recipe']},
+    ...     )
+    ... ''')
+
+    >>> write(sample_buildout, 'buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipes
+    ... parts = a
+    ... [a]
+    ... recipe = recipes:test
+    ... x = b
+    ... [b]
+    ... <= a
+    ... a = A
+    ... b = B
+    ... c = ${c:x}
+    ... [c]
+    ... x = c
+    ... ''')
+
+    >>> os.chdir(sample_buildout)
+    >>> buildout = os.path.join(sample_buildout, 'bin', 'buildout')
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipes'
+    Installing b.
+    B
+    Installing a.
+    A
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipes'
+    Updating b.
+    B
+    Updating a.
+    A
+
+    >>> cat('.installed.cfg') # doctest: +ELLIPSIS
+    [buildout]
+    ...
+    [b]
+    __buildout_installed__ = 
+    __buildout_signature__ = recipes-c79aac86a90182467ce2fdae8b56eb1c c:...
+    ...
+    [a]
+    __buildout_installed__ = 
+    __buildout_signature__ = recipes-c79aac86a90182467ce2fdae8b56eb1c b:...
+    ...
+    """
+
+def read_find_links_to_load_extensions():
+    r"""
+We'll create a wacky buildout extension that just announces itself when used:
+
+    >>> src = tmpdir('src')
+    >>> write(src, 'wacky_handler.py',
+    ... '''
+    ... import sys
+    ... def install(buildout=None):
+    ...     sys.stdout.write("I am a wacky extension\\n")
+    ... ''')
+    >>> write(src, 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='wackyextension', version='1',
+    ...       py_modules=['wacky_handler'],
+    ...       entry_points = {'zc.buildout.extension':
+    ...             ['default = wacky_handler:install']
+    ...             },
+    ...       )
+    ... ''')
+    >>> print_(system(buildout+' setup '+src+' bdist_egg'), end='')
+    ... # doctest: +ELLIPSIS
+    Running setup ...
+    creating 'dist/wackyextension-1-...
+
+Now we'll create a buildout that uses this extension to load other packages:
+
+    >>> wacky_server = link_server.replace('http', 'wacky')
+    >>> dist = 'file://' + join(src, 'dist').replace(os.path.sep, '/')
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ... extensions = wackyextension
+    ... find-links = %(dist)s
+    ... ''' % globals())
+
+When we run the buildout. it will load the extension from the dist
+directory and then use the wacky extension to load the demo package
+
+    >>> print_(system(buildout), end='')
+    Getting distribution for 'wackyextension'.
+    Got wackyextension 1.
+    I am a wacky extension
+
+    """
+
+def distributions_from_local_find_links_make_it_to_download_cache():
+    """
+
+If we specify a local directory in find links, distros found there
+need to make it to the download cache.
+
+    >>> mkdir('test')
+    >>> write('test', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='foo')
+    ... ''')
+
+    >>> print_(system(buildout+' setup test bdist_egg')) # doctest: +ELLIPSIS
+    Running setup script 'test/setup.py'.
+    ...
+
+
+    >>> mkdir('cache')
+    >>> old_cache = zc.buildout.easy_install.download_cache('cache')
+    >>> list(zc.buildout.easy_install.install(['foo'], 'eggs',
+    ...          links=[join('test', 'dist')])) # doctest: +ELLIPSIS
+    [foo 0.0.0 ...
+
+    >>> ls('cache')
+    -  foo-0.0.0-py2.4.egg
+
+    >>> _ = zc.buildout.easy_install.download_cache(old_cache)
+
+    """
+
+def create_egg(name, version, dest, install_requires=None,
+               dependency_links=None):
+    d = tempfile.mkdtemp()
+    if dest=='available':
+        extras = dict(x=['x'])
+    else:
+        extras = {}
+    if dependency_links:
+        links = 'dependency_links = %s, ' % dependency_links
+    else:
+        links = ''
+    if install_requires:
+        requires = 'install_requires = %s, ' % install_requires
+    else:
+        requires = ''
+    try:
+        open(os.path.join(d, 'setup.py'), 'w').write(
+            'from setuptools import setup\n'
+            'setup(name=%r, version=%r, extras_require=%r, zip_safe=True,\n'
+            '      %s %s py_modules=["setup"]\n)'
+            % (name, str(version), extras, requires, links)
+            )
+        zc.buildout.testing.bdist_egg(d, sys.executable, os.path.abspath(dest))
+    finally:
+        shutil.rmtree(d)
+
+def prefer_final_permutation(existing, available):
+    for d in ('existing', 'available'):
+        if os.path.exists(d):
+            shutil.rmtree(d)
+        os.mkdir(d)
+    for version in existing:
+        create_egg('spam', version, 'existing')
+    for version in available:
+        create_egg('spam', version, 'available')
+
+    zc.buildout.easy_install.clear_index_cache()
+    [dist] = list(
+        zc.buildout.easy_install.install(['spam'], 'existing', ['available'])
+        )
+
+    if dist.extras:
+        print_('downloaded', dist.version)
+    else:
+        print_('had', dist.version)
+    sys.path_importer_cache.clear()
+
+def prefer_final():
+    """
+This test tests several permutations:
+
+Using different version numbers to work around zip importer cache problems. :(
+
+- With prefer final:
+
+    - no existing and newer dev available
+    >>> prefer_final_permutation((), [1, '2a1'])
+    downloaded 1
+
+    - no existing and only dev available
+    >>> prefer_final_permutation((), ['3a1'])
+    downloaded 3a1
+
+    - final existing and only dev acailable
+    >>> prefer_final_permutation([4], ['5a1'])
+    had 4
+
+    - final existing and newer final available
+    >>> prefer_final_permutation([6], [7])
+    downloaded 7
+
+    - final existing and same final available
+    >>> prefer_final_permutation([8], [8])
+    had 8
+
+    - final existing and older final available
+    >>> prefer_final_permutation([10], [9])
+    had 10
+
+    - only dev existing and final available
+    >>> prefer_final_permutation(['12a1'], [11])
+    downloaded 11
+
+    - only dev existing and no final available newer dev available
+    >>> prefer_final_permutation(['13a1'], ['13a2'])
+    downloaded 13a2
+
+    - only dev existing and no final available older dev available
+    >>> prefer_final_permutation(['15a1'], ['14a1'])
+    had 15a1
+
+    - only dev existing and no final available same dev available
+    >>> prefer_final_permutation(['16a1'], ['16a1'])
+    had 16a1
+
+- Without prefer final:
+
+    >>> _ = zc.buildout.easy_install.prefer_final(False)
+
+    - no existing and newer dev available
+    >>> prefer_final_permutation((), [18, '19a1'])
+    downloaded 19a1
+
+    - no existing and only dev available
+    >>> prefer_final_permutation((), ['20a1'])
+    downloaded 20a1
+
+    - final existing and only dev acailable
+    >>> prefer_final_permutation([21], ['22a1'])
+    downloaded 22a1
+
+    - final existing and newer final available
+    >>> prefer_final_permutation([23], [24])
+    downloaded 24
+
+    - final existing and same final available
+    >>> prefer_final_permutation([25], [25])
+    had 25
+
+    - final existing and older final available
+    >>> prefer_final_permutation([27], [26])
+    had 27
+
+    - only dev existing and final available
+    >>> prefer_final_permutation(['29a1'], [28])
+    had 29a1
+
+    - only dev existing and no final available newer dev available
+    >>> prefer_final_permutation(['30a1'], ['30a2'])
+    downloaded 30a2
+
+    - only dev existing and no final available older dev available
+    >>> prefer_final_permutation(['32a1'], ['31a1'])
+    had 32a1
+
+    - only dev existing and no final available same dev available
+    >>> prefer_final_permutation(['33a1'], ['33a1'])
+    had 33a1
+
+    >>> _ = zc.buildout.easy_install.prefer_final(True)
+
+    """
+
+def buildout_prefer_final_option():
+    """
+The prefer-final buildout option can be used for override the default
+preference for newer distributions.
+
+The default is prefer-final = true:
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = eggs
+    ... find-links = %(link_server)s
+    ...
+    ... [eggs]
+    ... recipe = zc.recipe.egg:eggs
+    ... eggs = demo
+    ... ''' % globals())
+
+    >>> print_(system(buildout+' -v'), end='') # doctest: +ELLIPSIS
+    Installing 'zc.buildout', 'setuptools'.
+    ...
+    Picked: demo = 0.3
+    ...
+    Picked: demoneeded = 1.1
+
+Here we see that the final versions of demo and demoneeded are used.
+We get the same behavior if we add prefer-final = true
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = eggs
+    ... find-links = %(link_server)s
+    ... prefer-final = true
+    ...
+    ... [eggs]
+    ... recipe = zc.recipe.egg:eggs
+    ... eggs = demo
+    ... ''' % globals())
+
+    >>> print_(system(buildout+' -v'), end='') # doctest: +ELLIPSIS
+    Installing 'zc.buildout', 'setuptools'.
+    ...
+    Picked: demo = 0.3
+    ...
+    Picked: demoneeded = 1.1
+
+If we specify prefer-final = false, we'll get the newest
+distributions:
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = eggs
+    ... find-links = %(link_server)s
+    ... prefer-final = false
+    ...
+    ... [eggs]
+    ... recipe = zc.recipe.egg:eggs
+    ... eggs = demo
+    ... ''' % globals())
+
+    >>> print_(system(buildout+' -v'), end='') # doctest: +ELLIPSIS
+    Installing 'zc.buildout', 'setuptools'.
+    ...
+    Picked: demo = 0.4rc1
+    ...
+    Picked: demoneeded = 1.2rc1
+
+We get an error if we specify anything but true or false:
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = eggs
+    ... find-links = %(link_server)s
+    ... prefer-final = no
+    ...
+    ... [eggs]
+    ... recipe = zc.recipe.egg:eggs
+    ... eggs = demo
+    ... ''' % globals())
+
+    >>> print_(system(buildout+' -v'), end='') # doctest: +ELLIPSIS
+    While:
+      Initializing.
+    Error: Invalid value for 'prefer-final' option: 'no'
+    """
+
+def wont_downgrade_due_to_prefer_final():
+    r"""
+    If we install a non-final buildout version, we don't want to
+    downgrade just bcause we prefer-final.  If a buildout version
+    isn't specified using a versions entry, then buildout's version
+    requirement gets set to >=CURRENT_VERSION.
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ... ''')
+
+    >>> [v] = [l.split('= >=', 1)[1].strip()
+    ...        for l in system(buildout+' -vv').split('\n')
+    ...        if l.startswith('zc.buildout = >=')]
+    >>> v == pkg_resources.working_set.find(
+    ...         pkg_resources.Requirement.parse('zc.buildout')
+    ...         ).version
+    True
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ... [versions]
+    ... zc.buildout = >.1
+    ... ''')
+    >>> [str(l.split('= >', 1)[1].strip())
+    ...        for l in system(buildout+' -vv').split('\n')
+    ...        if l.startswith('zc.buildout =')]
+    ['.1']
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ... versions = versions
+    ... [versions]
+    ... zc.buildout = 43
+    ... ''')
+    >>> print_(system(buildout), end='') # doctest: +ELLIPSIS
+    Getting distribution for 'zc.buildout==43'.
+    ...
+
+    """
+
+def develop_with_modules():
+    """
+Distribution setup scripts can import modules in the distribution directory:
+
+    >>> mkdir('foo')
+    >>> write('foo', 'bar.py',
+    ... '''# empty
+    ... ''')
+
+    >>> write('foo', 'setup.py',
+    ... '''
+    ... import bar
+    ... from setuptools import setup
+    ... setup(name="foo")
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = foo
+    ... parts =
+    ... ''')
+
+    >>> print_(system(join('bin', 'buildout')), end='')
+    Develop: '/sample-buildout/foo'
+
+    >>> ls('develop-eggs')
+    -  foo.egg-link
+    -  zc.recipe.egg.egg-link
+
+    """
+
+def dont_pick_setuptools_if_version_is_specified_when_required_by_src_dist():
+    """
+When installing a source distribution, we got setuptools without
+honoring our version specification.
+
+    >>> mkdir('dist')
+    >>> write('setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='foo', version='1', py_modules=['foo'], zip_safe=True)
+    ... ''')
+    >>> write('foo.py', '')
+    >>> _ = system(buildout+' setup . sdist')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = foo
+    ... find-links = dist
+    ... versions = versions
+    ... allow-picked-versions = false
+    ...
+    ... [versions]
+    ... setuptools = %s
+    ... foo = 1
+    ...
+    ... [foo]
+    ... recipe = zc.recipe.egg
+    ... eggs = foo
+    ... ''' % pkg_resources.working_set.find(
+    ...    pkg_resources.Requirement.parse('setuptools')).version)
+
+    >>> print_(system(buildout), end='')
+    Installing foo.
+    Getting distribution for 'foo==1'.
+    Got foo 1.
+
+    """
+
+def pyc_and_pyo_files_have_correct_paths():
+    r"""
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = eggs
+    ... find-links = %(link_server)s
+    ...
+    ... [eggs]
+    ... recipe = zc.recipe.egg
+    ... eggs = demo
+    ... interpreter = py
+    ... ''' % globals())
+
+    >>> _ = system(buildout)
+
+    >>> write('t.py',
+    ... r'''
+    ... import eggrecipedemo, eggrecipedemoneeded, sys
+    ... if sys.version_info > (3,):
+    ...     code = lambda f: f.__code__
+    ... else:
+    ...     code = lambda f: f.func_code
+    ... sys.stdout.write(code(eggrecipedemo.main).co_filename+'\n')
+    ... sys.stdout.write(code(eggrecipedemoneeded.f).co_filename+'\n')
+    ... ''')
+
+    >>> print_(system(join('bin', 'py')+ ' t.py'), end='')
+    /sample-buildout/eggs/demo-0.3-py2.4.egg/eggrecipedemo.py
+    /sample-buildout/eggs/demoneeded-1.1-py2.4.egg/eggrecipedemoneeded.py
+    """
+
+def dont_mess_with_standard_dirs_with_variable_refs():
+    """
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... eggs-directory = ${buildout:directory}/develop-eggs
+    ... parts =
+    ... ''' % globals())
+    >>> print_(system(buildout), end='')
+
+    """
+
+def expand_shell_patterns_in_develop_paths():
+    """
+    Sometimes we want to include a number of eggs in some directory as
+    develop eggs, without explicitly listing all of them in our
+    buildout.cfg
+
+    >>> make_dist_that_requires(sample_buildout, 'sampley')
+    >>> make_dist_that_requires(sample_buildout, 'samplez')
+
+    Now, let's create a buildout that has a shell pattern that matches
+    both:
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = eggs
+    ... develop = sample*
+    ... find-links = %(link_server)s
+    ...
+    ... [eggs]
+    ... recipe = zc.recipe.egg
+    ... eggs = sampley
+    ...        samplez
+    ... ''' % globals())
+
+    We can see that both eggs were found:
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/sampley'
+    Develop: '/sample-buildout/samplez'
+    Installing eggs.
+
+    """
+
+def warn_users_when_expanding_shell_patterns_yields_no_results():
+    """
+    Sometimes shell patterns do not match anything, so we want to warn
+    our users about it...
+
+    >>> make_dist_that_requires(sample_buildout, 'samplea')
+
+    So if we have 2 patterns, one that has a matching directory, and
+    another one that does not
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = eggs
+    ... develop = samplea grumble*
+    ... find-links = %(link_server)s
+    ...
+    ... [eggs]
+    ... recipe = zc.recipe.egg
+    ... eggs = samplea
+    ... ''' % globals())
+
+    We should get one of the eggs, and a warning for the pattern that
+    did not match anything.
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/samplea'
+    Couldn't develop '/sample-buildout/grumble*' (not found)
+    Installing eggs.
+
+    """
+
+def make_sure_versions_dont_cancel_extras():
+    """
+    There was a bug that caused extras in requirements to be lost.
+
+    >>> _ = open('setup.py', 'w').write('''
+    ... from setuptools import setup
+    ... setup(name='extraversiondemo', version='1.0',
+    ...       url='x', author='x', author_email='x',
+    ...       extras_require=dict(foo=['demo']), py_modules=['t'])
+    ... ''')
+    >>> open('README', 'w').close()
+    >>> open('t.py', 'w').close()
+
+    >>> sdist('.', sample_eggs)
+    >>> mkdir('dest')
+    >>> ws = zc.buildout.easy_install.install(
+    ...     ['extraversiondemo[foo]'], 'dest', links=[sample_eggs],
+    ...     versions = dict(extraversiondemo='1.0')
+    ... )
+    >>> sorted(dist.key for dist in ws)
+    ['demo', 'demoneeded', 'extraversiondemo']
+    """
+
+def increment_buildout_options():
+    r"""
+    >>> write('b1.cfg', '''
+    ... [buildout]
+    ... parts = p1
+    ... x = 1
+    ... y = a
+    ...     b
+    ...
+    ... [p1]
+    ... recipe = zc.buildout:debug
+    ... foo = ${buildout:x} ${buildout:y}
+    ... ''')
+
+    >>> write('buildout.cfg', '''
+    ... [buildout]
+    ... extends = b1.cfg
+    ... parts += p2
+    ... x += 2
+    ... y -= a
+    ...
+    ... [p2]
+    ... <= p1
+    ... ''')
+
+    >>> print_(system(buildout), end='')
+    Installing p1.
+      foo='1\n2 b'
+      recipe='zc.buildout:debug'
+    Installing p2.
+      foo='1\n2 b'
+      recipe='zc.buildout:debug'
+    """
+
+def increment_buildout_with_multiple_extended_files_421022():
+    r"""
+    >>> write('foo.cfg', '''
+    ... [buildout]
+    ... foo-option = foo
+    ... [other]
+    ... foo-option = foo
+    ... ''')
+    >>> write('bar.cfg', '''
+    ... [buildout]
+    ... bar-option = bar
+    ... [other]
+    ... bar-option = bar
+    ... ''')
+    >>> write('buildout.cfg', '''
+    ... [buildout]
+    ... parts = p other
+    ... extends = bar.cfg foo.cfg
+    ... bar-option += baz
+    ... foo-option += ham
+    ...
+    ... [other]
+    ... recipe = zc.buildout:debug
+    ... bar-option += baz
+    ... foo-option += ham
+    ...
+    ... [p]
+    ... recipe = zc.buildout:debug
+    ... x = ${buildout:bar-option} ${buildout:foo-option}
+    ... ''')
+
+    >>> print_(system(buildout), end='')
+    Installing p.
+      recipe='zc.buildout:debug'
+      x='bar\nbaz foo\nham'
+    Installing other.
+      bar-option='bar\nbaz'
+      foo-option='foo\nham'
+      recipe='zc.buildout:debug'
+    """
+
+def increment_on_command_line():
+    r"""
+    >>> write('buildout.cfg', '''
+    ... [buildout]
+    ... parts = p1
+    ... x = 1
+    ... y = a
+    ...     b
+    ...
+    ... [p1]
+    ... recipe = zc.buildout:debug
+    ... foo = ${buildout:x} ${buildout:y}
+    ...
+    ... [p2]
+    ... <= p1
+    ... ''')
+
+    >>> print_(system(buildout+' buildout:parts+=p2 p1:foo+=bar'), end='')
+    Installing p1.
+      foo='1 a\nb\nbar'
+      recipe='zc.buildout:debug'
+    Installing p2.
+      foo='1 a\nb\nbar'
+      recipe='zc.buildout:debug'
+    """
+
+def bug_664539_simple_buildout():
+  r"""
+  >>> write('buildout.cfg', '''
+  ... [buildout]
+  ... parts = escape
+  ...
+  ... [escape]
+  ... recipe = zc.buildout:debug
+  ... foo = $${nonexistent:option}
+  ... ''')
+
+  >>> print_(system(buildout), end='')
+  Installing escape.
+    foo='${nonexistent:option}'
+    recipe='zc.buildout:debug'
+  """
+
+def bug_664539_reference():
+  r"""
+  >>> write('buildout.cfg', '''
+  ... [buildout]
+  ... parts = escape
+  ...
+  ... [escape]
+  ... recipe = zc.buildout:debug
+  ... foo = ${:bar}
+  ... bar = $${nonexistent:option}
+  ... ''')
+
+  >>> print_(system(buildout), end='')
+  Installing escape.
+    bar='${nonexistent:option}'
+    foo='${nonexistent:option}'
+    recipe='zc.buildout:debug'
+  """
+
+def bug_664539_complex_buildout():
+  r"""
+  >>> write('buildout.cfg', '''
+  ... [buildout]
+  ... parts = escape
+  ...
+  ... [escape]
+  ... recipe = zc.buildout:debug
+  ... foo = ${level1:foo}
+  ...
+  ... [level1]
+  ... recipe = zc.buildout:debug
+  ... foo = ${level2:foo}
+  ...
+  ... [level2]
+  ... recipe = zc.buildout:debug
+  ... foo = $${nonexistent:option}
+  ... ''')
+
+  >>> print_(system(buildout), end='')
+  Installing level2.
+    foo='${nonexistent:option}'
+    recipe='zc.buildout:debug'
+  Installing level1.
+    foo='${nonexistent:option}'
+    recipe='zc.buildout:debug'
+  Installing escape.
+    foo='${nonexistent:option}'
+    recipe='zc.buildout:debug'
+  """
+
+def test_constrained_requirement():
+    """
+    zc.buildout.easy_install._constrained_requirement(constraint, requirement)
+
+    Transforms an environment by applying a constraint.
+
+    Here's a table of examples:
+
+    >>> from zc.buildout.easy_install import IncompatibleConstraintError
+    >>> examples = [
+    ... # original, constraint, transformed
+    ... ('x',        '1',        'x==1'),
+    ... ('x>1',      '2',        'x==2'),
+    ... ('x>3',      '2',        IncompatibleConstraintError),
+    ... ('x>1',      '>2',       'x>1,>2'),
+    ... ]
+    >>> from zc.buildout.easy_install import _constrained_requirement
+    >>> for o, c, e in examples:
+    ...     try:
+    ...         o = pkg_resources.Requirement.parse(o)
+    ...         if isinstance(e, str):
+    ...             e = pkg_resources.Requirement.parse(e)
+    ...         g = _constrained_requirement(c, o)
+    ...     except IncompatibleConstraintError:
+    ...         g = IncompatibleConstraintError
+    ...     if str(g) != str(e):
+    ...         print_('failed', o, c, g, '!=', e)
+
+    Parsed and constrained requirements are shared by all installers,
+    up to a limit:
+
+    >>> from zc.buildout.easy_install import _parse_requirement
+    >>> o = _parse_requirement('x>1')
+    >>> o is _parse_requirement('x>1')
+    True
+    >>> _constrained_requirement('2', o) is _constrained_requirement(
+    ...     '2', pkg_resources.Requirement.parse('x>1'))
+    True
+    >>> _constrained_requirement('3', o)
+    Requirement.parse('x==3')
+    >>> old_max = zc.buildout.easy_install._requirements_max
+    >>> zc.buildout.easy_install._requirements_max = 2
+    >>> _ = _parse_requirement('y'), _parse_requirement('z')
+    >>> len(zc.buildout.easy_install._requirements)
+    2
+    >>> 'x>1' in zc.buildout.easy_install._requirements
+    False
+    >>> zc.buildout.easy_install._requirements_max = old_max
+    """
+
+def test_distutils_scripts_using_import_are_properly_parsed():
+    """
+    zc.buildout.easy_install._distutils_script(path, dest, script_content, initialization, rsetup):
+
+    Creates a script for a distutils based project. In this example for a
+    hypothetical code quality checker called 'pyflint' that uses an import
+    statement to import its code.
+
+    >>> pyflint_script = '''#!/path/to/bin/python
+    ... import pyflint.do_something
+    ... pyflint.do_something()
+    ... '''
+    >>> import sys
+    >>> original_executable = sys.executable
+    >>> sys.executable = 'python'
+
+    >>> from zc.buildout.easy_install import _distutils_script
+    >>> generated = _distutils_script('\\'/path/test/\\'', 'bin/pyflint', pyflint_script, '', '')
+    >>> if sys.platform == 'win32':
+    ...     generated == ['bin/pyflint.exe', 'bin/pyflint-script.py']
+    ... else:
+    ...     generated == ['bin/pyflint']
+    True
+    >>> if sys.platform == 'win32':
+    ...     cat('bin/pyflint-script.py')
+    ... else:
+    ...     cat('bin/pyflint')
+    #!python
+    <BLANKLINE>
+    <BLANKLINE>
+    import sys
+    sys.path[0:0] = [
+      '/path/test/',
+      ]
+    <BLANKLINE>
+    <BLANKLINE>
+    import pyflint.do_something
+    pyflint.do_something()
+
+    >>> sys.executable = original_executable
+    """
+
+def test_distutils_scripts_using_from_are_properly_parsed():
+    """
+    zc.buildout.easy_install._distutils_script(path, dest, script_content, initialization, rsetup):
+
+    Creates a script for a distutils based project. In this example for a
+    hypothetical code quality checker called 'pyflint' that uses a from
+    statement to import its code.
+
+    >>> pyflint_script = '''#!/path/to/bin/python
+    ... from pyflint import do_something
+    ... do_something()
+    ... '''
+    >>> import sys
+    >>> original_executable = sys.executable
+    >>> sys.executable = 'python'
+
+    >>> from zc.buildout.easy_install import _distutils_script
+    >>> generated = _distutils_script('\\'/path/test/\\'', 'bin/pyflint', pyflint_script, '', '')
+    >>> if sys.platform == 'win32':
+    ...     generated == ['bin/pyflint.exe', 'bin/pyflint-script.py']
+    ... else:
+    ...     generated == ['bin/pyflint']
+    True
+    >>> if sys.platform == 'win32':
+    ...     cat('bin/pyflint-script.py')
+    ... else:
+    ...     cat('bin/pyflint')
+    #!python
+    <BLANKLINE>
+    <BLANKLINE>
+    import sys
+    sys.path[0:0] = [
+      '/path/test/',
+      ]
+    <BLANKLINE>
+    <BLANKLINE>
+    from pyflint import do_something
+    do_something()
+
+    >>> sys.executable = original_executable
+    """
+
+
+def want_new_zcrecipeegg():
+    """
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = egg
+    ... [egg]
+    ... recipe = zc.recipe.egg <2dev
+    ... eggs = demo
+    ... ''')
+    >>> print_(system(join('bin', 'buildout')), end='') # doctest: +ELLIPSIS
+    Getting distribution for 'zc.recipe.egg<2dev,>=2.0.0a3'.
+    While:
+      Installing.
+      Getting section egg.
+      Initializing section egg.
+      Installing recipe zc.recipe.egg <2dev.
+      Getting distribution for 'zc.recipe.egg<2dev,>=2.0.0a3'.
+    Error: Couldn't find a distribution for 'zc.recipe.egg<2dev,>=2.0.0a3'.
+    """
+
+def macro_inheritance_bug():
+    """
+
+There was a bug preventing a section from using another section as a macro
+if that section was extended with macros, and both sections were listed as
+parts (phew!).  The following contrived example demonstrates that this
+now works.
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = foo bar
+    ... [base]
+    ... recipe = zc.recipe.egg
+    ... [foo]
+    ... <=base
+    ... eggs = zc.buildout
+    ... interpreter = python
+    ... [bar]
+    ... <=foo
+    ... interpreter = py
+    ... ''')
+    >>> print_(system(join('bin', 'buildout')), end='') # doctest: +ELLIPSIS
+    Installing foo.
+    ...
+    Installing bar.
+    ...
+    >>> ls("./bin")
+    -  buildout
+    -  py
+    -  python
+    """
+
+def bootstrap_honors_relative_paths():
+    """
+    >>> working = tmpdir('working')
+    >>> cd(working)
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ... relative-paths = true
+    ... ''')
+    >>> _ = system(buildout+' bootstrap')
+    >>> cat('bin', 'buildout') # doctest: +ELLIPSIS
+    #!/usr/local/bin/python2.7
+    <BLANKLINE>
+    import os
+    <BLANKLINE>
+    join = os.path.join
+    base = os.path.dirname(os.path.abspath(os.path.realpath(__file__)))
+    base = os.path.dirname(base)
+    <BLANKLINE>
+    import sys
+    sys.path[0:0] = [
+      join(base, 'eggs/setuptools-0.7-py2.7.egg'),
+      ...
+      ]
+    <BLANKLINE>
+    import zc.buildout.buildout
+    <BLANKLINE>
+    if __name__ == '__main__':
+        sys.exit(zc.buildout.buildout.main())
+    """
+
+def cant_use_install_from_cache_and_offline_together():
+    r"""
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ... offline = true
+    ... install-from-cache = true
+    ... ''')
+    >>> print_(system(join('bin', 'buildout')), end='') # doctest: +ELLIPSIS
+    While:
+      Initializing.
+    Error: install-from-cache can't be used with offline mode.
+    Nothing is installed, even from cache, in offline
+    mode, which might better be called 'no-install mode'.
+    <BLANKLINE>
+    """
+
+def error_installing_in_offline_mode_if_dont_have_needed_dist():
+    r"""
+    >>> import zc.buildout.easy_install
+    >>> ws = zc.buildout.easy_install.install(
+    ...     ['demo==0.2'], None,
+    ...     links=[link_server], index=link_server+'index/')
+    Traceback (most recent call last):
+    ...
+    UserError: We don't have a distribution for demo==0.2
+    and can't install one in offline (no-install) mode.
+    <BLANKLINE>
+    """
+
+def download_jobs_fetch_distributions_concurrently():
+    r"""
+When download_jobs is greater than 1, the distributions needed by each
+level of requirements are fetched concurrently.  The result is the same
+as when they are fetched one by one:
+
+    >>> import zc.buildout.easy_install
+    >>> def install(dest, jobs):
+    ...     old = zc.buildout.easy_install.download_jobs(jobs)
+    ...     try:
+    ...         ws = zc.buildout.easy_install.install(
+    ...             ['demo', 'other'], dest,
+    ...             links=[link_server], index=link_server+'index/')
+    ...     finally:
+    ...         zc.buildout.easy_install.download_jobs(old)
+    ...     return [(dist.project_name, dist.version) for dist in ws]
+
+    >>> dest1, dest2 = tmpdir('sequential'), tmpdir('concurrent')
+    >>> sequential = install(dest1, 1)
+    >>> sequential
+    [('demo', '0.3'), ('other', '1.0'), ('demoneeded', '1.1')]
+    >>> install(dest2, 4) == sequential
+    True
+    >>> sorted(os.listdir(dest1)) == sorted(os.listdir(dest2))
+    True
+
+Index lookups are done one by one, but downloads overlap.  Let's serve
+the links through a server holding each distribution until another one
+is requested, or a few seconds passed:
+
+    >>> import threading
+    >>> try:
+    ...     from http.server import HTTPServer, BaseHTTPRequestHandler
+    ...     from socketserver import ThreadingMixIn
+    ...     from urllib.request import urlopen
+    ...     from urllib.error import HTTPError
+    ... except ImportError:
+    ...     from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    ...     from SocketServer import ThreadingMixIn
+    ...     from urllib2 import urlopen, HTTPError
+    >>> upstream = link_server
+    >>> condition = threading.Condition()
+    >>> downloads = [0, 0] # in progress, maximum
+    >>> class Handler(BaseHTTPRequestHandler):
+    ...     def do_GET(self):
+    ...         try:
+    ...             f = urlopen(upstream + self.path[1:])
+    ...         except HTTPError as e:
+    ...             f = e
+    ...         data = f.read()
+    ...         if self.path.endswith('.egg'):
+    ...             with condition:
+    ...                 downloads[0] += 1
+    ...                 downloads[1] = max(downloads)
+    ...                 condition.notify_all()
+    ...                 if downloads[0] < 2:
+    ...                     condition.wait(5)
+    ...                 downloads[0] -= 1
+    ...         self.send_response(f.code)
+    ...         self.send_header('Content-Length', str(len(data)))
+    ...         self.send_header('Content-Type', f.info()['Content-Type'])
+    ...         self.end_headers()
+    ...         self.wfile.write(data)
+    ...     def log_message(self, *args):
+    ...         pass
+    >>> class Server(ThreadingMixIn, HTTPServer):
+    ...     daemon_threads = True
+    >>> server = Server(('localhost', 0), Handler)
+    >>> thread = threading.Thread(target=server.serve_forever)
+    >>> thread.daemon = True
+    >>> thread.start()
+
+    >>> link_server = 'http://localhost:%s/' % server.server_address[1]
+    >>> install(tmpdir('overlapping'), 4) == sequential
+    True
+    >>> downloads
+    [0, 2]
+    >>> link_server = upstream
+    >>> server.shutdown()
+    >>> server.server_close()
+    """
+
+def index_cache():
+    r"""
+With an index cache, index and find-links pages are kept with their
+links and revalidated with their ETag:
+
+    >>> import zc.buildout.easy_install
+    >>> old_cache = zc.buildout.easy_install.index_cache('cache')
+    >>> def install(dest):
+    ...     zc.buildout.easy_install.clear_index_cache()
+    ...     ws = zc.buildout.easy_install.install(
+    ...         ['demoneeded'], dest, links=[link_server],
+    ...         index=link_server+'index/')
+    ...     return [(dist.project_name, dist.version) for dist in ws]
+    >>> install(tmpdir('dest1'))
+    [('demoneeded', '1.1')]
+
+    >>> _ = get(link_server+'enable_server_logging')
+    GET 200 /enable_server_logging
+    >>> install(tmpdir('dest2'))
+    GET 304 /
+    GET 404 /index/demoneeded/
+    GET 304 /index/
+    GET 200 /demoneeded-1.1.zip
+    [('demoneeded', '1.1')]
+
+Pages are not revalidated for index-cache-ttl seconds:
+
+    >>> old_ttl = zc.buildout.easy_install.index_cache_ttl(3600)
+    >>> install(tmpdir('dest3'))
+    GET 404 /index/demoneeded/
+    GET 200 /demoneeded-1.1.zip
+    [('demoneeded', '1.1')]
+
+    >>> _ = get(link_server+'disable_server_logging')
+    >>> _ = zc.buildout.easy_install.index_cache_ttl(old_ttl)
+    >>> _ = zc.buildout.easy_install.index_cache(old_cache)
+    >>> zc.buildout.easy_install.clear_index_cache()
+    """
+
+def http_connections_per_host():
+    r"""
+With http-connections-per-host, HTTP connections are kept alive and
+reused by downloads and index pages.  Let's count the connections made
+to a server supporting keep-alive:
+
+    >>> import threading
+    >>> try:
+    ...     from http.server import HTTPServer, BaseHTTPRequestHandler
+    ...     from socketserver import ThreadingMixIn
+    ... except ImportError:
+    ...     from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    ...     from SocketServer import ThreadingMixIn
+    >>> connections = []
+    >>> class Handler(BaseHTTPRequestHandler):
+    ...     protocol_version = 'HTTP/1.1'
+    ...     def setup(self):
+    ...         connections.append(self.client_address)
+    ...         BaseHTTPRequestHandler.setup(self)
+    ...     def do_GET(self):
+    ...         out = ('<html><body>%s</body></html>' % self.path).encode()
+    ...         self.send_response(200)
+    ...         self.send_header('Content-Length', str(len(out)))
+    ...         self.send_header('Content-Type', 'text/html')
+    ...         self.end_headers()
+    ...         self.wfile.write(out)
+    ...     def log_message(self, *args):
+    ...         pass
+    >>> class Server(ThreadingMixIn, HTTPServer):
+    ...     daemon_threads = True
+    >>> server = Server(('localhost', 0), Handler)
+    >>> thread = threading.Thread(target=server.serve_forever)
+    >>> thread.setDaemon(True)
+    >>> thread.start()
+    >>> url = 'http://localhost:%s/' % server.server_address[1]
+
+    >>> import zc.buildout.download, zc.buildout.httpclient
+    >>> download = zc.buildout.download.Download()
+    >>> def fetch(*names):
+    ...     for name in names:
+    ...         path, is_temp = download(url + name)
+    ...         print_(open(path).read())
+    ...         remove(path)
+    >>> fetch('a', 'b')
+    <html><body>/a</body></html>
+    <html><body>/b</body></html>
+    >>> len(connections)
+    2
+
+    >>> del connections[:]
+    >>> zc.buildout.httpclient.connections_per_host(2)
+    0
+    >>> fetch('a', 'b', 'c')
+    <html><body>/a</body></html>
+    <html><body>/b</body></html>
+    <html><body>/c</body></html>
+    >>> len(connections)
+    1
+
+Index pages are fetched through the same connections:
+
+    >>> index = zc.buildout.easy_install.AllowHostsPackageIndex(url)
+    >>> f = index.open_url(url + 'index')
+    >>> print_(f.read().decode())
+    <html><body>/index</body></html>
+    >>> f.close()
+    >>> len(connections)
+    1
+
+At most the given number of connections is opened to a host, requests
+waiting for a connection to be available:
+
+    >>> opened = [zc.buildout.httpclient.urlopen(url + name)
+    ...           for name in 'ab']
+    >>> len(connections)
+    2
+    >>> result = []
+    >>> waiting = threading.Thread(target=lambda: result.append(
+    ...     zc.buildout.httpclient.urlopen(url + 'c').read().decode()))
+    >>> waiting.start()
+    >>> waiting.join(.5)
+    >>> result
+    []
+    >>> for f in opened:
+    ...     print_(f.read().decode())
+    <html><body>/a</body></html>
+    <html><body>/b</body></html>
+    >>> waiting.join()
+    >>> print_(result[0], len(connections))
+    <html><body>/c</body></html> 2
+
+    >>> zc.buildout.httpclient.connections_per_host(0)
+    2
+    >>> server.shutdown()
+    >>> server.server_close()
+    """
+
+def egg_store():
+    r"""
+With an egg store, egg archives are unpacked once in the store, in a
+directory named after the archive and its digest, and their files are
+shared with the eggs directories, by cloning or hard-linking them:
+
+    >>> import zc.buildout.easy_install
+    >>> old_store = zc.buildout.easy_install.egg_store(
+    ...     os.path.join(tmpdir('eggstore'), 'store'))
+    >>> store = zc.buildout.easy_install.egg_store()
+    >>> def install(dest):
+    ...     ws = zc.buildout.easy_install.install(
+    ...         ['demo==0.2'], dest, links=[link_server],
+    ...         index=link_server+'index/')
+    ...     return [(dist.project_name, dist.version) for dist in ws]
+    >>> dest1 = tmpdir('dest1')
+    >>> install(dest1)
+    [('demo', '0.2'), ('demoneeded', '1.1')]
+    >>> install(tmpdir('dest2'))
+    [('demo', '0.2'), ('demoneeded', '1.1')]
+    >>> ls(store) # doctest: +ELLIPSIS
+    d  demo-0.2-py...egg-...
+
+    >>> [entry] = os.listdir(store)
+    >>> [egg] = os.listdir(join(store, entry))
+    >>> ls(dest1, egg)
+    d  EGG-INFO
+    -  eggrecipedemo.py
+    >>> def read(*path):
+    ...     with open(join(*path)) as f:
+    ...         return f.read()
+    >>> (read(dest1, egg, 'eggrecipedemo.py') ==
+    ...  read(store, entry, egg, 'eggrecipedemo.py'))
+    True
+
+    >>> _ = zc.buildout.easy_install.egg_store(old_store)
+    """
+
+def dist_index_cache():
+    r"""
+With a distribution index cache, the eggs found in a directory are
+remembered as long as its modification time doesn't change:
+
+    >>> import zc.buildout.easy_install
+    >>> old_cache = zc.buildout.easy_install.dist_index_cache(
+    ...     os.path.join(tmpdir('distindex'), 'cache'))
+    >>> cache = zc.buildout.easy_install.dist_index_cache()
+    >>> dest = tmpdir('dest')
+    >>> ws = zc.buildout.easy_install.install(
+    ...     ['demo==0.2'], dest, links=[link_server],
+    ...     index=link_server+'index/')
+
+Recently modified directories aren't indexed, since they may be modified
+again without their modification time changing:
+
+    >>> os.path.exists(cache)
+    False
+    >>> import time
+    >>> mtime = time.time() - 10
+    >>> os.utime(dest, (mtime, mtime))
+    >>> zc.buildout.easy_install._dist_indexes.clear()
+    >>> env = zc.buildout.easy_install.Installer(dest)._env
+    >>> len(os.listdir(cache))
+    1
+    >>> [(dist.project_name, dist.version) for dist in env['demo']]
+    [('demo', '0.2')]
+
+The index is then used, also by new processes:
+
+    >>> zc.buildout.easy_install._dist_indexes.clear()
+    >>> find_distributions = pkg_resources.find_distributions
+    >>> def no_scan(path, only=False):
+    ...     assert path != dest, path
+    ...     return find_distributions(path, only)
+    >>> pkg_resources.find_distributions = no_scan
+    >>> installer = zc.buildout.easy_install.Installer(dest, newest=False)
+    >>> pkg_resources.find_distributions = find_distributions
+    >>> dist, _ = installer._satisfied(
+    ...     pkg_resources.Requirement.parse('demo'))
+    >>> dist.project_name, dist.version, dist.location == join(
+    ...     dest, os.path.basename(dist.location))
+    ('demo', '0.2', True)
+    >>> [str(req) for req in dist.requires()]
+    ['demoneeded']
+
+When the directory is modified, it is scanned again:
+
+    >>> remove(dest, os.path.basename(dist.location))
+    >>> os.utime(dest, (mtime + 1, mtime + 1))
+    >>> env = zc.buildout.easy_install.Installer(dest)._env
+    >>> env['demo'], len(env['demoneeded'])
+    ([], 1)
+
+Directories with develop egg links aren't indexed, because the
+metadata of develop eggs are outside of them:
+
+    >>> develop = tmpdir('develop')
+    >>> foo = tmpdir('foo')
+    >>> mkdir(foo, 'foo.egg-info')
+    >>> write(foo, 'foo.egg-info', 'PKG-INFO', 'Name: foo\\nVersion: 1\\n')
+    >>> write(develop, 'foo.egg-link', foo)
+    >>> os.utime(develop, (mtime, mtime))
+    >>> print_(zc.buildout.easy_install._indexed_distributions(
+    ...     cache, develop))
+    None
+
+    >>> _ = zc.buildout.easy_install.dist_index_cache(old_cache)
+    """
+
+def resolution_cache():
+    r"""
+With a resolution cache, working sets resolved from pinned versions are
+kept, so that resolving the same requirements again is a lookup:
+
+    >>> import time
+    >>> import zc.buildout.easy_install
+    >>> old_cache = zc.buildout.easy_install.resolution_cache(
+    ...     os.path.join(tmpdir('resolutions'), 'cache'))
+    >>> cache = zc.buildout.easy_install.resolution_cache()
+    >>> dest = tmpdir('dest')
+    >>> def install(**versions):
+    ...     ws = zc.buildout.easy_install.install(
+    ...         ['demo'], dest, links=[link_server],
+    ...         index=link_server+'index/', versions=versions)
+    ...     return [(dist.project_name, dist.version) for dist in ws]
+    >>> install(demo='0.2', demoneeded='1.1')
+    [('demo', '0.2'), ('demoneeded', '1.1')]
+
+Nothing is kept while the eggs directory was just modified:
+
+    >>> os.path.exists(cache)
+    False
+    >>> mtime = time.time() - 10
+    >>> os.utime(dest, (mtime, mtime))
+    >>> install(demo='0.2', demoneeded='1.1')
+    [('demo', '0.2'), ('demoneeded', '1.1')]
+    >>> len(os.listdir(cache))
+    1
+
+    >>> zc.buildout.easy_install._resolutions.clear()
+    >>> _install = zc.buildout.easy_install.Installer._install
+    >>> def no_install(*args):
+    ...     raise AssertionError('resolved')
+    >>> zc.buildout.easy_install.Installer._install = no_install
+    >>> install(demo='0.2', demoneeded='1.1')
+    [('demo', '0.2'), ('demoneeded', '1.1')]
+
+Other versions, or a modified eggs directory, lead to a new resolution:
+
+    >>> install(demo='0.2', demoneeded='1.0')
+    Traceback (most recent call last):
+    ...
+    AssertionError: resolved
+    >>> os.utime(dest, (mtime + 1, mtime + 1))
+    >>> install(demo='0.2', demoneeded='1.1')
+    Traceback (most recent call last):
+    ...
+    AssertionError: resolved
+    >>> zc.buildout.easy_install.Installer._install = _install
+
+Resolutions of versions that aren't all pinned are not kept:
+
+    >>> install(demo='0.2', demoneeded='1.1')
+    [('demo', '0.2'), ('demoneeded', '1.1')]
+    >>> len(os.listdir(cache))
+    2
+    >>> install(demo='0.2')
+    [('demo', '0.2'), ('demoneeded', '1.1')]
+    >>> len(os.listdir(cache))
+    2
+
+    >>> _ = zc.buildout.easy_install.resolution_cache(old_cache)
+    """
+
+def download_cache_size():
+    r"""
+Files found in the download cache are marked as used by setting their
+access time.  The cache-gc command removes the least recently used
+files until the caches fit in the given size, keeping the ones used in
+the last hour:
+
+    >>> import time
+    >>> mkdir('cache')
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ... download-cache = cache
+    ... ''')
+    >>> now = time.time()
+    >>> for name, age in ('a', 3), ('b', 2), ('c', 0):
+    ...     write('cache', name, 'x' * 400)
+    ...     os.utime(join('cache', name), (now - age * 3600, now - 5 * 3600))
+    >>> write('cache', 'd.part', 'x' * 100)
+    >>> write('cache', 'd.part.info', '"etag"')
+    >>> os.utime(join('cache', 'd.part'), (now - 7200, now - 7200))
+
+    >>> import zc.buildout.download
+    >>> download = zc.buildout.download.Download(
+    ...     dict(directory=sample_buildout, **{'download-cache': 'cache'}),
+    ...     namespace='')
+    >>> _ = download.download_cached('http://example.com/a')
+    >>> print_(system(buildout + ' cache-gc 1K'), end='')
+    Removed 3 files (506 bytes) from caches.
+    >>> ls('cache')
+    -  .buildout-gc.lock
+    -  a
+    -  c
+    d  dist
+
+Without a size, only partial downloads and unreferenced files are
+removed.  With the download-cache-size option, the caches are collected
+at the end of runs, unless they were collected in the last hour:
+
+    >>> os.utime(join('cache', 'a'), (now - 7200, now - 7200))
+    >>> print_(system(buildout + ' cache-gc'), end='')
+    >>> os.utime(join('cache', '.buildout-gc.lock'), (now - 7200, now - 7200))
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ... download-cache = cache
+    ... download-cache-size = 500
+    ... ''')
+    >>> print_(system(buildout), end='')
+    Removed 1 files (400 bytes) from caches.
+    >>> ls('cache')
+    -  .buildout-gc.lock
+    -  c
+    d  dist
+
+    >>> os.utime(join('cache', 'c'), (now - 7200, now - 7200))
+    >>> print_(system(buildout + ' buildout:download-cache-size=0'), end='')
+    >>> ls('cache')
+    -  .buildout-gc.lock
+    -  c
+    d  dist
+
+    >>> print_(system(buildout + ' buildout:download-cache-size=1X'), end='')
+    While:
+      Initializing.
+    Error: Invalid download-cache-size 1X
+    """
+
+def error_building_in_offline_mode_if_dont_have_needed_dist():
+    r"""
+    >>> zc.buildout.easy_install.build(
+    ...   'extdemo', None,
+    ...   {}, links=[link_server], index=link_server+'index/')
+    Traceback (most recent call last):
+    ...
+    UserError: We don't have a distribution for extdemo
+    and can't build one in offline (no-install) mode.
+    <BLANKLINE>
+    """
+
+def test_buildout_section_shorthand_for_command_line_assignments():
+    r"""
+    >>> write('buildout.cfg', '')
+    >>> print_(system(buildout+' parts='), end='') # doctest: +ELLIPSIS
+    """
+
+def buildout_honors_umask():
+    """
+
+    For setting the executable permission, the user's umask is honored:
+
+    >>> orig_umask = os.umask(0o077)  # Only user gets permissions.
+    >>> zc.buildout.easy_install._execute_permission() == 0o700
+    True
+    >>> tmp = os.umask(0o022)  # User can write, the rest not.
+    >>> zc.buildout.easy_install._execute_permission() == 0o755
+    True
+    >>> tmp = os.umask(orig_umask)  # Reset umask to the original value.
+    """
+
+def parse_with_section_expr():
+    r"""
+    >>> class Recipe:
+    ...     def __init__(self, buildout, *_):
+    ...         buildout.parse('''
+    ...             [foo : sys.version_info[0] > 0]
+    ...             x = 1
+    ...             ''')
+
+    >>> buildout = zc.buildout.testing.Buildout()
+    >>> buildout.parse('''
+    ...     [foo : sys.version_info[0] > 0]
+    ...     x = 1
+    ...     ''')
+    >>> buildout.print_options()
+    [foo]
+    x = 1
+
+    """
+
+if sys.platform == 'win32':
+    del buildout_honors_umask # umask on dohs is academic
+
+######################################################################
+
+def create_sample_eggs(test, executable=sys.executable):
+    assert executable == sys.executable, (executable, sys.executable)
+    write = test.globs['write']
+    dest = test.globs['sample_eggs']
+    tmp = tempfile.mkdtemp()
+    try:
+        write(tmp, 'README.txt', '')
+
+        for i in (0, 1, 2):
+            write(tmp, 'eggrecipedemoneeded.py', 'y=%s\ndef f():\n  pass' % i)
+            rc1 = i==2 and 'rc1' or ''
+            write(
+                tmp, 'setup.py',
+                "from setuptools import setup\n"
+                "setup(name='demoneeded', py_modules=['eggrecipedemoneeded'],"
+                " zip_safe=True, version='1.%s%s', author='bob', url='bob', "
+                "author_email='bob')\n"
+                % (i, rc1)
+                )
+            zc.buildout.testing.sdist(tmp, dest)
+
+        write(
+            tmp, 'distutilsscript',
+            '#!/usr/bin/python\n'
+            '# -*- coding: utf-8 -*-\n'
+            '"""Module docstring."""\n'
+            'from __future__ import print_statement\n'
+            'import os\n'
+            'import sys; sys.stdout.write("distutils!\\n")\n'
+            )
+        write(
+            tmp, 'setup.py',
+            "from setuptools import setup\n"
+            "setup(name='other', zip_safe=False, version='1.0', "
+            "scripts=['distutilsscript'],"
+            "py_modules=['eggrecipedemoneeded'])\n"
+            )
+        zc.buildout.testing.bdist_egg(tmp, sys.executable, dest)
+
+        write(
+            tmp, 'setup.py',
+            "from setuptools import setup\n"
+            "setup(name='du_zipped', zip_safe=True, version='1.0', "
+            "scripts=['distutilsscript'],"
+            "py_modules=['eggrecipedemoneeded'])\n"
+            )
+        zc.buildout.testing.bdist_egg(tmp, executable, dest)
+
+        os.remove(os.path.join(tmp, 'distutilsscript'))
+        os.remove(os.path.join(tmp, 'eggrecipedemoneeded.py'))
+
+        for i in (1, 2, 3, 4):
+            write(
+                tmp, 'eggrecipedemo.py',
+                'import eggrecipedemoneeded, sys\n'
+                'def print_(*a):\n'
+                '    sys.stdout.write(" ".join(map(str, a))+"\\n")\n'
+                'x=%s\n'
+                'def main():\n'
+                '   print_(x, eggrecipedemoneeded.y)\n'
+                % i)
+            rc1 = i==4 and 'rc1' or ''
+            write(
+                tmp, 'setup.py',
+                "from setuptools import setup\n"
+                "setup(name='demo', py_modules=['eggrecipedemo'],"
+                " install_requires = 'demoneeded',"
+                " entry_points={'console_scripts': "
+                     "['demo = eggrecipedemo:main']},"
+                " zip_safe=True, version='0.%s%s')\n" % (i, rc1)
+                )
+            zc.buildout.testing.bdist_egg(tmp, dest)
+
+        write(tmp, 'eggrecipebigdemo.py', 'import eggrecipedemo')
+        write(
+            tmp, 'setup.py',
+            "from setuptools import setup\n"
+            "setup(name='bigdemo', "
+            " install_requires = 'demo',"
+            " py_modules=['eggrecipebigdemo'], "
+            " zip_safe=True, version='0.1')\n"
+            )
+        zc.buildout.testing.bdist_egg(tmp, sys.executable, dest)
+
+    finally:
+        shutil.rmtree(tmp)
+
+extdemo_c2 = """
+#include <Python.h>
+#include <extdemo.h>
+
+static PyMethodDef methods[] = {{NULL}};
+
+PyMODINIT_FUNC
+initextdemo(void)
+{
+    PyObject *m;
+    m = Py_InitModule3("extdemo", methods, "");
+#ifdef TWO
+    PyModule_AddObject(m, "val", PyInt_FromLong(2));
+#else
+    PyModule_AddObject(m, "val", PyInt_FromLong(EXTDEMO));
+#endif
+}
+"""
+
+extdemo_c3 = """
+#include <Python.h>
+#include <extdemo.h>
+
+static PyMethodDef methods[] = {{NULL}};
+
+#define MOD_DEF(ob, name, doc, methods) \
+	  static struct PyModuleDef moduledef = { \
+	    PyModuleDef_HEAD_INIT, name, doc, -1, methods, }; \
+	  ob = PyModule_Create(&moduledef);
+
+#define MOD_INIT(name) PyMODINIT_FUNC PyInit_##name(void)
+
+MOD_INIT(extdemo)
+{
+    PyObject *m;
+
+    MOD_DEF(m, "extdemo", "", methods);
+
+#ifdef TWO
+    PyModule_AddObject(m, "val", PyLong_FromLong(2));
+#else
+    PyModule_AddObject(m, "val", PyLong_FromLong(EXTDEMO));
+#endif
+
+    return m;
+}
+"""
+
+extdemo_c = sys.version_info[0] < 3 and extdemo_c2 or extdemo_c3
+
+extdemo_setup_py = r"""
+import os, sys
+from distutils.core import setup, Extension
+
+if os.environ.get('test-variable'):
+    print("Have environment test-variable: %%s" %% os.environ['test-variable'])
+
+setup(name = "extdemo", version = "%s", url="http://www.zope.org",
+      author="Demo", author_email="demo@demo.com",
+      ext_modules = [Extension('extdemo', ['extdemo.c'])],
+      )
+"""
+
+def add_source_dist(test, version=1.4):
+    if 'extdemo' not in test.globs:
+        test.globs['extdemo'] = test.globs['tmpdir']('extdemo')
+
+    tmp = test.globs['extdemo']
+    write = test.globs['write']
+    try:
+        write(tmp, 'extdemo.c', extdemo_c);
+        write(tmp, 'setup.py', extdemo_setup_py % version);
+        write(tmp, 'README', "");
+        write(tmp, 'MANIFEST.in', "include *.c\n");
+        test.globs['sdist'](tmp, test.globs['sample_eggs'])
+    except:
+        shutil.rmtree(tmp)
+
+def easy_install_SetUp(test):
+    zc.buildout.testing.buildoutSetUp(test)
+    sample_eggs = test.globs['tmpdir']('sample_eggs')
+    test.globs['sample_eggs'] = sample_eggs
+    os.mkdir(os.path.join(sample_eggs, 'index'))
+    create_sample_eggs(test)
+    add_source_dist(test)
+    test.globs['link_server'] = test.globs['start_server'](
+        test.globs['sample_eggs'])
+    test.globs['update_extdemo'] = lambda : add_source_dist(test, 1.5)
+    zc.buildout.testing.install_develop('zc.recipe.egg', test)
+
+def buildout_txt_setup(test):
+    zc.buildout.testing.buildoutSetUp(test)
+    mkdir = test.globs['mkdir']
+    eggs = os.environ['buildout-testing-index-url'][7:]
+    test.globs['sample_eggs'] = eggs
+    create_sample_eggs(test)
+
+    for name in os.listdir(eggs):
+        if '-' in name:
+            pname = name.split('-')[0]
+            if not os.path.exists(os.path.join(eggs, pname)):
+                mkdir(eggs, pname)
+            shutil.move(os.path.join(eggs, name),
+                        os.path.join(eggs, pname, name))
+
+    dist = pkg_resources.working_set.find(
+        pkg_resources.Requirement.parse('zc.recipe.egg'))
+    mkdir(eggs, 'zc.recipe.egg')
+    zc.buildout.testing.sdist(
+        os.path.dirname(dist.location),
+        os.path.join(eggs, 'zc.recipe.egg'),
+        )
+
+egg_parse = re.compile('([0-9a-zA-Z_.]+)-([0-9a-zA-Z_.+]+)-py(\d[.]\d).egg$'
+                       ).match
+def makeNewRelease(project, ws, dest, version='99.99'):
+    dist = ws.find(pkg_resources.Requirement.parse(project))
+    eggname, oldver, pyver = egg_parse(
+        os.path.basename(dist.location)
+        ).groups()
+    dest = os.path.join(dest, "%s-%s-py%s.egg" % (eggname, version, pyver))
+    if os.path.isfile(dist.location):
+        shutil.copy(dist.location, dest)
+        zip = zipfile.ZipFile(dest, 'a')
+        zip.writestr(
+            'EGG-INFO/PKG-INFO',
+            ((zip.read('EGG-INFO/PKG-INFO').decode('ISO-8859-1')
+              ).replace("Version: %s" % oldver,
+                        "Version: %s" % version)
+             ).encode('ISO-8859-1')
+            )
+        zip.close()
+    else:
+        shutil.copytree(dist.location, dest)
+        info_path = os.path.join(dest, 'EGG-INFO', 'PKG-INFO')
+        info = open(info_path).read().replace("Version: %s" % oldver,
+                                              "Version: %s" % version)
+        open(info_path, 'w').write(info)
+
+def getWorkingSetWithBuildoutEgg(test):
+    sample_buildout = test.globs['sample_buildout']
+    eggs = os.path.join(sample_buildout, 'eggs')
+
+    # If the zc.buildout dist is a develop dist, convert it to a
+    # regular egg in the sample buildout
+    req = pkg_resources.Requirement.parse('zc.buildout')
+    dist = pkg_resources.working_set.find(req)
+    if dist.precedence == pkg_resources.DEVELOP_DIST:
+        # We have a develop egg, create a real egg for it:
+        here = os.getcwd()
+        os.chdir(os.path.dirname(dist.location))
+        zc.buildout.easy_install.call_subprocess(
+            [sys.executable,
+             os.path.join(os.path.dirname(dist.location), 'setup.py'),
+             '-q', 'bdist_egg', '-d', eggs],
+            env=dict(os.environ,
+                     PYTHONPATH=pkg_resources.working_set.find(
+                         pkg_resources.Requirement.parse('setuptools')
+                         ).location,
+                     ),
+            )
+        os.chdir(here)
+        os.remove(os.path.join(eggs, 'zc.buildout.egg-link'))
+
+        # Rebuild the buildout script
+        ws = pkg_resources.WorkingSet([eggs])
+        ws.require('zc.buildout')
+        zc.buildout.easy_install.scripts(
+            ['zc.buildout'], ws, sys.executable,
+            os.path.join(sample_buildout, 'bin'))
+    else:
+        ws = pkg_resources.working_set
+    return ws
+
+def updateSetup(test):
+    zc.buildout.testing.buildoutSetUp(test)
+    new_releases = test.globs['tmpdir']('new_releases')
+    test.globs['new_releases'] = new_releases
+    ws = getWorkingSetWithBuildoutEgg(test)
+    # now let's make the new releases
+    makeNewRelease('zc.buildout', ws, new_releases)
+    os.mkdir(os.path.join(new_releases, 'zc.buildout'))
+    makeNewRelease('setuptools', ws, new_releases)
+    os.mkdir(os.path.join(new_releases, 'setuptools'))
+
+bootstrap_py = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.dirname(__file__)))),
+    'bootstrap', 'bootstrap.py')
+
+def bootstrapSetup(test):
+    buildout_txt_setup(test)
+    test.globs['link_server'] = test.globs['start_server'](
+        test.globs['sample_eggs'])
+    sample_eggs = test.globs['sample_eggs']
+    ws = getWorkingSetWithBuildoutEgg(test)
+    makeNewRelease('zc.buildout', ws, sample_eggs, '2.0.0')
+    makeNewRelease('zc.buildout', ws, sample_eggs, '22.0.0')
+    os.environ['bootstrap-testing-find-links'] = test.globs['link_server']
+    test.globs['bootstrap_py'] = bootstrap_py
+
+normalize_bang = (
+    re.compile(re.escape('#!'+
+                         zc.buildout.easy_install._safe_arg(sys.executable))),
+    '#!/usr/local/bin/python2.7',
+    )
+
+normalize_S = (
+    re.compile(r'#!/usr/local/bin/python2.7 -S'),
+    '#!/usr/local/bin/python2.7',
+    )
+
+def test_suite():
+    test_suite = [
+        manuel.testing.TestSuite(
+            manuel.doctest.Manuel() + manuel.capture.Manuel(),
+            'configparser.test'),
+        manuel.testing.TestSuite(
+            manuel.doctest.Manuel(
+                checker=renormalizing.RENormalizing([
+                    zc.buildout.testing.normalize_path,
+                    zc.buildout.testing.normalize_endings,
+                    zc.buildout.testing.normalize_script,
+                    zc.buildout.testing.normalize_egg_py,
+                    zc.buildout.testing.not_found,
+                    zc.buildout.testing.adding_find_link,
+                    # (re.compile(r"Installing 'zc.buildout >=\S+"), ''),
+                    (re.compile('__buildout_signature__ = recipes-\S+'),
+                     '__buildout_signature__ = recipes-SSSSSSSSSSS'),
+                    (re.compile('executable = [\S ]+python\S*', re.I),
+                     'executable = python'),
+                    (re.compile('[-d]  (setuptools|setuptools)-\S+[.]egg'),
+                     'setuptools.egg'),
+                    (re.compile('zc.buildout(-\S+)?[.]egg(-link)?'),
+                     'zc.buildout.egg'),
+                    (re.compile('creating \S*setup.cfg'), 'creating setup.cfg'),
+                    (re.compile('hello\%ssetup' % os.path.sep), 'hello/setup'),
+                    (re.compile('Picked: (\S+) = \S+'),
+                     'Picked: \\1 = V.V'),
+                    (re.compile(r'We have a develop egg: zc.buildout (\S+)'),
+                     'We have a develop egg: zc.buildout X.X.'),
+                    (re.compile(r'\\[\\]?'), '/'),
+                    (re.compile('WindowsError'), 'OSError'),
+                    (re.compile(r'\[Error \d+\] Cannot create a file '
+                                r'when that file already exists: '),
+                     '[Errno 17] File exists: '
+                     ),
+                    (re.compile('setuptools'), 'setuptools'),
+                    (re.compile('Got zc.recipe.egg \S+'), 'Got zc.recipe.egg'),
+                    (re.compile(r'zc\.(buildout|recipe\.egg)\s*= >=\S+'),
+                     'zc.\1 = >=1.99'),
+                    ])
+                ) + manuel.capture.Manuel(),
+            'buildout.txt', 'meta-recipes.txt',
+            setUp=buildout_txt_setup,
+            tearDown=zc.buildout.testing.buildoutTearDown,
+            ),
+        doctest.DocFileSuite(
+            'runsetup.txt', 'repeatable.txt', 'setup.txt',
+            setUp=zc.buildout.testing.buildoutSetUp,
+            tearDown=zc.buildout.testing.buildoutTearDown,
+            checker=renormalizing.RENormalizing([
+               zc.buildout.testing.normalize_path,
+               zc.buildout.testing.normalize_endings,
+               zc.buildout.testing.normalize_script,
+               zc.buildout.testing.normalize_egg_py,
+               zc.buildout.testing.not_found,
+               zc.buildout.testing.adding_find_link,
+               # (re.compile(r"Installing 'zc.buildout >=\S+"), ''),
+               # (re.compile(r"Getting distribution for 'zc.buildout >=\S+"),
+               #  ''),
+               (re.compile('__buildout_signature__ = recipes-\S+'),
+                '__buildout_signature__ = recipes-SSSSSSSSSSS'),
+               (re.compile('[-d]  setuptools-\S+[.]egg'), 'setuptools.egg'),
+               (re.compile('zc.buildout(-\S+)?[.]egg(-link)?'),
+                'zc.buildout.egg'),
+               (re.compile('creating \S*setup.cfg'), 'creating setup.cfg'),
+               (re.compile('hello\%ssetup' % os.path.sep), 'hello/setup'),
+               (re.compile('Picked: (\S+) = \S+'),
+                'Picked: \\1 = V.V'),
+               (re.compile(r'We have a develop egg: zc.buildout (\S+)'),
+                'We have a develop egg: zc.buildout X.X.'),
+               (re.compile(r'\\[\\]?'), '/'),
+               (re.compile('WindowsError'), 'OSError'),
+               (re.compile('setuptools = \S+'), 'setuptools = 0.7.99'),
+               (re.compile(r'\[Error 17\] Cannot create a file '
+                           r'when that file already exists: '),
+                '[Errno 17] File exists: '
+                ),
+               (re.compile('executable = %s' % re.escape(sys.executable)),
+                'executable = python'),
+               (re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{6}'),
+                'YYYY-MM-DD hh:mm:ss.dddddd'),
+               ]),
+            ),
+        doctest.DocFileSuite(
+            'debugging.txt',
+            setUp=zc.buildout.testing.buildoutSetUp,
+            tearDown=zc.buildout.testing.buildoutTearDown,
+            checker=renormalizing.RENormalizing([
+                zc.buildout.testing.normalize_path,
+                zc.buildout.testing.normalize_endings,
+                zc.buildout.testing.normalize_exception_type_for_python_2_and_3,
+                zc.buildout.testing.not_found,
+                zc.buildout.testing.adding_find_link,
+                (re.compile('zc.buildout.buildout.MissingOption'),
+                 'MissingOption'),
+                (re.compile(r'\S+buildout.py'), 'buildout.py'),
+                (re.compile(r'line \d+'), 'line NNN'),
+                (re.compile(r'py\(\d+\)'), 'py(NNN)'),
+                ])
+            ),
+
+        doctest.DocFileSuite(
+            'update.txt',
+            setUp=updateSetup,
+            tearDown=zc.buildout.testing.buildoutTearDown,
+            checker=renormalizing.RENormalizing([
+                (re.compile(r'(zc.buildout|setuptools)-\d+[.]\d+\S*'
+                            '-py\d.\d.egg'),
+                 '\\1.egg'),
+                zc.buildout.testing.normalize_path,
+                zc.buildout.testing.normalize_endings,
+                zc.buildout.testing.normalize_script,
+                zc.buildout.testing.normalize_egg_py,
+                zc.buildout.testing.not_found,
+                zc.buildout.testing.adding_find_link,
+                normalize_bang,
+                normalize_S,
+                # (re.compile(r"Installing 'zc.buildout >=\S+"), ''),
+                (re.compile(r"Getting distribution for 'zc.buildout>=\S+"),
+                 ''),
+                (re.compile('99[.]99'), 'NINETYNINE.NINETYNINE'),
+                (re.compile(
+                    r'(zc.buildout|setuptools)( version)? \d+[.]\d+\S*'),
+                 '\\1 V.V'),
+                (re.compile('[-d]  setuptools'), '-  setuptools'),
+                (re.compile(re.escape(os.path.sep)+'+'), '/'),
+               ])
+            ),
+
+        doctest.DocFileSuite(
+            'easy_install.txt', 'downloadcache.txt', 'dependencylinks.txt',
+            'allowhosts.txt',
+            setUp=easy_install_SetUp,
+            tearDown=zc.buildout.testing.buildoutTearDown,
+            checker=renormalizing.RENormalizing([
+                zc.buildout.testing.normalize_script,
+                zc.buildout.testing.normalize_path,
+                zc.buildout.testing.normalize_endings,
+                zc.buildout.testing.normalize_egg_py,
+                zc.buildout.testing.normalize_exception_type_for_python_2_and_3,
+                zc.buildout.testing.adding_find_link,
+                zc.buildout.testing.not_found,
+                normalize_bang,
+                normalize_S,
+                (re.compile('[-d]  setuptools-\S+[.]egg'), 'setuptools.egg'),
+                (re.compile(r'\\[\\]?'), '/'),
+                (re.compile('(\n?)-  ([a-zA-Z_.-]+)\n-  \\2.exe\n'),
+                 '\\1-  \\2\n'),
+                ]+(sys.version_info < (2, 5) and [
+                  (re.compile('.*No module named runpy.*', re.S), ''),
+                  (re.compile('.*usage: pdb.py scriptfile .*', re.S), ''),
+                  (re.compile('.*Error: what does not exist.*', re.S), ''),
+                  ] or [])),
+
+
+            ),
+
+        doctest.DocFileSuite(
+            'download.txt', 'extends-cache.txt',
+            setUp=easy_install_SetUp,
+            tearDown=zc.buildout.testing.buildoutTearDown,
+            optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+            checker=renormalizing.RENormalizing([
+              zc.buildout.testing.normalize_exception_type_for_python_2_and_3,
+              zc.buildout.testing.not_found,
+              zc.buildout.testing.adding_find_link,
+              (re.compile(' at -?0x[^>]+'), '<MEM ADDRESS>'),
+              (re.compile('http://localhost:[0-9]{4,5}/'),
+               'http://localhost/'),
+              (re.compile('[0-9a-f]{32}'), '<MD5 CHECKSUM>'),
+              zc.buildout.testing.normalize_path,
+              zc.buildout.testing.ignore_not_upgrading,
+              ]),
+            ),
+
+        doctest.DocTestSuite(
+            setUp=easy_install_SetUp,
+            tearDown=zc.buildout.testing.buildoutTearDown,
+            checker=renormalizing.RENormalizing([
+                zc.buildout.testing.normalize_path,
+                zc.buildout.testing.normalize_endings,
+                zc.buildout.testing.normalize_script,
+                zc.buildout.testing.normalize_egg_py,
+                zc.buildout.testing.normalize___pycache__,
+                zc.buildout.testing.not_found,
+                zc.buildout.testing.normalize_exception_type_for_python_2_and_3,
+                zc.buildout.testing.adding_find_link,
+                normalize_bang,
+                (re.compile(r'^(\w+\.)*(Missing\w+: )'), '\2'),
+                (re.compile("buildout: Running \S*setup.py"),
+                 'buildout: Running setup.py'),
+                (re.compile('setuptools-\S+-'),
+                 'setuptools.egg'),
+                (re.compile('zc.buildout-\S+-'),
+                 'zc.buildout.egg'),
+                (re.compile('setuptools = \S+'), 'setuptools = 0.7.99'),
+                (re.compile('File "\S+one.py"'),
+                 'File "one.py"'),
+                (re.compile(r'We have a develop egg: (\S+) (\S+)'),
+                 r'We have a develop egg: \1 V'),
+                (re.compile('Picked: setuptools = \S+'),
+                 'Picked: setuptools = V'),
+                (re.compile('[-d]  setuptools'), '-  setuptools'),
+                (re.compile(r'\\[\\]?'), '/'),
+                (re.compile(
+                    '-q develop -mxN -d "/sample-buildout/develop-eggs'),
+                 '-q develop -mxN -d /sample-buildout/develop-eggs'
+                 ),
+                (re.compile(r'^[*]...'), '...'),
+                # for
+                # bug_92891
+                # bootstrap_crashes_with_egg_recipe_in_buildout_section
+                (re.compile(r"Unused options for buildout: 'eggs' 'scripts'\."),
+                 "Unused options for buildout: 'scripts' 'eggs'."),
+                # Python 3.4 changed the wording of NameErrors
+                (re.compile('NameError: global name'), 'NameError: name'),
+                # fix for test_distutils_scripts_using_import_are_properly_parsed
+                # and test_distutils_scripts_using_from_are_properly_parsed
+                # win32 apparently adds a " around sys.executable
+                (re.compile('#!"python"'), '#!python'),
+                ]),
+            ),
+        zc.buildout.rmtree.test_suite(),
+        doctest.DocFileSuite(
+            'windows.txt',
+            setUp=zc.buildout.testing.buildoutSetUp,
+            tearDown=zc.buildout.testing.buildoutTearDown,
+            checker=renormalizing.RENormalizing([
+               zc.buildout.testing.normalize_path,
+               zc.buildout.testing.normalize_endings,
+               zc.buildout.testing.normalize_script,
+               zc.buildout.testing.normalize_egg_py,
+               zc.buildout.testing.not_found,
+               zc.buildout.testing.adding_find_link,
+               (re.compile('__buildout_signature__ = recipes-\S+'),
+                '__buildout_signature__ = recipes-SSSSSSSSSSS'),
+               (re.compile('[-d]  setuptools-\S+[.]egg'), 'setuptools.egg'),
+               (re.compile('zc.buildout(-\S+)?[.]egg(-link)?'),
+                'zc.buildout.egg'),
+               (re.compile('creating \S*setup.cfg'), 'creating setup.cfg'),
+               (re.compile('hello\%ssetup' % os.path.sep), 'hello/setup'),
+               (re.compile('Picked: (\S+) = \S+'),
+                'Picked: \\1 = V.V'),
+               (re.compile(r'We have a develop egg: zc.buildout (\S+)'),
+                'We have a develop egg: zc.buildout X.X.'),
+               (re.compile(r'\\[\\]?'), '/'),
+               (re.compile('WindowsError'), 'OSError'),
+               (re.compile(r'\[Error 17\] Cannot create a file '
+                           r'when that file already exists: '),
+                '[Errno 17] File exists: '
+                ),
+               ])
+            ),
+        doctest.DocFileSuite(
+            'testing_bugfix.txt'),
+    ]
+
+    # adding bootstrap.txt doctest to the suite
+    # only if bootstrap.py is present
+    if os.path.exists(bootstrap_py):
+        test_suite.append(doctest.DocFileSuite(
+            'bootstrap.txt', 'bootstrap_cl_settings.test',
+            setUp=bootstrapSetup,
+            tearDown=zc.buildout.testing.buildoutTearDown,
+            checker=renormalizing.RENormalizing([
+               zc.buildout.testing.normalize_path,
+               zc.buildout.testing.normalize_endings,
+               zc.buildout.testing.normalize_script,
+               zc.buildout.testing.not_found,
+               normalize_bang,
+               zc.buildout.testing.adding_find_link,
+               (re.compile('Downloading.*setuptools.*egg\n'), ''),
+               ]),
+            ))
+
+    return unittest.TestSuite(test_suite)
@@ -15,7 +15,9 @@
 """
 
 from zc.buildout.rmtree import rmtree
+from zc.buildout.timing import phase
 import zc.buildout.easy_install
+import zc.buildout.timing
 
 try:
     from hashlib import md5
@@ -27,6 +29,11 @@ try:
 except ImportError:
     from collections import MutableMapping as DictMixin
 
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
 try:
     from cStringIO import StringIO
 except ImportError:
@@ -38,18 +45,26 @@ import datetime
 import distutils.errors
 import errno
 import glob
+import hashlib
 import itertools
 import logging
+import marshal
+import multiprocessing.pool
 import os
+import pickle
 import pkg_resources
 import re
+import select
 import shutil
 import subprocess
 import sys
 import tempfile
+import time
 import pprint
 import zc.buildout
+import zc.buildout.cache
 import zc.buildout.download
+import zc.buildout.httpclient
 
 PY3 = sys.version_info[0] == 3
 if PY3:
@@ -180,6 +195,25 @@ def _print_annotate(data):
                     line = '   '
     print_()
 
+def _wait_child(running):
+    """Wait for one of the running child processes to exit
+
+    running maps the pids to tuples whose last item is the read end of a
+    pipe written to by the child when it's done.  Only these children are
+    waited for, since recipes may start processes of their own.
+    """
+    pids = dict((info[-1], pid) for pid, info in running.items())
+    while True:
+        for pid in running:
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                return pid, status
+        ready = select.select(list(pids), [], [], 1)[0]
+        if ready:
+            # The child is done and about to exit, or already exited.
+            pid = pids[ready[0]]
+            return pid, os.waitpid(pid, 0)[1]
+
 def _remove_ignore_missing(path):
     try:
         os.remove(path)
@@ -246,6 +280,10 @@ network_cache_parameter_dict = {}
 class Buildout(DictMixin):
 
     installed_part_options = None
+    _installed_saved = None
+    _installed_dirty = frozenset()
+    _trash_pool = None
+    _check_pool = None
 
     def __init__(self, config_file, cloptions,
                  user_defaults=True,
@@ -305,8 +343,10 @@ class Buildout(DictMixin):
 
         # load configuration files
         if config_file:
-            _update(data, _open(os.path.dirname(config_file), config_file, [],
-                                data['buildout'].copy(), override, set()))
+            with phase('load configuration', file=config_file):
+                _update(data, _open(os.path.dirname(config_file), config_file,
+                                    [], data['buildout'].copy(), override,
+                                    set()))
 
         # apply command-line options
         _update(data, cloptions)
@@ -341,7 +381,9 @@ class Buildout(DictMixin):
         # and considering the location of the configuration file that generated
         # the setting as the base path, falling back to the main configuration
         # file location
-        for name in ('download-cache', 'eggs-directory', 'extends-cache'):
+        for name in ('download-cache', 'eggs-directory', 'extends-cache',
+                     'parse-cache', 'dir-hash-cache', 'index-cache',
+                     'egg-store', 'dist-index-cache', 'resolution-cache'):
             if name in data['buildout']:
                 origdir, src = data['buildout'][name]
                 if not origdir:
@@ -469,6 +511,62 @@ class Buildout(DictMixin):
         zc.buildout.easy_install.store_required_by(self.show_picked_versions or
                                                    self.update_versions_file)
 
+        self.jobs = _positive_int_option(options, 'jobs')
+        self.download_jobs = _positive_int_option(options, 'download-jobs')
+        zc.buildout.easy_install.download_jobs(self.download_jobs)
+
+        if options.get('download-cache-layout', 'name') not in (
+            'name', 'content'):
+            self._error("Invalid download-cache-layout %s",
+                        options['download-cache-layout'])
+
+        zc.buildout.download.download_segments(options)
+
+        download_cache_size = options.get('download-cache-size')
+        self.download_cache_size = None
+        if download_cache_size:
+            self.download_cache_size = zc.buildout.cache.parse_size(
+                download_cache_size)
+            if self.download_cache_size is None:
+                self._error("Invalid download-cache-size %s",
+                            download_cache_size)
+
+        _http_connections_per_host(options)
+
+        self.uninstall_jobs = _positive_int_option(options, 'uninstall-jobs')
+        self.uninstall_trash = bool_option(options, 'uninstall-trash', 'false')
+
+        self.check_installed_files = options.get('check-installed-files',
+                                                 'all')
+        if self.check_installed_files not in ('all', 'parallel', 'roots'):
+            self._error("Invalid check-installed-files %s",
+                        self.check_installed_files)
+
+        self.installed_format = options.get('installed-format', 'cfg')
+        if self.installed_format not in ('cfg', 'sqlite'):
+            self._error("Invalid installed-format %s", self.installed_format)
+
+        zc.buildout.easy_install.index_cache(options.get('index-cache'))
+        zc.buildout.easy_install.egg_store(options.get('egg-store'))
+        zc.buildout.easy_install.dist_index_cache(
+            options.get('dist-index-cache'))
+        zc.buildout.easy_install.resolution_cache(
+            options.get('resolution-cache'))
+        index_cache_ttl = options.get('index-cache-ttl', '0')
+        try:
+            zc.buildout.easy_install.index_cache_ttl(index_cache_ttl)
+        except ValueError:
+            self._error("Invalid index-cache-ttl %s", index_cache_ttl)
+
+        dir_hash_algorithm = options.get('dir-hash-algorithm')
+        if dir_hash_algorithm:
+            try:
+                hashlib.new(dir_hash_algorithm)
+            except ValueError:
+                self._error("Unsupported dir-hash-algorithm %s",
+                            dir_hash_algorithm)
+        _dir_hash_setup(options.get('dir-hash-cache'), dir_hash_algorithm)
+
         download_cache = options.get('download-cache')
         extends_cache = options.get('extends-cache')
         eggs_cache = options.get('eggs-directory')
@@ -634,22 +732,146 @@ class Buildout(DictMixin):
             self.install(())
 
     def install(self, install_args):
+        buildout = self['buildout']
+        skip_if_unchanged = (
+            bool_option(buildout, 'skip-if-unchanged', 'false') and
+            not (install_args or self.newest or self.dry_run or
+                 buildout.get('extensions'))
+            )
+        fingerprint_path = buildout['installed']
+        if fingerprint_path:
+            fingerprint_path += '.fingerprint'
+            if skip_if_unchanged:
+                with phase('check fingerprint'):
+                    unchanged = self._unchanged(fingerprint_path)
+                if unchanged:
+                    self._close_check_pool()
+                    self._logger.info("Nothing changed.")
+                    return
+            _remove_ignore_missing(fingerprint_path)
         try:
             self._install_parts(install_args)
         finally:
-            if self.installed_part_options is not None:
-                try:
-                    self._save_installed_options()
-                finally:
-                    del self.installed_part_options
+            try:
+                if self.installed_part_options is not None:
+                    try:
+                        with phase('save installed'):
+                            self._save_installed_options()
+                    finally:
+                        del self.installed_part_options
+            finally:
+                self._close_check_pool()
+                with phase('empty trash'):
+                    self._empty_trash()
+                if self.download_cache_size is not None:
+                    with phase('collect caches'):
+                        self._collect_caches(self.download_cache_size,
+                                             force=False)
         if self.show_picked_versions or self.update_versions_file:
             self._print_picked_versions()
         self._unload_extensions()
+        if skip_if_unchanged and fingerprint_path:
+            with open(fingerprint_path, 'w') as f:
+                f.write(self._fingerprint())
+
+    def _fingerprint(self):
+        """Return a digest of what the installation depends on
+
+        That is the configuration, including user defaults and
+        command-line options, the Python used, the content of develop
+        directories, the state of the eggs directories and the
+        installed parts.  The digests of the files of develop directories
+        are indexed, in the dir-hash-cache directory if set or else next
+        to the installed file, so that only files that changed are read.
+        """
+        buildout = self['buildout']
+        dir_hash_cache = (_dir_hash_cache or
+                          buildout['installed'] + '.dir-hashes')
+        hash = md5()
+        hash.update(repr(sorted(
+            (section, sorted(options.items()))
+            for section, options in self._annotated.items())).encode())
+        hash.update(('%s\0%s\0' % (sys.executable, sys.version)).encode())
+        for setup in buildout.get('develop', '').split():
+            setup = self._buildout_path(setup)
+            if os.path.isfile(setup):
+                setup = os.path.dirname(setup)
+            hash.update(_indexed_dir_hash(
+                setup, dir_hash_cache, _dir_hash_algorithm).encode())
+        for name in ('eggs-directory', 'develop-eggs-directory'):
+            try:
+                mtime = os.stat(buildout[name]).st_mtime
+            except OSError:
+                mtime = None
+            hash.update(('%r\0' % mtime).encode())
+        try:
+            with open(buildout['installed'], 'rb') as f:
+                hash.update(f.read())
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+        return hash.hexdigest()
+
+    def _unchanged(self, fingerprint_path):
+        """Tell whether nothing changed since the last installation
+
+        The fingerprint saved by the last installation must match and
+        the files of installed parts must still be there.
+        """
+        try:
+            with open(fingerprint_path) as f:
+                fingerprint = f.read()
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return False
+        if fingerprint != self._fingerprint():
+            return False
+        installed = self['buildout']['installed']
+        if not os.path.isfile(installed):
+            return True
+        sections = _read_installed(installed, lambda section, options: options)
+        for part in sections['buildout'].get('parts', '').split():
+            installed_files = sections[part].get('__buildout_installed__')
+            if installed_files and not self._installed_files_exist(
+                installed_files):
+                return False
+        return True
+
+    def _installed_files_exist(self, installed_files):
+        """Tell whether the files installed by a part are still there
+
+        Depending on the check-installed-files option, all files are
+        checked one after the other or using several threads, or only
+        files that aren't in installed directories are checked.  The
+        threads are shared by all parts of the run.
+        """
+        join = os.path.join
+        base = self._buildout_dir
+        paths = [f if '${' in f else join(base, f)
+                 for f in installed_files.split('\n')]
+        mode = self.check_installed_files
+        if mode == 'roots':
+            paths = _installed_roots(paths)
+        elif mode == 'parallel' and len(paths) > 1:
+            if self._check_pool is None:
+                self._check_pool = multiprocessing.pool.ThreadPool(
+                    _check_threads)
+            for exists in self._check_pool.imap_unordered(
+                os.path.exists, paths, 64):
+                if not exists:
+                    return False
+            return True
+        for path in paths:
+            if not os.path.exists(path):
+                return False
+        return True
 
     def _install_parts(self, install_args):
         __doing__ = 'Installing.'
 
-        self._load_extensions()
+        with phase('load extensions'):
+            self._load_extensions()
         self._setup_directories()
 
         # Add develop-eggs directory to path so that it gets searched
@@ -657,22 +879,28 @@ class Buildout(DictMixin):
         sys.path.insert(0, self['buildout']['develop-eggs-directory'])
 
         # Check for updates. This could cause the process to be restarted
-        self._maybe_upgrade()
+        with phase('upgrade'):
+            self._maybe_upgrade()
 
         # load installed data
-        installed_part_options = self._read_installed_part_options()
+        with phase('read installed'):
+            installed_part_options = self._read_installed_part_options()
         installed_parts = installed_part_options['buildout']['parts'].split()
 
-        # Remove old develop eggs
-        self._uninstall(
-            installed_part_options['buildout'].get(
-                'installed_develop_eggs', '')
-            )
+        with phase('develop'):
+            # Remove old develop eggs
+            self._uninstall(
+                installed_part_options['buildout'].get(
+                    'installed_develop_eggs', '')
+                )
 
-        # Build develop eggs
-        installed_develop_eggs = self._develop()
-        installed_part_options['buildout']['installed_develop_eggs'
-                                           ] = installed_develop_eggs
+            # Build develop eggs
+            installed_develop_eggs = self._develop()
+        if installed_part_options['buildout'].get(
+            'installed_develop_eggs') != installed_develop_eggs:
+            installed_part_options['buildout']['installed_develop_eggs'
+                                               ] = installed_develop_eggs
+            self._installed_dirty.add('buildout')
 
         # From now, the caller will update the .installed.cfg at return.
         self.installed_part_options = installed_part_options
@@ -686,7 +914,8 @@ class Buildout(DictMixin):
             uninstall_missing = True
 
         # load and initialize recipes
-        [self[part]['recipe'] for part in install_parts]
+        with phase('load recipes'):
+            [self[part]['recipe'] for part in install_parts]
         if not install_args:
             install_parts = self._parts
 
@@ -701,7 +930,8 @@ class Buildout(DictMixin):
 
 
         # compute new part recipe signatures
-        self._compute_part_signatures(install_parts)
+        with phase('signatures'):
+            self._compute_part_signatures(install_parts)
 
         # uninstall parts that are no-longer used or who's configs
         # have changed
@@ -729,10 +959,7 @@ class Buildout(DictMixin):
                     # reinstall.
                     if not installed_files:
                         continue
-                    for f in installed_files.split('\n'):
-                        if not os.path.exists(self._buildout_path(f)):
-                            break
-                    else:
+                    if self._installed_files_exist(installed_files):
                         continue
 
                 # output debugging info
@@ -758,74 +985,274 @@ class Buildout(DictMixin):
             installed_parts = [p for p in installed_parts if p != part]
             installed_part_options['buildout']['parts'] = (
                 ' '.join(installed_parts))
+            self._installed_dirty.add('buildout')
 
         # Check for unused buildout options:
         _check_for_unused_options_in_section(self, 'buildout')
 
         # install new parts
+        if (self.jobs > 1 and len(install_parts) > 1 and not self.dry_run
+            and hasattr(os, 'fork')):
+            self._install_parts_in_parallel(
+                install_parts, installed_parts, installed_part_options)
+            return
+
         for part in install_parts:
+            if part in installed_parts:
+                __doing__ = 'Updating %s.', part
+                old_options = installed_part_options[part]
+            else:
+                __doing__ = 'Installing %s.', part
+                old_options = None
             signature = self[part].pop('__buildout_signature__')
             saved_options = self[part].copy()
-            recipe = self[part].recipe
-            if part in installed_parts: # update
-                __doing__ = 'Updating %s.', part
-                self._logger.info(*__doing__)
-                if self.dry_run:
+            try:
+                installed_files = self._run_part(part, old_options)
+            except Exception:
+                self._rollback_part(
+                    part, installed_parts, installed_part_options)
+                raise
+            if installed_files is None: # dry run
+                continue
+            self._record_part(part, signature, saved_options, installed_files,
+                              installed_parts, installed_part_options)
+
+    def _run_part(self, part, old_options):
+        """Call the install or update method of the recipe of a part
+
+        The part is updated if old_options, its installed options, are
+        given.  Return the installed files, as saved in .installed.cfg,
+        or None in dry-run mode.
+        """
+        recipe = self[part].recipe
+        if old_options is not None: # update
+            self._logger.info('Updating %s.', part)
+            if self.dry_run:
+                return None
+            installed_files = old_options['__buildout_installed__']
+
+            try:
+                update = recipe.update
+            except AttributeError:
+                update = recipe.install
+                self._logger.warning(
+                    "The recipe for %s doesn't define an update "
+                    "method. Using its install method.",
+                    part)
+
+            with phase('update', 'part', part=part):
+                updated_files = self[part]._call(update)
+
+            if updated_files:
+                installed_files = set(installed_files.split('\n'))
+                (installed_files.add if isinstance(updated_files, str) else
+                 installed_files.update)(updated_files)
+                installed_files = '\n'.join(sorted(installed_files))
+
+        else: # install
+            self._logger.info('Installing %s.', part)
+            if self.dry_run:
+                return None
+            with phase('install', 'part', part=part):
+                installed_files = self[part]._call(recipe.install)
+            if installed_files is None:
+                self._logger.warning(
+                    "The %s install returned None.  A path or "
+                    "iterable os paths should be returned.",
+                    part)
+                installed_files = ""
+            elif not isinstance(installed_files, str):
+                installed_files = '\n'.join(installed_files)
+
+        return installed_files
+
+    def _rollback_part(self, part, installed_parts, installed_part_options):
+        # A failed update leaves the part in an unknown state, so we
+        # uninstall it. A failed install has already been cleaned up.
+        if part in installed_parts:
+            installed_parts.remove(part)
+            self._uninstall(
+                installed_part_options[part]['__buildout_installed__'])
+            installed_part_options['buildout']['parts'] = (
+                ' '.join(installed_parts))
+            self._installed_dirty.add('buildout')
+
+    def _record_part(self, part, signature, saved_options, installed_files,
+                     installed_parts, installed_part_options):
+        saved_options['__buildout_installed__'] = installed_files
+        saved_options['__buildout_signature__'] = signature
+        installed_part_options[part] = saved_options
+        self._installed_dirty.add(part)
+
+        if part not in installed_parts:
+            installed_parts.append(part)
+            installed_part_options['buildout']['parts'] = (
+                ' '.join(installed_parts))
+            self._installed_dirty.add('buildout')
+            _check_for_unused_options_in_section(self, part)
+
+        if self._log_level < logging.INFO:
+            self._save_installed_options()
+
+    def _part_dependencies(self, parts):
+        """Return a mapping from each part to the parts it depends on
+
+        A part depends on the parts it references, either directly or
+        through other (non-part) sections.
+        """
+        parts_set = set(parts)
+        result = {}
+        for part in parts:
+            dependencies = set()
+            seen = set()
+            todo = list(self[part].depends)
+            while todo:
+                section = todo.pop()
+                if section in seen:
                     continue
-                old_options = installed_part_options[part]
-                installed_files = old_options['__buildout_installed__']
+                seen.add(section)
+                if section in parts_set:
+                    dependencies.add(section)
+                else:
+                    options = self._data.get(section)
+                    if options is not None:
+                        todo.extend(options.depends)
+            dependencies.discard(part)
+            result[part] = dependencies
+        return result
+
+    def _install_parts_in_parallel(self, install_parts, installed_parts,
+                                   installed_part_options):
+        """Install or update parts in up to ``jobs`` child processes
 
+        Parts are started in order as soon as all the parts they depend
+        on are done. Recipes are run in forked processes because they
+        may change the current directory. Results are recorded by this
+        process as parts complete, so that .installed.cfg stays
+        consistent if one of them fails.
+        """
+        dependencies = self._part_dependencies(install_parts)
+        pending = list(install_parts)
+        running = {}
+        failed = None
+        try:
+            while running or (pending and failed is None):
+                if failed is None:
+                    busy = set(pending)
+                    busy.update(p[0] for p in running.values())
+                    ready = [part for part in pending
+                             if not dependencies[part] & busy]
+                    if not (ready or running):
+                        # Parts referencing each other: use the given order.
+                        ready = pending[:1]
+                    for part in ready[:self.jobs - len(running)]:
+                        pending.remove(part)
+                        pid, info = self._fork_part(
+                            part, installed_parts, installed_part_options)
+                        running[pid] = info
+
+                pid, status = _wait_child(running)
+                part, signature, saved_options, result_path, fd = \
+                    running.pop(pid)
+                os.close(fd)
                 try:
-                    update = recipe.update
-                except AttributeError:
-                    update = recipe.install
-                    self._logger.warning(
-                        "The recipe for %s doesn't define an update "
-                        "method. Using its install method.",
-                        part)
+                    with open(result_path, 'rb') as f:
+                        result = pickle.load(f)
+                except (IOError, EOFError, pickle.UnpicklingError):
+                    result = False, zc.buildout.UserError(
+                        "The process installing %s exited unexpectedly"
+                        " (status %s)." % (part, status)), {}, [], ([], {})
+                finally:
+                    _remove_ignore_missing(result_path)
+
+                ok, value, used, events, picked = result
+                self[part]._data.update(used)
+                zc.buildout.timing.extend(events)
+                zc.buildout.easy_install.add_picked_versions(*picked)
+                if ok:
+                    self._record_part(part, signature, saved_options, value,
+                                      installed_parts, installed_part_options)
+                else:
+                    if failed is None:
+                        failed = part, value, part in installed_parts
+                    self._rollback_part(
+                        part, installed_parts, installed_part_options)
+        finally:
+            for pid in running:
+                os.waitpid(pid, 0)
+                os.close(running[pid][4])
+                _remove_ignore_missing(running[pid][3])
+
+        if failed is not None:
+            part, error, updating = failed
+            if updating:
+                __doing__ = 'Updating %s.', part
+            else:
+                __doing__ = 'Installing %s.', part
+            raise error
 
+    def _fork_part(self, part, installed_parts, installed_part_options):
+        options = self[part]
+        signature = options.pop('__buildout_signature__')
+        saved_options = options.copy()
+        fd, result_path = tempfile.mkstemp(prefix='buildout-part-')
+        os.close(fd)
+        # Written to when the child is done, to wake up _wait_child.
+        done_r, done_w = os.pipe()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if not pid:
+            status = 1
+            try:
+                os.close(done_r)
+                before = set(options._data)
+                marker = zc.buildout.timing.mark()
+                picked_versions, required_by = \
+                    zc.buildout.easy_install.get_picked_versions()
+                picked_versions = dict(picked_versions)
+                required_by = dict((req, set(dists))
+                                   for req, dists in required_by.items())
+                if part in installed_parts:
+                    old_options = installed_part_options[part]
+                else:
+                    old_options = None
                 try:
-                    updated_files = self[part]._call(update)
+                    result = True, self._run_part(part, old_options)
                 except Exception:
-                    installed_parts.remove(part)
-                    self._uninstall(installed_files)
-                    installed_part_options['buildout']['parts'] = (
-                        ' '.join(installed_parts))
-                    raise
-
-                if updated_files:
-                    installed_files = set(installed_files.split('\n'))
-                    (installed_files.add if isinstance(updated_files, str) else
-                     installed_files.update)(updated_files)
-                    installed_files = '\n'.join(sorted(installed_files))
-
-            else: # install
-                __doing__ = 'Installing %s.', part
-                self._logger.info(*__doing__)
-                if self.dry_run:
-                    continue
-                installed_files = self[part]._call(recipe.install)
-                if installed_files is None:
-                    self._logger.warning(
-                        "The %s install returned None.  A path or "
-                        "iterable os paths should be returned.",
-                        part)
-                    installed_files = ""
-                elif not isinstance(installed_files, str):
-                    installed_files = '\n'.join(installed_files)
-
-            saved_options['__buildout_installed__'] = installed_files
-            saved_options['__buildout_signature__'] = signature
-            installed_part_options[part] = saved_options
-
-            if part not in installed_parts:
-                installed_parts.append(part)
-                installed_part_options['buildout']['parts'] = (
-                    ' '.join(installed_parts))
-                _check_for_unused_options_in_section(self, part)
-
-            if self._log_level < logging.INFO:
-                self._save_installed_options()
+                    error = sys.exc_info()[1]
+                    if not isinstance(error, zc.buildout.UserError):
+                        self._logger.exception("Error installing %s.", part)
+                    try:
+                        pickle.dumps(error)
+                    except Exception:
+                        error = zc.buildout.UserError(
+                            "%s: %s" % (error.__class__.__name__, error))
+                    result = False, error
+                used = dict((k, v) for (k, v) in options._data.items()
+                            if k not in before)
+                picked = zc.buildout.easy_install.get_picked_versions()
+                picked = (
+                    [(name, version) for (name, version) in picked[0]
+                     if picked_versions.get(name) != version],
+                    dict((req, dists - required_by.get(req, set()))
+                         for req, dists in picked[1].items()
+                         if dists - required_by.get(req, set())))
+                with open(result_path, 'wb') as f:
+                    pickle.dump(
+                        result + (used, zc.buildout.timing.events(marker),
+                                  picked),
+                        f, 2)
+                status = 0
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                try:
+                    os.write(done_w, b'.')
+                finally:
+                    os._exit(status)
+        os.close(done_w)
+        return pid, (part, signature, saved_options, result_path, done_r)
 
     def _uninstall_part(self, part, installed_part_options):
         # uninstall part
@@ -834,19 +1261,20 @@ class Buildout(DictMixin):
         if self.dry_run:
             return
 
-        # run uuinstall recipe
-        recipe, entry = _recipe(installed_part_options[part])
-        try:
-            uninstaller = _install_and_load(
-                recipe, 'zc.buildout.uninstall', entry, self)
-            self._logger.info('Running uninstall recipe.')
-            uninstaller(part, installed_part_options[part])
-        except (ImportError, pkg_resources.DistributionNotFound):
-            pass
+        with phase('uninstall', 'part', part=part):
+            # run uuinstall recipe
+            recipe, entry = _recipe(installed_part_options[part])
+            try:
+                uninstaller = _install_and_load(
+                    recipe, 'zc.buildout.uninstall', entry, self)
+                self._logger.info('Running uninstall recipe.')
+                uninstaller(part, installed_part_options[part])
+            except (ImportError, pkg_resources.DistributionNotFound):
+                pass
 
-        # remove created files and directories
-        self._uninstall(
-            installed_part_options[part]['__buildout_installed__'])
+            # remove created files and directories
+            self._uninstall(
+                installed_part_options[part]['__buildout_installed__'])
 
     def _setup_directories(self):
         __doing__ = 'Setting up buildout directories'
@@ -918,47 +1346,60 @@ class Buildout(DictMixin):
                     "Unexpected entry, %r, in develop-eggs directory.", f)
 
     def _compute_part_signatures(self, parts):
-        # Compute recipe signature and add to options
+        # Compute recipe signature and add to options.  Each recipe is
+        # resolved once, and the digest of each dependency section is
+        # computed once, until the section gets its own signature.
+        recipe_sigs = {}
+        digests = {}
         for part in parts:
             options = self.get(part)
             if options is None:
                 options = self[part] = {}
             recipe, entry = _recipe(options)
-            req = pkg_resources.Requirement.parse(recipe)
-            sig = sorted(set(_dists_sig(pkg_resources.working_set.resolve([req]))))
+            sig = recipe_sigs.get(recipe)
+            if sig is None:
+                req = pkg_resources.Requirement.parse(recipe)
+                sig = recipe_sigs[recipe] = sorted(set(_dists_sig(
+                    pkg_resources.working_set.resolve([req]))))
+            sig = sig[:]
             for dependency in sorted(options.depends):
-                m = md5()
-                for item in sorted(self[dependency].items()):
-                    m.update(('%r\0%r\0' % item).encode())
-                sig.append('%s:%s' % (dependency, m.hexdigest()))
+                digest = digests.get(dependency)
+                if digest is None:
+                    m = md5()
+                    for item in sorted(self[dependency].items()):
+                        m.update(('%r\0%r\0' % item).encode())
+                    digest = digests[dependency] = m.hexdigest()
+                sig.append('%s:%s' % (dependency, digest))
             options['__buildout_signature__'] = ' '.join(sig)
+            digests.pop(part, None)
 
     def _read_installed_part_options(self):
         old = self['buildout']['installed']
+        # Sections whose installed options changed since they were saved
+        self._installed_dirty = set()
         if old and os.path.isfile(old):
-            fp = open(old)
-            sections = zc.buildout.configparser.parse(fp, old)
-            fp.close()
-            result = {}
-            for section, options in sections.items():
-                for option, value in options.items():
-                    if '%(' in value:
-                        for k, v in _spacey_defaults:
-                            value = value.replace(k, v)
-                        options[option] = value
-                result[section] = self.Options(self, section, options)
-
+            result = _read_installed(old, self._installed_options)
+            self._installed_saved = getattr(result, 'saved', None)
             return result
         else:
+            self._installed_saved = None
             return {'buildout': self.Options(self, 'buildout', {'parts': ''})}
 
+    def _installed_options(self, section, options):
+        for option, value in options.items():
+            if '%(' in value:
+                for k, v in _spacey_defaults:
+                    value = value.replace(k, v)
+                options[option] = value
+        return self.Options(self, section, options)
+
     def _uninstall(self, installed):
         for f in installed.split('\n'):
             if not f:
                 continue
             f = self._buildout_path(f)
             if os.path.isdir(f):
-                rmtree(f)
+                self._rmtree(f)
             elif os.path.isfile(f):
                 try:
                     os.remove(f)
@@ -975,6 +1416,83 @@ class Buildout(DictMixin):
                         ):
                         raise
 
+    def _rmtree(self, path):
+        """Remove a directory, maybe after moving it to the trash
+
+        With the uninstall-trash option, directories are moved to the
+        trash directory and removed in the background, until the end of
+        the run.  Directories that can't be moved, e.g. because they are
+        on another file system, are removed right away.
+        """
+        if self.uninstall_trash and not os.path.islink(path):
+            trash = self._buildout_path('.trash')
+            try:
+                if not os.path.isdir(trash):
+                    os.mkdir(trash)
+                tmp = tempfile.mkdtemp(dir=trash)
+            except OSError:
+                pass
+            else:
+                try:
+                    os.rename(path, os.path.join(tmp, os.path.basename(path)))
+                except OSError:
+                    os.rmdir(tmp)
+                else:
+                    if self._trash_pool is None:
+                        self._trash_pool = multiprocessing.pool.ThreadPool(1)
+                        # Also remove what interrupted runs left
+                        for name in os.listdir(trash):
+                            name = os.path.join(trash, name)
+                            if name != tmp:
+                                self._trash_pool.apply_async(
+                                    self._remove_trash, (name,))
+                    self._trash_pool.apply_async(self._remove_trash, (tmp,))
+                    return
+        rmtree(path, self.uninstall_jobs)
+
+    def _remove_trash(self, path):
+        try:
+            rmtree(path, self.uninstall_jobs)
+        except Exception:
+            self._logger.warning("Couldn't remove %s: %s",
+                                 path, sys.exc_info()[1])
+
+    def _close_check_pool(self):
+        pool = self._check_pool
+        if pool is not None:
+            self._check_pool = None
+            pool.terminate()
+            pool.join()
+
+    def _empty_trash(self):
+        """Wait for directories moved to the trash to be removed
+        """
+        pool = self._trash_pool
+        if pool is not None:
+            self._trash_pool = None
+            pool.close()
+            pool.join()
+            try:
+                os.rmdir(self._buildout_path('.trash'))
+            except OSError:
+                pass
+
+    def _collect_caches(self, max_size, force=True):
+        """Remove unused files from the download and extends caches
+
+        Unless force is true, caches collected recently are skipped.
+        """
+        options = self['buildout']
+        directories = [os.path.join(options['directory'], options[name])
+                       for name in ('download-cache', 'extends-cache')
+                       if options.get(name)]
+        if not directories:
+            return
+        count, size = zc.buildout.cache.collect(directories, max_size, force)
+        if count:
+            self._logger.info("Removed %d files (%d bytes) from caches.",
+                              count, size)
+
     def _install(self, part):
         options = self[part]
         recipe, entry = _recipe(options)
@@ -1000,7 +1518,12 @@ class Buildout(DictMixin):
         installed_part_options = self.installed_part_options
         buildout = installed_part_options['buildout']
         installed_parts = buildout['parts']
-        if installed_parts or buildout['installed_develop_eggs']:
+        if ((installed_parts or buildout['installed_develop_eggs'])
+            and self.installed_format == 'sqlite'):
+            self._installed_saved = _save_installed(
+                installed_path, installed_part_options, self._installed_saved,
+                self._installed_dirty)
+        elif installed_parts or buildout['installed_develop_eggs']:
             new = StringIO()
             _save_options('buildout', buildout, new)
             for part in installed_parts.split():
@@ -1008,8 +1531,11 @@ class Buildout(DictMixin):
                 _save_options(part, installed_part_options[part], new)
             new = new.getvalue()
             try:
-                with open(installed_path) as f:
-                    save = f.read(1+len(new)) != new
+                if _is_sqlite(installed_path):
+                    save = True
+                else:
+                    with open(installed_path) as f:
+                        save = f.read(1+len(new)) != new
             except IOError as e:
                 if e.errno != errno.ENOENT:
                     raise
@@ -1026,6 +1552,7 @@ class Buildout(DictMixin):
                     _remove_ignore_missing(installed_tmp)
         else:
             _remove_ignore_missing(installed_path)
+        self._installed_dirty = set()
 
     def _error(self, message, *args):
         raise zc.buildout.UserError(message % args)
@@ -1261,6 +1788,17 @@ class Buildout(DictMixin):
     def annotate(self, args=None):
         _print_annotate(self._annotated)
 
+    def cache_gc(self, args):
+        if len(args) > 1:
+            raise zc.buildout.UserError(
+                "The cache-gc command takes at most a size.")
+        max_size = self.download_cache_size
+        if args:
+            max_size = zc.buildout.cache.parse_size(args[0])
+            if max_size is None:
+                raise zc.buildout.UserError("Invalid cache size %s" % args[0])
+        self._collect_caches(max_size)
+
     def print_options(self):
         for section in sorted(self._data):
             if section == 'buildout' or section == self['buildout']['versions']:
@@ -1274,7 +1812,8 @@ class Buildout(DictMixin):
                 print_("%s =%s" % (k, v))
 
     def initialize(self, options, reqs, entry):
-        recipe_class = _install_and_load(reqs, 'zc.buildout', entry, self)
+        with phase('load recipe', 'recipe', spec=reqs):
+            recipe_class = _install_and_load(reqs, 'zc.buildout', entry, self)
         self._initializing.append(options)
         try:
             return recipe_class(self, options.name, options)
@@ -1435,10 +1974,8 @@ class Options(DictMixin):
 
     def _dosub(self, option, v):
         __doing__ = 'Getting option %s:%s.', self.name, option
-        seen = [(self.name, option)]
-        v = '$$'.join([self._sub(s, seen, last=False)
-                       for s in v.split('$$')])
-        self._cooked[option] = v
+        seen = set([(self.name, option)])
+        self._cooked[option] = self._expand(v, seen)
 
     def get(self, *args, **kw):
       v = self._get(*args, **kw)
@@ -1470,16 +2007,15 @@ class Options(DictMixin):
         if '${' in v:
             key = self.name, option
             if seen is None:
-                seen = [key]
+                seen = set([key])
             elif key in seen:
                 raise zc.buildout.UserError(
                     "Circular reference in substitutions.\n"
                     )
             else:
-                seen.append(key)
-            v = '$$'.join([self._sub(s, seen, last=False)
-                           for s in v.split('$$')])
-            seen.pop()
+                seen.add(key)
+            v = self._expand(v, seen)
+            seen.remove(key)
 
         self._data[option] = v
         if last:
@@ -1487,35 +2023,73 @@ class Options(DictMixin):
         else:
             return v
 
+    # Compiled templates, by raw value, shared by all sections
+    _compiled = {}
+    _compiled_max = 1 << 16
+
+    def _compile(self, template):
+        """Return the parts of template separated by $$, compiled
+        """
+        compiled = self._compiled.get(template)
+        if compiled is None:
+            compiled = tuple([self._compile_part(part) if '${' in part
+                              else ((part,), ())
+                              for part in template.split('$$')])
+            if len(self._compiled) >= self._compiled_max:
+                self._compiled.clear()
+            self._compiled[template] = compiled
+        return compiled
+
     _template_split = re.compile('([$]{[^}]*})').split
     _simple = re.compile('[-a-zA-Z0-9 ._]+$').match
     _valid = re.compile('\${[-a-zA-Z0-9 ._]*:[-a-zA-Z0-9 ._]+}$').match
-    def _sub(self, template, seen, last=True):
+    def _compile_part(self, template):
+        """Split template into literal strings and references
+
+        References are (section, option) tuples, or error messages for
+        invalid ones, which are only raised when the template is expanded.
+        """
         value = self._template_split(template)
-        subs = []
+        refs = []
         for ref in value[1::2]:
             s = tuple(ref[2:-1].split(':'))
             if not self._valid(ref):
                 if len(s) < 2:
-                    raise zc.buildout.UserError("The substitution, %s,\n"
-                                                "doesn't contain a colon."
-                                                % ref)
-                if len(s) > 2:
-                    raise zc.buildout.UserError("The substitution, %s,\n"
-                                                "has too many colons."
-                                                % ref)
-                if not self._simple(s[0]):
-                    raise zc.buildout.UserError(
-                        "The section name in substitution, %s,\n"
-                        "has invalid characters."
-                        % ref)
-                if not self._simple(s[1]):
-                    raise zc.buildout.UserError(
-                        "The option name in substitution, %s,\n"
-                        "has invalid characters."
-                        % ref)
+                    s = ("The substitution, %s,\n"
+                         "doesn't contain a colon."
+                         % ref)
+                elif len(s) > 2:
+                    s = ("The substitution, %s,\n"
+                         "has too many colons."
+                         % ref)
+                elif not self._simple(s[0]):
+                    s = ("The section name in substitution, %s,\n"
+                         "has invalid characters."
+                         % ref)
+                elif not self._simple(s[1]):
+                    s = ("The option name in substitution, %s,\n"
+                         "has invalid characters."
+                         % ref)
+            refs.append(s)
+        return tuple(value[::2]), tuple(refs)
+
+    def _expand(self, template, seen):
+        return '$$'.join([self._substitute(part, seen, False)
+                          for part in self._compile(template)])
 
-            section, option = s
+    def _sub(self, template, seen, last=True):
+        return self._substitute(self._compile_part(template), seen, last)
+
+    def _substitute(self, compiled, seen, last):
+        literals, refs = compiled
+        if not refs:
+            return literals[0]
+        subs = []
+        for ref in refs:
+            if not isinstance(ref, tuple):
+                # Reported in order, after earlier references are expanded
+                raise zc.buildout.UserError(ref)
+            section, option = ref
             if not section:
                 section = self.name
                 options = self
@@ -1535,7 +2109,7 @@ class Options(DictMixin):
             subs.append(v)
         subs.append('')
 
-        return ''.join([''.join(v) for v in zip(value[::2], subs)])
+        return ''.join([''.join(v) for v in zip(literals, subs)])
 
     def __getitem__(self, key):
         v = self.get(key, _MARKER)
@@ -1667,6 +2241,148 @@ def _save_options(section, options, f):
     for option in sorted(options):
         _save_option(option, get_option(option), f)
 
+# Number of threads used to check installed files in parallel
+_check_threads = 16
+
+def _installed_roots(paths):
+    """Return the paths that aren't inside another one of paths
+    """
+    paths_set = set(paths)
+    roots = []
+    for path in paths:
+        parent = os.path.dirname(path)
+        while parent not in paths_set:
+            parent, child = os.path.dirname(parent), parent
+            if parent == child:
+                roots.append(path)
+                break
+    return roots
+
+_sqlite_magic = b'SQLite format 3\0'
+
+def _is_sqlite(path):
+    with open(path, 'rb') as f:
+        return f.read(len(_sqlite_magic)) == _sqlite_magic
+
+def _read_installed(path, wrap):
+    """Read the installed part options saved at path
+
+    Return a mapping from section names to the result of wrap(section,
+    options).  Sections of sqlite files are read as they are used.
+    """
+    if _is_sqlite(path):
+        return _InstalledParts(path, wrap)
+    with open(path) as f:
+        sections = zc.buildout.configparser.parse(f, path)
+    return dict((section, wrap(section, options))
+                for section, options in sections.items())
+
+class _InstalledParts(MutableMapping):
+    """Installed part options, loaded from an sqlite file when used
+
+    Each section is saved in the configuration file format.  saved is
+    the set of the sections in the file.
+    """
+
+    def __init__(self, path, wrap):
+        self._path = path
+        self._wrap = wrap
+        self._connection = None
+        self._loaded = {}
+        self.saved = set(name for name, in self._execute(
+            'SELECT name FROM parts'))
+        self._names = set(self.saved)
+
+    def _execute(self, query, args=()):
+        # Don't share a connection with forked processes
+        pid = os.getpid()
+        if self._connection is None or self._connection[0] != pid:
+            self._connection = pid, _sqlite_connect(self._path)
+        return self._connection[1].execute(query, args).fetchall()
+
+    def __contains__(self, section):
+        return section in self._names
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __getitem__(self, section):
+        try:
+            return self._loaded[section]
+        except KeyError:
+            if section not in self._names:
+                raise
+        text, = self._execute('SELECT data FROM parts WHERE name = ?',
+                              (section,))[0]
+        options = zc.buildout.configparser.parse(
+            StringIO(text), self._path)[section]
+        options = self._loaded[section] = self._wrap(section, options)
+        return options
+
+    def __setitem__(self, section, options):
+        self._loaded[section] = options
+        self._names.add(section)
+
+    def __delitem__(self, section):
+        self._names.remove(section)
+        self._loaded.pop(section, None)
+
+def _sqlite_connect(path):
+    import sqlite3
+    connection = sqlite3.connect(path)
+    connection.text_factory = str
+    return connection
+
+def _save_installed(path, installed_part_options, saved, dirty):
+    """Save installed part options in the sqlite file at path
+
+    saved is the set of the sections in the file, or None if unknown.
+    If given and the file is an sqlite file, only the sections in dirty,
+    or not in the file yet, are written, and the sections that aren't
+    installed anymore are removed.  Otherwise, a new file replaces it.
+    Return the new set of the sections in the file.
+    """
+    sections = ['buildout'] + installed_part_options['buildout'][
+        'parts'].split()
+    if saved is None or not (os.path.isfile(path) and _is_sqlite(path)):
+        saved = set()
+        tmp = path + '.tmp'
+        _remove_ignore_missing(tmp)
+    else:
+        saved = set(saved)
+        tmp = None
+    try:
+        connection = _sqlite_connect(tmp or path)
+        try:
+            if tmp:
+                connection.execute(
+                    'CREATE TABLE parts (name TEXT PRIMARY KEY, data TEXT)')
+            for section in sections:
+                if section in saved and section not in dirty:
+                    continue
+                new = StringIO()
+                _save_options(section, installed_part_options[section], new)
+                connection.execute(
+                    'INSERT OR REPLACE INTO parts VALUES (?, ?)',
+                    (section, new.getvalue()))
+                saved.add(section)
+            for section in saved.difference(sections):
+                connection.execute('DELETE FROM parts WHERE name = ?',
+                                   (section,))
+                saved.remove(section)
+            connection.commit()
+        finally:
+            connection.close()
+        if tmp:
+            os.rename(tmp, path)
+    finally:
+        if tmp:
+            _remove_ignore_missing(tmp)
+    return saved
+
 def _default_globals():
     """Return a mapping of default and precomputed expressions.
     These default expressions are convenience defaults available when eveluating
@@ -1747,7 +2463,8 @@ def _default_globals():
     return globals_defs
 
 _open_download_cache = {}
-def _open(base, filename, seen, dl_options, override, downloaded):
+def _open(base, filename, seen, dl_options, override, downloaded,
+          prefetcher=None):
     """Open a configuration file and return the result as a dictionary,
 
     Recursively open other files based on buildout options found.
@@ -1759,20 +2476,29 @@ def _open(base, filename, seen, dl_options, override, downloaded):
     base = base.rsplit('/', counter)[0]
     _update_section(dl_options, override)
     _dl_options = _unannotate_section(dl_options.copy())
+    if 'http-connections-per-host' in _dl_options:
+        _http_connections_per_host(_dl_options)
     newest = bool_option(_dl_options, 'newest', 'false')
     fallback = newest and not (filename in downloaded)
     download = zc.buildout.download.Download(
         _dl_options, cache=_dl_options.get('extends-cache'),
         fallback=fallback, hash_name=True)
+    parse_cache = _parse_cache_dir(_dl_options)
     is_temp = False
+    local = False
     downloaded_filename = None
     if _isurl(filename):
-        downloaded_filename, is_temp = download(filename)
-        fp = open(downloaded_filename)
+        data = _open_download_cache.get(filename)
+        if data is None:
+            downloaded_filename, is_temp = download(filename)
+            fp = open(downloaded_filename)
+        else:
+            fp = StringIO(data)
         base = filename[:filename.rfind('/')]
     elif _isurl(base):
         if os.path.isabs(filename):
             fp = open(filename)
+            local = True
             base = os.path.dirname(filename)
         else:
             filename = base + '/' + filename
@@ -1788,6 +2514,7 @@ def _open(base, filename, seen, dl_options, override, downloaded):
     else:
         filename = os.path.join(base, filename)
         fp = open(filename)
+        local = True
         base = os.path.dirname(filename)
     downloaded.add(filename)
 
@@ -1804,10 +2531,15 @@ def _open(base, filename, seen, dl_options, override, downloaded):
     if downloaded_filename:
         filename_for_logging = '%s (downloaded as %s)' % (
             filename, downloaded_filename)
-    result = zc.buildout.configparser.parse(
-        fp, filename_for_logging, _default_globals)
-
-    fp.close()
+    try:
+        result = None
+        if prefetcher is not None:
+            result = prefetcher.parsed.pop(filename, None)
+        if result is None:
+            result = _parse(fp, filename, filename_for_logging, parse_cache,
+                            local)
+    finally:
+        fp.close()
     if is_temp:
         os.remove(downloaded_filename)
 
@@ -1836,24 +2568,221 @@ def _open(base, filename, seen, dl_options, override, downloaded):
 
     if extends:
         extends = extends.split()
-        eresult = _open(base, extends.pop(0), seen, dl_options, override,
-                        downloaded)
-        for fname in extends:
-            _update(eresult, _open(base, fname, seen, dl_options, override,
-                    downloaded))
+        if root_config_file:
+            jobs = _positive_int_option(
+                _unannotate_section(dl_options.copy()), 'download-jobs')
+            if jobs > 1:
+                prefetcher = _ExtendsPrefetcher(dl_options, jobs)
+        try:
+            if prefetcher is not None:
+                prefetcher.prefetch(base, extends)
+            eresult = _open(base, extends.pop(0), seen, dl_options, override,
+                            downloaded, prefetcher)
+            for fname in extends:
+                _update(eresult, _open(base, fname, seen, dl_options, override,
+                        downloaded, prefetcher))
+        finally:
+            if root_config_file and prefetcher is not None:
+                prefetcher.close()
         result = _update(eresult, result)
 
     seen.pop()
     return result
 
 
+def _extends_url(base, filename):
+    """Return the URL of an extended file, or None if it's a local file
+    """
+    counter = 0
+    while filename.startswith('../'):
+        filename = filename.replace('../', '', 1)
+        counter += 1
+    base = base.rsplit('/', counter)[0]
+    if _isurl(filename):
+        return filename
+    if _isurl(base) and not os.path.isabs(filename):
+        return base + '/' + filename
+
+def _positive_int_option(options, name, default='1', zero=False):
+    """Return the number given by an option like jobs
+
+    It must be a positive integer, or 0 if zero is true.
+    """
+    value = options.get(name, default)
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+    if number < (0 if zero else 1):
+        raise zc.buildout.UserError("Invalid number of %s %s"
+                                    % (name.replace('-', ' '), value))
+    return number
+
+def _http_connections_per_host(options):
+    """Pool HTTP connections, at most the given number per host, if not 0
+    """
+    zc.buildout.httpclient.connections_per_host(_positive_int_option(
+        options, 'http-connections-per-host', '0', zero=True))
+
+class _ExtendsPrefetcher(object):
+    """Download the remote files of an extends tree concurrently
+
+    With the download-jobs option, the files of each level of the
+    extends tree are downloaded concurrently and their content is put in
+    _open_download_cache, where _open looks for them.  They are parsed
+    to find the next level, and _open uses these results instead of
+    parsing them again.  Errors are ignored here: they are reported when
+    the files are opened.  Files that couldn't be downloaded are
+    recorded as None, so that they aren't downloaded again for other
+    levels, and _open downloads them again.
+
+    One instance is used for all the files opened from a root file.
+    """
+
+    def __init__(self, dl_options, jobs):
+        _dl_options = _unannotate_section(dl_options.copy())
+        self._download = zc.buildout.download.Download(
+            _dl_options, cache=_dl_options.get('extends-cache'),
+            fallback=bool_option(_dl_options, 'newest', 'false'),
+            hash_name=True)
+        self._parse_cache = _parse_cache_dir(_dl_options)
+        self._pool = multiprocessing.pool.ThreadPool(jobs)
+        self.parsed = {}
+
+    def _fetch(self, url):
+        try:
+            path, is_temp = self._download(url)
+            try:
+                with open(path) as f:
+                    return url, f.read()
+            finally:
+                if is_temp:
+                    os.remove(path)
+        except Exception:
+            return url, None
+
+    def prefetch(self, base, extends):
+        """Download the remote files extended from base, recursively
+        """
+        level = [(base, extends)]
+        while level:
+            urls = []
+            for base, extends in level:
+                for filename in extends:
+                    url = _extends_url(base, filename)
+                    if (url is not None and url not in _open_download_cache
+                        and url not in urls):
+                        urls.append(url)
+            level = []
+            for url, data in self._pool.map(self._fetch, urls):
+                _open_download_cache[url] = data
+                if data is None:
+                    continue
+                try:
+                    result = _parse(StringIO(data), url, url,
+                                    self._parse_cache, False)
+                except Exception:
+                    continue
+                self.parsed[url] = result
+                extends = result.get('buildout', {}).get('extends')
+                if extends:
+                    level.append((url[:url.rfind('/')], extends.split()))
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+def _parse_cache_dir(dl_options):
+    parse_cache = dl_options.get('parse-cache')
+    if parse_cache:
+        return os.path.join(dl_options.get('directory', ''),
+                            os.path.expanduser(parse_cache))
+
+_parse_cache_format = 2
+def _parse(fp, filename, filename_for_logging, cache, local):
+    """Parse a configuration file, using the parse cache if there is one.
+
+    Cached results are checked against the size and modification time
+    of local files, the content of downloaded ones, and the results of
+    the section expressions of the file, which are evaluated again.
+    Local files modified in the last seconds are not cached, as they
+    could change again without their modification time changing.
+    """
+    if not cache:
+        return zc.buildout.configparser.parse(
+            fp, filename_for_logging, _default_globals)
+
+    recent = False
+    if local:
+        st = os.fstat(fp.fileno())
+        validator = st.st_size, getattr(st, 'st_mtime_ns', st.st_mtime)
+        recent = (time.time() - st.st_mtime
+                  <= zc.buildout.easy_install._mtime_delay)
+    else:
+        data = fp.read()
+        fp = StringIO(data)
+        if isinstance(data, text_type):
+            data = data.encode()
+        validator = md5(data).hexdigest()
+
+    path = os.path.join(cache, md5(filename.encode()).hexdigest())
+    if recent:
+        return zc.buildout.configparser.parse(
+            fp, filename_for_logging, _default_globals)
+    try:
+        with open(path, 'rb') as f:
+            format, cached_validator, expressions, result = marshal.load(f)
+    except (IOError, EOFError, ValueError, TypeError):
+        pass
+    else:
+        if format == _parse_cache_format and cached_validator == validator:
+            if expressions:
+                context = _default_globals()
+            for expression, value in expressions:
+                if bool(eval(expression, context)[0]) != value:
+                    break
+            else:
+                return result
+
+    expressions = []
+    result = zc.buildout.configparser.parse(
+        fp, filename_for_logging, _default_globals, expressions)
+
+    zc.buildout.easy_install._marshal_save(
+        (_parse_cache_format, validator, expressions, result), path)
+    return result
+
+
 ignore_directories = '.svn', 'CVS', '__pycache__'
 _dir_hashes = {}
+_dir_hash_cache = None
+_dir_hash_algorithm = None
+def _dir_hash_setup(cache, algorithm):
+    """Set the directory and the algorithm used by _dir_hash
+    """
+    global _dir_hash_cache, _dir_hash_algorithm
+    if (cache, algorithm) != (_dir_hash_cache, _dir_hash_algorithm):
+        _dir_hash_cache = cache
+        _dir_hash_algorithm = algorithm
+        _dir_hashes.clear()
+
 def _dir_hash(dir):
     dir_hash = _dir_hashes.get(dir, None)
     if dir_hash is not None:
         return dir_hash
-    hash = md5()
+    if _dir_hash_cache or _dir_hash_algorithm:
+        dir_hash = _indexed_dir_hash(dir, _dir_hash_cache, _dir_hash_algorithm)
+    else:
+        hash = md5()
+        for dirpath, names, filenames in _dir_hash_walk(dir):
+            hash.update(names)
+            for name in filenames:
+                _file_hash_update(hash, os.path.join(dirpath, name))
+        dir_hash = hash.hexdigest()
+    _dir_hashes[dir] = dir_hash
+    return dir_hash
+
+def _dir_hash_walk(dir):
     for (dirpath, dirnames, filenames) in os.walk(dir):
         dirnames[:] = sorted(n for n in dirnames if n not in ignore_directories)
         filenames[:] = sorted(f for f in filenames
@@ -1863,27 +2792,71 @@ def _dir_hash(dir):
         for_hash = ' '.join(dirnames + filenames)
         if isinstance(for_hash, text_type):
             for_hash = for_hash.encode()
-        hash.update(for_hash)
-        for name in filenames:
-            path = os.path.join(dirpath, name)
-            if name == 'entry_points.txt':
-                f = open(path)
-                # Entry points aren't written in stable order. :(
-                try:
-                    sections = zc.buildout.configparser.parse(f, path)
-                    data = repr([(sname, sorted(sections[sname].items()))
-                                 for sname in sorted(sections)]).encode('utf-8')
-                except Exception:
-                    f.close()
-                    f = open(path, 'rb')
-                    data = f.read()
-            else:
-                f = open(path, 'rb')
-                data = f.read()
+        yield dirpath, for_hash, filenames
+
+def _file_hash_update(hash, path):
+    if os.path.basename(path) == 'entry_points.txt':
+        f = open(path)
+        # Entry points aren't written in stable order. :(
+        try:
+            sections = zc.buildout.configparser.parse(f, path)
+            hash.update(repr([(sname, sorted(sections[sname].items()))
+                              for sname in sorted(sections)]).encode('utf-8'))
+            return
+        except Exception:
+            pass
+        finally:
             f.close()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(1<<16), b''):
             hash.update(data)
-    _dir_hashes[dir] = dir_hash = hash.hexdigest()
-    return dir_hash
+
+def _indexed_dir_hash(dir, cache, algorithm):
+    """Hash a directory from the digests of its files
+
+    If cache is given, like with the dir-hash-cache option, the digests
+    are kept in an index in that directory and a file is only read again
+    if its size, modification time or inode changed.  Files modified in
+    the last seconds are not indexed, as they could change again without
+    their modification time changing.
+    """
+    algorithm = algorithm or 'md5'
+    index = {}
+    if cache:
+        key = '%s\0%s' % (algorithm, dir)
+        if isinstance(key, text_type):
+            key = key.encode('utf-8')
+        index_path = os.path.join(cache, md5(key).hexdigest())
+        try:
+            with open(index_path, 'rb') as f:
+                index = marshal.load(f)
+        except (IOError, EOFError, ValueError, TypeError):
+            pass
+    new_index = {}
+    recent = time.time() - zc.buildout.easy_install._mtime_delay
+    hash = hashlib.new(algorithm)
+    for dirpath, names, filenames in _dir_hash_walk(dir):
+        hash.update(names)
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            st = os.stat(path)
+            key = (st.st_size, getattr(st, 'st_mtime_ns', st.st_mtime),
+                   st.st_ino)
+            try:
+                cached_key, digest = index[path]
+            except (KeyError, TypeError, ValueError):
+                cached_key = None
+            if cached_key != key:
+                file_hash = hashlib.new(algorithm)
+                _file_hash_update(file_hash, path)
+                digest = file_hash.hexdigest()
+            if st.st_mtime < recent:
+                new_index[path] = key, digest
+            hash.update(digest.encode())
+
+    if cache and new_index != index:
+        zc.buildout.easy_install._marshal_save(new_index, index_path)
+    return hash.hexdigest()
 
 def _dists_sig(dists):
     seen = set()
@@ -2016,6 +2989,11 @@ Options:
 
      Don't read user defaults.
 
+  -j jobs
+
+     Install up to the given number of parts at the same time.  This is
+     equivalent to the assignment buildout:jobs=jobs.
+
   -o
 
     Run in off-line mode.  This is equivalent to the assignment
@@ -2060,6 +3038,12 @@ Options:
     previously installed state. Note that __buildout_signature__ is
     updated with new dependencies by using this option.
 
+  --profile-run file
+
+    Record the time spent in each phase of the run, and in the
+    installation of each part, and write it to the given file, in
+    the JSON trace event format.
+
 
 Assignments are of the form: section:option=value and are used to
 provide configuration options that override those given in the
@@ -2111,6 +3095,13 @@ Commands:
     sorted alphabetically, along with the origin of the value (file name or
     COMPUTED_VALUE, DEFAULT_VALUE, COMMAND_LINE_VALUE).
 
+  cache-gc [size]
+
+    Remove partial downloads and unreferenced files from the download
+    and extends caches, then the least recently used files until the
+    caches fit in the given size, or in the download-cache-size
+    option if no size is given.  Files used in the last hour are kept.
+
 """
 
 def _help():
@@ -2132,6 +3123,7 @@ def main(args=None):
     options = []
     user_defaults = True
     debug = False
+    profile_run = None
     while args:
         if args[0][0] == '-':
             op = orig_op = args.pop(0)
@@ -2157,7 +3149,7 @@ def main(args=None):
                     _help()
                 op = op[1:]
 
-            if op[:1] in  ('c', 't'):
+            if op[:1] in  ('c', 't', 'j'):
                 op_ = op[:1]
                 op = op[1:]
 
@@ -2179,11 +3171,23 @@ def main(args=None):
                         _error("No timeout value specified for option", orig_op)
                     except ValueError:
                         _error("Timeout value must be numeric", orig_op)
+                elif op_ == 'j':
+                    if not op:
+                        if args:
+                            op = args.pop(0)
+                        else:
+                            _error("No number of jobs specified for option",
+                                   orig_op)
+                    options.append(('buildout', 'jobs', op))
 
             elif orig_op == '--dry-run':
                     options.append(('buildout', 'dry-run', 'true'))
             elif orig_op == '--skip-signature-check':
                     options.append(('buildout', 'check-signature', 'false'))
+            elif orig_op == '--profile-run':
+                    if not args:
+                        _error("No file name specified for option", orig_op)
+                    profile_run = os.path.abspath(args.pop(0))
             elif op:
                 if orig_op == '--help':
                     _help()
@@ -2211,17 +3215,23 @@ def main(args=None):
         command = args.pop(0)
         if command not in (
             'install', 'bootstrap', 'runsetup', 'setup', 'init',
-            'annotate',
+            'annotate', 'cache-gc',
             ):
             _error('invalid command:', command)
+        command = command.replace('-', '_')
     else:
         command = 'install'
 
+    if profile_run:
+        zc.buildout.timing.start()
+
     try:
         try:
-            buildout = Buildout(config_file, options,
-                                user_defaults, command, args)
-            getattr(buildout, command)(args)
+            with phase('initialize'):
+                buildout = Buildout(config_file, options,
+                                    user_defaults, command, args)
+            with phase(command):
+                getattr(buildout, command)(args)
         except SystemExit:
             logging.shutdown()
             # Make sure we properly propagate an exit code from a restarted
@@ -2248,6 +3258,8 @@ def main(args=None):
                     sys.exit(1)
 
     finally:
+        if profile_run:
+            zc.buildout.timing.stop(profile_run)
         logging.shutdown()
 
 
@@ -0,0 +1,275 @@
+##############################################################################
+#
+# Copyright (c) 2006 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Size limit and garbage collection of the download and extends caches
+
+Files found in a cache are marked as used by setting their access time,
+so that the least recently used files are known even on file systems
+mounted without access time updates.  With the ``download-cache-size``
+option, the least recently used files of the download cache, including
+the distributions of its ``dist`` directory, and of the extends cache
+are removed at the end of each run until the caches fit in the given
+size.  The ``cache-gc`` command does the same on demand.
+
+Both also remove the entries that nothing refers to anymore: partial
+downloads that weren't resumed, and, in caches using the ``content``
+layout, files of the store that no URL or checksum leads to and index
+entries of removed files.
+
+Caches may be shared by buildouts running concurrently, so files used
+or modified during the last ``_grace`` seconds are never removed, nor
+are partial downloads in progress, and a collection is skipped if
+another one is running on the same cache.  Since a collection scans the
+whole cache, the ones done at the end of runs are also skipped if the
+cache was collected in the last ``_interval`` seconds.
+"""
+
+import logging
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger('zc.buildout')
+
+_grace = 3600
+_interval = 3600
+_lock_name = '.buildout-gc.lock'
+_units = dict(k=1 << 10, m=1 << 20, g=1 << 30, t=1 << 40)
+
+def parse_size(value):
+    """Return the number of bytes of a size like ``500M``, or None
+
+    K, M, G and T suffixes are powers of 1024.
+    """
+    value = value.strip().lower()
+    if value.endswith('b'):
+        value = value[:-1]
+    factor = _units.get(value[-1:])
+    if factor is not None:
+        value = value[:-1]
+    try:
+        size = int(value)
+    except ValueError:
+        return None
+    if size >= 0:
+        return size * (factor or 1)
+
+def touch(path):
+    """Mark a cached file as used now
+    """
+    try:
+        os.utime(path, (time.time(), os.stat(path).st_mtime))
+    except OSError:
+        pass
+
+def collect(directories, max_size=None, force=True):
+    """Collect the caches in directories
+
+    Unreferenced entries are removed, then, if max_size is given, the
+    least recently used files until the caches fit in max_size bytes.
+    Unless force is true, caches collected recently are skipped.
+    Return the number of removed files and their total size.
+    """
+    now = time.time()
+    roots = []
+    for directory in directories:
+        directory = os.path.realpath(directory)
+        if os.path.isdir(directory) and directory not in roots:
+            roots.append(directory)
+    locks = []
+    try:
+        entries = {}
+        for root in roots:
+            lock = _lock(root)
+            if lock is None:
+                logger.info("Skipping %s, collected by another process.",
+                            root)
+                continue
+            collected = os.fstat(lock.fileno()).st_mtime
+            if not force and collected > now - _interval:
+                lock.close()
+                continue
+            locks.append(lock)
+            for path, size, used in _scan(root):
+                entries[path] = size, used
+
+        removed = [0, 0]
+        def remove(path):
+            size = entries.pop(path, (0, None))[0]
+            if _remove(path):
+                removed[0] += 1
+                removed[1] += size
+                logger.debug("Removed %s from cache.", path)
+
+        recent = now - _grace
+        for path in list(entries):
+            if path.endswith('.part.info'):
+                if not os.path.exists(path[:-5]):
+                    remove(path)
+            elif (path.endswith('.part') and entries[path][1] < recent
+                  and not _in_use(path)):
+                remove(path)
+                remove(path + '.info')
+
+        stores = [root for root in roots if _is_store(root)]
+        for store in stores:
+            referenced = set()
+            for path in _index_entries(store):
+                digest = _read_digest(path)
+                if digest is not None:
+                    referenced.add(digest)
+            blobs = os.path.join(store, 'blobs') + os.sep
+            incoming = os.path.join(store, 'incoming') + os.sep
+            for path, (size, used) in list(entries.items()):
+                if used >= recent or _is_partial(path):
+                    continue
+                if ((path.startswith(blobs) and
+                     os.path.basename(path) not in referenced)
+                    or path.startswith(incoming)):
+                    remove(path)
+
+        if max_size is not None:
+            total = sum(size for size, used in entries.values())
+            candidates = sorted((used, path)
+                                for path, (size, used) in entries.items()
+                                if used < recent and not _is_index(path)
+                                and not path.endswith('.part.info'))
+            for used, path in candidates:
+                if total <= max_size:
+                    break
+                if _used(path) >= recent:
+                    # Used since the scan
+                    continue
+                if path.endswith('.part'):
+                    if _in_use(path):
+                        continue
+                    remove(path + '.info')
+                total -= entries[path][0]
+                remove(path)
+
+        for store in stores:
+            for path in _index_entries(store):
+                digest = _read_digest(path)
+                if digest is None or not os.path.exists(
+                        os.path.join(store, 'blobs', digest[:2], digest)):
+                    remove(path)
+        for lock in locks:
+            # Record the time of the collection.
+            os.utime(lock.name, None)
+        return tuple(removed)
+    finally:
+        for lock in locks:
+            lock.close()
+
+
+def _lock(root):
+    """Return the opened lock file of the cache, or None if locked
+    """
+    path = os.path.join(root, _lock_name)
+    new = not os.path.exists(path)
+    f = open(path, 'a')
+    if new:
+        # Never collected
+        os.utime(path, (0, 0))
+    if fcntl is not None:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (IOError, OSError):
+            f.close()
+            return None
+    return f
+
+def _scan(root):
+    """Return the path, size and last use time of the files of a cache
+
+    Other caches nested in root are left to their own collection.
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [name for name in dirnames if not os.path.exists(
+            os.path.join(dirpath, name, _lock_name))]
+        for name in filenames:
+            if name == _lock_name:
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.lstat(path)
+            except OSError:
+                continue
+            yield path, st.st_size, max(st.st_atime, st.st_mtime)
+
+def _used(path):
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return 0
+    return max(st.st_atime, st.st_mtime)
+
+def _is_partial(path):
+    return path.endswith('.part') or path.endswith('.part.info')
+
+def _is_store(root):
+    return os.path.isdir(os.path.join(root, 'blobs'))
+
+def _is_index(path):
+    directory = os.path.basename(os.path.dirname(path))
+    return (directory in ('urls', 'checksums')
+            and _is_store(os.path.dirname(os.path.dirname(path))))
+
+def _index_entries(store):
+    for name in ('urls', 'checksums'):
+        directory = os.path.join(store, name)
+        if os.path.isdir(directory):
+            for entry in os.listdir(directory):
+                yield os.path.join(directory, entry)
+
+def _read_digest(path, url=None):
+    """Return the digest kept at path, for url if given, or None
+
+    Index entries of caches using the ``content`` layout hold the digest
+    of a file, and the URL it was downloaded from, if any.
+    """
+    try:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    except IOError:
+        return None
+    if lines and (url is None or lines[1:] == [url]):
+        return lines[0]
+
+def _in_use(path):
+    """Tell whether a partial download is being written
+    """
+    if fcntl is None:
+        return False
+    try:
+        f = open(path, 'rb')
+    except IOError:
+        return False
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except (IOError, OSError):
+        return True
+    finally:
+        f.close()
+    return False
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        return False
+    return True
@@ -111,7 +111,7 @@ option_start = re.compile(
 
 leading_blank_lines = re.compile(r"^(\s*\n)+")
 
-def parse(fp, fpname, exp_globals=dict):
+def parse(fp, fpname, exp_globals=dict, expressions=None):
     """Parse a sectioned setup file.
 
     The sections in setup files contain a title line at the top,
@@ -131,6 +131,10 @@ def parse(fp, fpname, exp_globals=dict):
 
     exp_globals is a callable returning a mapping of defaults used as globals
     during the evaluation of a section conditional expression.
+
+    If expressions is a list, the evaluated expressions and their boolean
+    results are appended to it, so that callers caching the result can
+    tell whether it still applies.
     """
     sections = {}
     # the current section condition, possibly updated from a section expression
@@ -186,6 +190,8 @@ def parse(fp, fpname, exp_globals=dict):
                         context = exp_globals()
                     # evaluated expression is in list: get first element
                     section_condition = eval(expr, context)[0]
+                    if expressions is not None:
+                        expressions.append((expr, bool(section_condition)))
                     # finally, ignore section when an expression
                     # evaluates to false
                     if not section_condition:
@@ -20,8 +20,15 @@ installed.
 
 import distutils.errors
 import errno
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 import glob
+import hashlib
 import logging
+import marshal
+import multiprocessing.pool
 import os
 import pkg_resources
 import py_compile
@@ -35,8 +42,13 @@ import stat
 import subprocess
 import sys
 import tempfile
+import time
 import zc.buildout
+import zc.buildout.cache
+import zc.buildout.httpclient
 import warnings
+import zipimport
+from zc.buildout.timing import phase
 
 warnings.filterwarnings(
     'ignore', '.+is being parsed as a legacy, non PEP 440, version')
@@ -132,7 +144,41 @@ class AllowHostsPackageIndex(setuptools.package_index.PackageIndex):
     """Will allow urls that are local to the system.
 
     No matter what is allow_hosts.
+
+    With a cache directory, fetched pages are kept with their links, and
+    are used without network access during cache_ttl seconds, then
+    revalidated using the ETag and Last-Modified headers.
     """
+    cache = None
+    cache_ttl = 0
+
+    def __init__(self, *args, **kw):
+        super(AllowHostsPackageIndex, self).__init__(*args, **kw)
+        self._validators = {}
+        self._opener = self.opener
+        self.opener = self._open_request
+
+    def _open_request(self, request):
+        for header, value in self._validators.get(request.get_full_url(), ()):
+            request.add_header(header, value)
+        return zc.buildout.httpclient.urlopen(request, self._opener)
+
+    def _cache_path(self, url):
+        return os.path.join(self.cache,
+                            hashlib.md5(url.encode()).hexdigest())
+
+    def _cache_load(self, url):
+        try:
+            with open(self._cache_path(url), 'rb') as f:
+                entry = marshal.load(f)
+        except (IOError, EOFError, ValueError, TypeError):
+            return None
+        if isinstance(entry, dict) and entry.get('url') == url:
+            return entry
+
+    def _cache_save(self, entry):
+        _marshal_save(entry, self._cache_path(entry['url']))
+
     def url_ok(self, url, fatal=False):
         if FILE_SCHEME(url):
             return True
@@ -189,47 +235,86 @@ class AllowHostsPackageIndex(setuptools.package_index.PackageIndex):
                 nc.get('download-cache-url'),
                 url, requirement, logger,
                 nc.get('signature-certificate-list'))
+        entry = None
+        cacheable = self.cache and url.split(':', 1)[0] in ('http', 'https')
+        if cacheable and not download_result:
+            entry = self._cache_load(url)
+        links = None
         if download_result:
             # Successfully fetched from cache. Hardcode some things...
             page, base = download_result
             f = None
             self.fetched_urls[base] = True
+        elif entry is not None and time.time() < entry['time'] + self.cache_ttl:
+            f = None
         else:
-            f = self.open_url(url, "Download error on %s: %%s -- Some packages may not be found!" % url)
+            if entry is not None:
+                self._validators[url] = [
+                    (header, entry[key])
+                    for header, key in (('If-None-Match', 'etag'),
+                                        ('If-Modified-Since', 'last_modified'))
+                    if entry[key]]
+            try:
+                f = self.open_url(url, "Download error on %s: %%s -- Some packages may not be found!" % url)
+            finally:
+                self._validators.pop(url, None)
             if f is None: return
-            self.fetched_urls[f.url] = True
-            if 'html' not in f.headers.get('content-type', '').lower():
-                f.close()   # not html, we can't process it
-                return
-
-            base = f.url     # handle redirects
-            page = f.read()
-            if not isinstance(page, str): # We are in Python 3 and got bytes. We want str.
-                if isinstance(f, HTTPError):
-                    # Errors have no charset, assume latin1:
-                    charset = 'latin-1'
-                else:
-                    charset = f.headers.get_param('charset') or 'latin-1'
-                page = page.decode(charset, "ignore")
-            f.close()
-            # Upload the index to network cache.
-            if nc.get('upload-cache-url') \
-                and nc.get('upload-dir-url') \
-                and '==' in requirement \
-                and getattr(f, 'code', None) != 404:
-                upload_index_network_cached(
-                    nc.get('upload-dir-url'),
-                    nc.get('upload-cache-url'),
-                    url, base, requirement, page, logger,
-                    nc.get('signature-private-key-file'),
-                    nc.get('shacache-ca-file'),
-                    nc.get('shacache-cert-file'),
-                    nc.get('shacache-key-file'),
-                    nc.get('shadir-ca-file'),
-                    nc.get('shadir-cert-file'),
-                    nc.get('shadir-key-file'))
-        for match in HREF.finditer(page):
-            link = urljoin(base, htmldecode(match.group(1)))
+            if entry is not None and getattr(f, 'code', None) == 304:
+                # Not modified, use the cached page.
+                f.close()
+                f = None
+                entry['time'] = time.time()
+                self._cache_save(entry)
+            else:
+                entry = None
+                self.fetched_urls[f.url] = True
+                if 'html' not in f.headers.get('content-type', '').lower():
+                    f.close()   # not html, we can't process it
+                    return
+
+                base = f.url     # handle redirects
+                page = f.read()
+                if not isinstance(page, str): # We are in Python 3 and got bytes. We want str.
+                    if isinstance(f, HTTPError):
+                        # Errors have no charset, assume latin1:
+                        charset = 'latin-1'
+                    else:
+                        charset = f.headers.get_param('charset') or 'latin-1'
+                    page = page.decode(charset, "ignore")
+                f.close()
+                # Upload the index to network cache.
+                if nc.get('upload-cache-url') \
+                    and nc.get('upload-dir-url') \
+                    and '==' in requirement \
+                    and getattr(f, 'code', None) != 404:
+                    upload_index_network_cached(
+                        nc.get('upload-dir-url'),
+                        nc.get('upload-cache-url'),
+                        url, base, requirement, page, logger,
+                        nc.get('signature-private-key-file'),
+                        nc.get('shacache-ca-file'),
+                        nc.get('shacache-cert-file'),
+                        nc.get('shacache-key-file'),
+                        nc.get('shadir-ca-file'),
+                        nc.get('shadir-cert-file'),
+                        nc.get('shadir-key-file'))
+                if cacheable and getattr(f, 'code', 200) == 200:
+                    links = [urljoin(base, htmldecode(match.group(1)))
+                             for match in HREF.finditer(page)]
+                    # Only index pages need to be parsed again.
+                    self._cache_save(dict(
+                        url=url, base=base, links=links, time=time.time(),
+                        etag=f.headers.get('ETag'),
+                        last_modified=f.headers.get('Last-Modified'),
+                        page=page if url.startswith(self.index_url) else '',
+                        ))
+        if entry is not None:
+            page, base, links = entry['page'], entry['base'], entry['links']
+            self.fetched_urls[base] = True
+        if links is None:
+            links = [urljoin(base, htmldecode(match.group(1)))
+                     for match in HREF.finditer(page)]
+        for link in links:
             self.process_url(link)
         if url.startswith(self.index_url) and getattr(f,'code',None)!=404:
             page = self.process_index(url, page)
@@ -269,7 +354,9 @@ else:
             return '/bin/sh\n"exec" "%s" "$0" "$@"' % arg
 
 def call_subprocess(args, **kw):
-    if subprocess.call(args, **kw) != 0:
+    with phase('subprocess', 'subprocess', args=list(args)):
+        exit_code = subprocess.call(args, **kw)
+    if exit_code != 0:
         raise Exception(
             "Failed to run command:\n%s"
             % repr(args)[1:-1])
@@ -297,6 +384,11 @@ class Installer:
     _use_dependency_links = True
     _allow_picked_versions = True
     _store_required_by = False
+    _download_jobs = 1
+    _prefetched = {}
+    _egg_store = None
+    _dist_index_cache = None
+    _resolution_cache = None
 
     def __init__(self,
                  dest=None,
@@ -335,7 +427,10 @@ class Installer:
         if self._dest is None:
             newest = False
         self._newest = newest
-        self._env = pkg_resources.Environment(path)
+        if self._dist_index_cache:
+            self._env = _IndexedEnvironment(path, self._dist_index_cache)
+        else:
+            self._env = pkg_resources.Environment(path)
         self._index = _get_index(index, links, self._allow_hosts)
         self._requirements_and_constraints = []
 
@@ -476,7 +571,8 @@ class Installer:
 
             sys.stdout.flush() # We want any pending output first
 
-            exit_code = subprocess.call(list(args))
+            with phase('easy_install', 'subprocess', spec=spec):
+                exit_code = subprocess.call(list(args))
 
             dists = []
             env = pkg_resources.Environment([tmp])
@@ -594,9 +690,14 @@ class Installer:
         return best[-1]
 
     def _fetch(self, dist, tmp, download_cache):
+        prefetched = self._prefetched.get(dist.location)
+        if prefetched is not None:
+            return prefetched
+
         if (download_cache
             and (realpath(os.path.dirname(dist.location)) == download_cache)
             ):
+            zc.buildout.cache.touch(dist.location)
             return dist
 
         # Try to download from shacache first. If not possible, downloads from
@@ -614,7 +715,8 @@ class Installer:
                 new_location, dist.location, logger,
                 nc.get('signature-certificate-list'))
         if not downloaded_from_cache:
-            new_location = self._index.download(dist.location, tmp)
+            with phase('download', 'download', url=dist.location):
+                new_location = self._index.download(dist.location, tmp)
             if nc.get('upload-cache-url') \
                 and nc.get('upload-dir-url'):
                 upload_network_cached(
@@ -686,11 +788,15 @@ class Installer:
                         # we got a directory. It must have been
                         # obtained locally.  Just copy it.
                         shutil.copytree(dist.location, newloc)
+                        redo_pyc(newloc)
+                    elif self._egg_store:
+                        _link_tree(_stored_egg(self._egg_store,
+                                               dist.location),
+                                   newloc)
                     else:
                         setuptools.archive_util.unpack_archive(
                             dist.location, newloc)
-
-                    redo_pyc(newloc)
+                        redo_pyc(newloc)
 
                     # Getting the dist from the environment causes the
                     # distribution meta data to be read.  Cloning isn't
@@ -791,7 +897,182 @@ class Installer:
 
         return requirement
 
+    def _prefetch(self, requirements, ws, best, patch_dict, source):
+        """Obtain the distributions for requirements and fetch them
+        concurrently
+
+        Only requirements for which nothing is installed are considered.
+        The fetched distributions are then used by _fetch, while
+        requirements are still processed one by one and in order, so that
+        the result is the same as without prefetching.
+        """
+        if self._dest is None:
+            return
+        requirements_by_key = {}
+        for requirement in requirements:
+            key = requirement.key
+            if key in self._prefetch_seen:
+                continue
+            self._prefetch_seen.add(key)
+            constraint = self._versions.get(requirement.project_name.lower())
+            if constraint:
+                try:
+                    requirement = _constrained_requirement(constraint,
+                                                           requirement)
+                except IncompatibleConstraintError:
+                    continue
+            if (key in best or key in ws.by_key or
+                [dist for dist in self._env[requirement.project_name]
+                 if dist in requirement]):
+                continue
+            requirements_by_key[key] = requirement
+        if not requirements_by_key:
+            return
+
+        tmp = self._download_cache
+        if tmp is None:
+            if self._prefetch_tmp is None:
+                self._prefetch_tmp = tempfile.mkdtemp('prefetch')
+            tmp = self._prefetch_tmp
+
+        # Index lookups update the package index and environment, which
+        # aren't thread-safe, so only the downloads are concurrent.
+        avails = []
+        for requirement in sorted(requirements_by_key.values(), key=str):
+            try:
+                avail = self._obtain(requirement, source or
+                    requirement.project_name in (patch_dict or ()))
+            except Exception:
+                # Errors are reported when the requirement is processed.
+                logger.debug('Prefetching %s failed.', requirement,
+                             exc_info=True)
+                continue
+            if avail is not None:
+                avails.append(avail)
+        if not avails:
+            return
+
+        def fetch(avail):
+            try:
+                return avail.location, self._fetch(
+                    avail, tmp, self._download_cache)
+            except Exception:
+                logger.debug('Prefetching %s failed.', avail, exc_info=True)
+
+        pool = multiprocessing.pool.ThreadPool(
+            min(self._download_jobs, len(avails)))
+        try:
+            for result in pool.map(fetch, avails):
+                if result is not None:
+                    location, dist = result
+                    self._prefetched[location] = dist
+        finally:
+            pool.close()
+            pool.join()
+
     def install(self, specs, working_set=None, patch_dict=None):
+        self._prefetched = {}
+        self._prefetch_seen = set()
+        self._prefetch_tmp = None
+        try:
+            with phase('install eggs', 'eggs', specs=list(specs)):
+                if not (self._resolution_cache and not patch_dict):
+                    return self._install(specs, working_set, patch_dict)
+                ws = self._resolved(specs, working_set)
+                if ws is None:
+                    ws = self._install_and_save_resolution(specs, working_set)
+                return ws
+        finally:
+            self._prefetched = {}
+            if self._prefetch_tmp is not None:
+                shutil.rmtree(self._prefetch_tmp)
+
+    def _resolution_key(self, specs, entries):
+        """Return the key of a resolution and whether it may change
+
+        The key covers the specs, the versions, the initial working set
+        and the modification times of the directories of the path.
+        """
+        state = []
+        recent = False
+        for directory in self._path:
+            try:
+                mtime = os.stat(directory).st_mtime
+            except OSError:
+                mtime = None
+            else:
+                recent = recent or time.time() - mtime <= _mtime_delay
+            state.append((directory, mtime))
+        key = repr((sys.version, list(specs), sorted(self._versions.items()),
+                    self._prefer_final, self._dest, state,
+                    entries))
+        return hashlib.sha1(key.encode('utf-8')).hexdigest(), recent
+
+    def _resolved(self, specs, working_set):
+        """Return the cached resolution of specs, if any
+        """
+        key, _ = self._resolution_key(
+            specs, working_set is not None and working_set.entries)
+        resolution = _resolutions.get(key)
+        if resolution is None:
+            try:
+                with open(os.path.join(self._resolution_cache, key),
+                          'rb') as f:
+                    resolution = marshal.load(f)
+            except (IOError, OSError, EOFError, ValueError, TypeError):
+                return None
+        ws = pkg_resources.WorkingSet([]) if working_set is None \
+            else working_set
+        dists = []
+        for project_name, location in resolution:
+            dist = ws.by_key.get(project_name.lower())
+            if dist is not None:
+                if dist.location != location:
+                    return None
+                continue
+            for dist in self._env[project_name]:
+                if dist.location == location:
+                    dists.append(dist)
+                    break
+            else:
+                return None
+        _resolutions[key] = resolution
+        logger.debug('Using the cached resolution of %s.',
+                     repr(specs)[1:-1])
+        for dist in dists:
+            ws.add(dist)
+        return ws
+
+    def _install_and_save_resolution(self, specs, working_set):
+        """Resolve specs and cache the result if it can be reused
+
+        Only resolutions of eggs that are all pinned by the versions,
+        without develop eggs, are cached.
+        """
+        before = {}
+        entries = False
+        if working_set is not None:
+            before = dict(working_set.by_key)
+            entries = list(working_set.entries)
+        ws = self._install(specs, working_set, None)
+        resolution = []
+        for dist in ws:
+            if before.get(dist.key) is dist:
+                continue
+            constraint = self._versions.get(dist.project_name.lower())
+            if (dist.key in before
+                or dist.precedence == pkg_resources.DEVELOP_DIST
+                or not constraint or constraint[0] in '<>'):
+                return ws
+            resolution.append((dist.project_name, dist.location))
+        key, recent = self._resolution_key(specs, entries)
+        if recent:
+            return ws
+        _resolutions[key] = resolution
+        _marshal_save(resolution, os.path.join(self._resolution_cache, key))
+        return ws
+
+    def _install(self, specs, working_set, patch_dict):
 
         logger.debug('Installing %s.', repr(specs)[1:-1])
         self._requirements_and_constraints.append(
@@ -803,7 +1084,7 @@ class Installer:
         if dest is not None and dest not in path:
             path.insert(0, dest)
 
-        requirements = [self._constrain(pkg_resources.Requirement.parse(spec))
+        requirements = [self._constrain(_parse_requirement(spec))
                         for spec in specs]
 
         if working_set is None:
@@ -811,6 +1092,10 @@ class Installer:
         else:
             ws = working_set
 
+        prefetch = self._download_jobs > 1
+        if prefetch:
+            self._prefetch(requirements, ws, {}, patch_dict, False)
+
         for requirement in requirements:
             if patch_dict and requirement.project_name in patch_dict:
                 self._env.scan(
@@ -842,6 +1127,10 @@ class Installer:
             if req in processed:
                 # Ignore cyclic or redundant dependencies.
                 continue
+            if prefetch and req.key not in self._prefetch_seen:
+                # Missing requirements are built from source distributions.
+                self._prefetch([current_requirement] + requirements,
+                               ws, best, patch_dict, True)
             dist = best.get(req.key)
             if dist is None:
                 try:
@@ -889,7 +1178,7 @@ class Installer:
 
     def build(self, spec, build_ext, patch_dict=None):
 
-        requirement = self._constrain(pkg_resources.Requirement.parse(spec))
+        requirement = self._constrain(_parse_requirement(spec))
 
         dist, avail = self._satisfied(requirement, 1)
         if dist is not None:
@@ -1003,12 +1292,48 @@ def download_cache(path=-1):
         Installer._download_cache = path
     return old
 
+def index_cache(path=-1):
+    old = AllowHostsPackageIndex.cache
+    if path != -1:
+        AllowHostsPackageIndex.cache = path
+    return old
+
+def index_cache_ttl(setting=None):
+    old = AllowHostsPackageIndex.cache_ttl
+    if setting is not None:
+        AllowHostsPackageIndex.cache_ttl = int(setting)
+    return old
+
 def install_from_cache(setting=None):
     old = Installer._install_from_cache
     if setting is not None:
         Installer._install_from_cache = bool(setting)
     return old
 
+def egg_store(path=-1):
+    old = Installer._egg_store
+    if path != -1:
+        Installer._egg_store = path
+    return old
+
+def dist_index_cache(path=-1):
+    old = Installer._dist_index_cache
+    if path != -1:
+        Installer._dist_index_cache = path
+    return old
+
+def resolution_cache(path=-1):
+    old = Installer._resolution_cache
+    if path != -1:
+        Installer._resolution_cache = path
+    return old
+
+def download_jobs(setting=None):
+    old = Installer._download_jobs
+    if setting is not None:
+        Installer._download_jobs = int(setting)
+    return old
+
 def prefer_final(setting=None):
     old = Installer._prefer_final
     if setting is not None:
@@ -1038,6 +1363,14 @@ def get_picked_versions():
     required_by = Installer._required_by
     return (picked_versions, required_by)
 
+def add_picked_versions(picked_versions, required_by):
+    """Record versions picked, as returned by get_picked_versions, e.g.
+    by another process
+    """
+    Installer._picked_versions.update(picked_versions)
+    for req, dists in required_by.items():
+        Installer._required_by.setdefault(req, set()).update(dists)
+
 
 def install(specs, dest,
             links=(), index=None,
@@ -1700,9 +2033,194 @@ def chmod(path):
     if new_mode != mode:
         os.chmod(path, new_mode)
 
+def _stored_egg(store, location):
+    """Return the directory of the egg archive at location, in store
+
+    Eggs are unpacked once in the store, in a directory named after the
+    archive and the digest of its content.
+    """
+    hash = hashlib.sha256()
+    with open(location, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            hash.update(chunk)
+    name = os.path.basename(location)
+    entry = os.path.join(store, '%s-%s' % (name, hash.hexdigest()[:16]))
+    egg = os.path.join(entry, name)
+    if not os.path.isdir(egg):
+        if not os.path.isdir(store):
+            os.makedirs(store)
+        tmp = tempfile.mkdtemp(dir=store)
+        try:
+            setuptools.archive_util.unpack_archive(
+                location, os.path.join(tmp, name))
+            redo_pyc(os.path.join(tmp, name))
+            try:
+                os.rename(tmp, entry)
+            except OSError:
+                # Stored at the same time by another process
+                if not os.path.isdir(egg):
+                    raise
+        finally:
+            if os.path.isdir(tmp):
+                shutil.rmtree(tmp)
+    return egg
+
+# ioctl of Linux sharing the data of a file with another one
+_FICLONE = 0x40049409
+_reflink_failed = []
+
+def _link_file(src, dst):
+    """Make dst share the content of src
+
+    A copy-on-write clone is made if the file system supports it,
+    otherwise a hard link, and as a last resort a copy.
+    """
+    if fcntl is not None and not _reflink_failed:
+        with open(src, 'rb') as s:
+            with open(dst, 'wb') as d:
+                try:
+                    fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+                except (IOError, OSError):
+                    _reflink_failed.append(True)
+                else:
+                    shutil.copymode(src, dst)
+                    return
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except (AttributeError, OSError):
+        shutil.copy2(src, dst)
+
+def _link_tree(src, dst):
+    """Recreate the tree at src as dst, sharing file contents
+    """
+    for dirpath, dirnames, filenames in os.walk(src):
+        target = os.path.normpath(
+            os.path.join(dst, os.path.relpath(dirpath, src)))
+        os.mkdir(target)
+        shutil.copymode(dirpath, target)
+        for name in dirnames + filenames:
+            path = os.path.join(dirpath, name)
+            if os.path.islink(path):
+                os.symlink(os.readlink(path), os.path.join(target, name))
+            elif name in filenames:
+                _link_file(path, os.path.join(target, name))
+
+# Files and directories modified less than this number of seconds ago
+# may change again without their modification time changing, so what
+# is derived from them isn't kept.
+_mtime_delay = 2
+_dist_indexes = {}
+_resolutions = {}
+
+def _dist_index_path(cache, directory):
+    return os.path.join(
+        cache, hashlib.md5(directory.encode('utf-8')).hexdigest())
+
+def _indexed_distributions(cache, directory):
+    """Return the eggs found in directory, or None if it can't be indexed
+
+    The result is a list of ``(entry, project_name, version, py_version,
+    platform, precedence, zipped)`` tuples, which is saved in cache and
+    kept as long as the modification time of the directory doesn't
+    change.  Only directories containing nothing but eggs are indexed:
+    the metadata of develop eggs are outside of the directory, so that
+    changes to them can't be detected.
+    """
+    try:
+        mtime = os.stat(directory).st_mtime
+    except OSError:
+        return None
+    index = _dist_indexes.get(directory)
+    if index is None:
+        path = _dist_index_path(cache, directory)
+        try:
+            with open(path, 'rb') as f:
+                index = marshal.load(f)
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            pass
+    if index is not None and index[0] == mtime:
+        _dist_indexes[directory] = index
+        return index[1]
+
+    dists = []
+    for dist in pkg_resources.find_distributions(directory):
+        entry = os.path.basename(dist.location)
+        if not (entry.lower().endswith('.egg')
+                and dist.location == os.path.join(directory, entry)):
+            return None
+        dists.append((entry, dist.project_name,
+                      getattr(dist, '_version', None),
+                      dist.py_version, dist.platform, dist.precedence,
+                      not os.path.isdir(dist.location)))
+    if time.time() - mtime > _mtime_delay:
+        index = _dist_indexes[directory] = mtime, dists
+        _marshal_save(index, _dist_index_path(cache, directory))
+    return dists
+
+def _marshal_save(value, path):
+    """Save value in path with marshal, replacing the file atomically
+
+    The directory of path is created if needed.
+    """
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    fd, tmp = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            marshal.dump(value, f)
+        os.rename(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+class _IndexedEnvironment(pkg_resources.Environment):
+    """Environment scanning egg directories through an index
+
+    See _indexed_distributions.
+    """
+
+    def __init__(self, search_path, cache):
+        self._dist_index_cache = cache
+        pkg_resources.Environment.__init__(self, search_path)
+
+    def scan(self, search_path=None):
+        if search_path is None:
+            search_path = sys.path
+        for item in search_path:
+            if os.path.isdir(item) and not item.lower().endswith('.egg'):
+                dists = _indexed_distributions(self._dist_index_cache, item)
+                if dists is not None:
+                    for dist in dists:
+                        self.add(self._distribution(item, *dist))
+                    continue
+            for dist in pkg_resources.find_distributions(item):
+                self.add(dist)
+
+    def _distribution(self, directory, entry, project_name, version,
+                      py_version, platform, precedence, zipped):
+        location = os.path.join(directory, entry)
+        if zipped:
+            metadata = pkg_resources.EggMetadata(
+                zipimport.zipimporter(location))
+        else:
+            metadata = pkg_resources.PathMetadata(
+                location, os.path.join(location, 'EGG-INFO'))
+        return pkg_resources.Distribution(
+            location, metadata, project_name, version, py_version,
+            platform, precedence)
+
+_redo_pyc_script = """\
+import py_compile, sys
+for line in sys.stdin:
+    py_compile.compile(line.rstrip('\\n'))
+"""
+
 def redo_pyc(egg):
     if not os.path.isdir(egg):
         return
+    compiled = []
     for dirpath, dirnames, filenames in os.walk(egg):
         chmod(dirpath)
         for filename in filenames:
@@ -1724,19 +2242,60 @@ def redo_pyc(egg):
 
             # Compile under current optimization
             try:
-                py_compile.compile(filepath)
+                py_compile.compile(filepath, doraise=True)
             except py_compile.PyCompileError:
                 logger.warning("Couldn't compile %s", filepath)
             else:
-                # Recompile under other optimization. :)
-                args = [sys.executable]
-                if __debug__:
-                    args.append('-O')
-                args.extend(['-m', 'py_compile', filepath])
+                compiled.append(filepath)
 
-                call_subprocess(args)
+    if not compiled:
+        return
+
+    # Recompile under other optimization. :)
+    if sys.version_info >= (3, 2):
+        optimize = 1 if __debug__ else 0
+        for filepath in compiled:
+            py_compile.compile(filepath, optimize=optimize)
+    else:
+        # All files at once, in a single interpreter
+        args = [sys.executable]
+        if __debug__:
+            args.append('-O')
+        args.extend(['-c', _redo_pyc_script])
+        with phase('subprocess', 'subprocess', args=args[:-1]):
+            process = subprocess.Popen(args, stdin=subprocess.PIPE)
+            process.communicate(''.join(f + '\n' for f in compiled))
+        if process.returncode != 0:
+            raise Exception(
+                "Failed to run command:\n%s"
+                % repr(args)[1:-1])
+
+# Parsed and constrained requirements, shared by all installers
+_requirements = {}
+_requirements_max = 1 << 14
+
+def _parse_requirement(spec):
+    """Return the parsed requirement spec, which must not be modified
+    """
+    requirement = _requirements.get(spec)
+    if requirement is None:
+        requirement = pkg_resources.Requirement.parse(spec)
+        if len(_requirements) >= _requirements_max:
+            _requirements.clear()
+        _requirements[spec] = requirement
+    return requirement
 
 def _constrained_requirement(constraint, requirement):
+    key = str(requirement), constraint
+    constrained = _requirements.get(key)
+    if constrained is None:
+        constrained = _constrain_requirement(constraint, requirement)
+        if len(_requirements) >= _requirements_max:
+            _requirements.clear()
+        _requirements[key] = constrained
+    return constrained
+
+def _constrain_requirement(constraint, requirement):
     if constraint[0] not in '<>':
         if constraint.startswith('='):
             assert constraint.startswith('==')
@@ -1750,15 +2309,15 @@ def _constrained_requirement(constraint, requirement):
         extras = ','.join(requirement.extras)
         if extras:
             extras = '[%s]' % extras
-        return pkg_resources.Requirement.parse(
+        return _parse_requirement(
             "%s%s==%s" % (requirement.project_name, extras, constraint))
 
     if requirement.specs:
-        return pkg_resources.Requirement.parse(
+        return _parse_requirement(
             str(requirement) + ',' + constraint
             )
     else:
-        return pkg_resources.Requirement.parse(
+        return _parse_requirement(
             str(requirement) + ' ' + constraint
             )
 
@@ -0,0 +1,288 @@
+##############################################################################
+#
+# Copyright (c) 2006 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""HTTP connections kept alive and shared between requests
+
+With the ``http-connections-per-host`` option, downloads and index pages
+are fetched through connections that are kept open once a response has
+been read, and reused for the next requests to the same host.  At most
+the given number of connections is opened to each host: requests wait
+for a connection to be available.
+
+Requests going through a proxy aren't pooled.
+"""
+
+import os
+import socket
+import threading
+
+try:
+    # Python 3
+    import http.client as httplib
+    from urllib import request as urllib2
+except ImportError:
+    # Python 2
+    import httplib
+    import urllib2
+
+try:
+    import ssl
+except ImportError:
+    ssl = None
+
+_pool = None
+
+def connections_per_host(setting=None):
+    """Set the maximum number of connections per host, 0 to disable pooling
+    """
+    global _pool
+    old = _pool.limit if _pool is not None else 0
+    if setting is not None:
+        setting = int(setting)
+        if setting != old:
+            if _pool is not None:
+                _pool.clear()
+            _pool = _Pool(setting) if setting else None
+    return old
+
+def urlopen(request, opener=urllib2.urlopen):
+    """Open a URL or request, with pooled connections if enabled
+
+    Otherwise, opener is used.
+    """
+    pool = _pool
+    if pool is None:
+        return opener(request)
+    return pool.opener.open(request)
+
+
+class _Pool(object):
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.opener = urllib2.build_opener(
+            _HTTPHandler(self), *([_HTTPSHandler(self)] if ssl else []))
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._condition = threading.Condition()
+        self._idle = {}
+        self._active = {}
+
+    def acquire(self, key, factory):
+        """Return an idle connection to key, or a new one, and whether
+        it is reused
+        """
+        if self._pid != os.getpid():
+            # Forked: connections are the ones of the parent.
+            self._reset()
+        condition = self._condition
+        with condition:
+            while self._active.get(key, 0) >= self.limit:
+                condition.wait()
+            self._active[key] = self._active.get(key, 0) + 1
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        try:
+            return factory(), False
+        except Exception:
+            self.release(key, None)
+            raise
+
+    def release(self, key, connection, reusable=False):
+        if self._pid != os.getpid():
+            return
+        condition = self._condition
+        with condition:
+            self._active[key] -= 1
+            if reusable:
+                self._idle.setdefault(key, []).append(connection)
+                connection = None
+            condition.notify()
+        if connection is not None:
+            connection.close()
+
+    def clear(self):
+        with self._condition:
+            idle = self._idle
+            self._idle = {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+    def open(self, request, scheme, factory):
+        key = scheme, _request_host(request)
+        headers = dict(request.unredirected_hdrs)
+        headers.update((name, value) for name, value in request.headers.items()
+                       if name not in headers)
+        headers['Connection'] = 'keep-alive'
+        headers = dict((name.title(), value)
+                       for name, value in headers.items())
+        selector = _request_selector(request)
+        while True:
+            connection, reused = self.acquire(key, factory)
+            try:
+                connection.request(request.get_method(), selector,
+                                   request.data, headers)
+                response = connection.getresponse()
+            except (httplib.HTTPException, socket.error) as err:
+                self.release(key, connection)
+                if reused:
+                    # The server may have closed an idle connection.
+                    continue
+                raise urllib2.URLError(err)
+            except BaseException:
+                self.release(key, connection)
+                raise
+            return _Response(self, key, connection, response,
+                             request.get_full_url())
+
+
+def _request_host(request):
+    get_host = getattr(request, 'get_host', None)
+    return get_host() if get_host is not None else request.host
+
+def _request_selector(request):
+    get_selector = getattr(request, 'get_selector', None)
+    return get_selector() if get_selector is not None else request.selector
+
+def _proxied(request):
+    return (getattr(request, '_tunnel_host', None)
+            or not _request_selector(request).startswith('/'))
+
+
+class _HTTPHandler(urllib2.HTTPHandler):
+
+    def __init__(self, pool):
+        urllib2.HTTPHandler.__init__(self)
+        self._pool = pool
+
+    def http_open(self, request):
+        if _proxied(request):
+            return urllib2.HTTPHandler.http_open(self, request)
+        host = _request_host(request)
+        timeout = request.timeout
+        return self._pool.open(
+            request, 'http',
+            lambda: httplib.HTTPConnection(host, timeout=timeout))
+
+if ssl is not None:
+
+    class _HTTPSHandler(urllib2.HTTPSHandler):
+
+        def __init__(self, pool):
+            urllib2.HTTPSHandler.__init__(self)
+            self._pool = pool
+            create_default_context = getattr(
+                ssl, 'create_default_context', None)
+            self._context = (create_default_context()
+                             if create_default_context is not None else None)
+
+        def https_open(self, request):
+            if _proxied(request):
+                return urllib2.HTTPSHandler.https_open(self, request)
+            host = _request_host(request)
+            timeout = request.timeout
+            context = self._context
+            if context is None:
+                factory = lambda: httplib.HTTPSConnection(
+                    host, timeout=timeout)
+            else:
+                factory = lambda: httplib.HTTPSConnection(
+                    host, timeout=timeout, context=context)
+            return self._pool.open(request, 'https', factory)
+
+
+class _Response(object):
+    """Response giving its connection back to the pool once read
+    """
+
+    # Unread data up to this size is read on close to reuse the connection.
+    _drain = 1 << 16
+
+    def __init__(self, pool, key, connection, response, url):
+        self._pool = pool
+        self._key = key
+        self._connection = connection
+        self._response = response
+        self.url = url
+        self.code = self.status = response.status
+        self.msg = self.reason = response.reason
+        self.headers = response.msg
+
+    def info(self):
+        return self.headers
+
+    def geturl(self):
+        return self.url
+
+    def getcode(self):
+        return self.code
+
+    def read(self, amt=None):
+        response = self._response
+        data = response.read() if amt is None else response.read(amt)
+        if response.isclosed():
+            self._release()
+        return data
+
+    def readline(self, limit=-1):
+        line = []
+        while limit < 0 or len(line) < limit:
+            char = self.read(1)
+            if not char:
+                break
+            line.append(char)
+            if char == b'\n':
+                break
+        return b''.join(line)
+
+    def readlines(self):
+        return self.read().splitlines(True)
+
+    def __iter__(self):
+        return iter(self.readlines())
+
+    def close(self):
+        response = self._response
+        if (self._connection is not None and not response.isclosed()
+            and response.length is not None
+            and response.length <= self._drain):
+            try:
+                response.read()
+            except (httplib.HTTPException, socket.error):
+                pass
+        self._release()
+
+    def _release(self):
+        connection = self._connection
+        if connection is not None:
+            self._connection = None
+            response = self._response
+            reusable = response.isclosed() and not response.will_close
+            response.close()
+            self._pool.release(self._key, connection, reusable)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
@@ -13,11 +13,12 @@
 ##############################################################################
 
 
+import multiprocessing.pool
 import shutil
 import os
 import doctest
 
-def rmtree (path):
+def rmtree (path, jobs=1):
     """
     A variant of shutil.rmtree which tries hard to be successful
     On windows shutil.rmtree aborts when it tries to delete a
@@ -88,6 +89,23 @@ def rmtree (path):
 
     >>> os.path.isdir (d)
     0
+
+    With several jobs, files are removed by as many threads, after
+    which directories are removed bottom-up.  Symbolic links to
+    directories are not followed:
+
+    >>> d = mkdtemp()
+    >>> other = mkdtemp()
+    >>> for i in range(10):
+    ...     sub = os.path.join (d, str(i), 'sub')
+    ...     os.makedirs (sub)
+    ...     for j in range(10):
+    ...         _ = open (os.path.join (sub, str(j)), 'w').write ('huhu')
+    >>> os.symlink (other, os.path.join (d, 'link'))
+    >>> rmtree (d, 4)
+    >>> os.path.isdir (d), os.path.isdir (other)
+    (False, True)
+    >>> rmtree (other)
     """
     def retry_writeable (func, path, exc):
         if func is os.path.islink:
@@ -100,8 +118,42 @@ def rmtree (path):
             os.chmod(path, 0o600)
             func(path)
 
+    if jobs > 1 and os.path.isdir(path) and not os.path.islink(path):
+        _parallel_remove(path, jobs)
+        if not os.path.lexists(path):
+            return
+
     shutil.rmtree (path, onerror = retry_writeable)
 
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def _parallel_remove(path, jobs):
+    # Errors are ignored: whatever is left is removed by shutil.rmtree
+    files = []
+    dirs = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirs.append(dirpath)
+        for name in dirnames:
+            name = os.path.join(dirpath, name)
+            if os.path.islink(name):
+                files.append(name)
+        files.extend(os.path.join(dirpath, name) for name in filenames)
+    pool = multiprocessing.pool.ThreadPool(jobs)
+    try:
+        pool.map(_unlink, files, 256)
+    finally:
+        pool.close()
+        pool.join()
+    for dirpath in reversed(dirs):
+        try:
+            os.rmdir(dirpath)
+        except OSError:
+            pass
+
 def test_suite():
     return doctest.DocTestSuite()
 
@@ -24,6 +24,7 @@ except ImportError:
     from urllib2        import urlopen
 
 import errno
+import hashlib
 import logging
 import os
 import pkg_resources
@@ -358,7 +359,6 @@ class Handler(BaseHTTPRequestHandler):
             self.wfile.write(out)
             return
 
-        self.send_response(200)
         if os.path.isdir(path):
             out = ['<html><body>\n']
             names = sorted(os.listdir(path))
@@ -368,21 +368,46 @@ class Handler(BaseHTTPRequestHandler):
                 out.append('<a href="%s">%s</a><br>\n' % (name, name))
             out.append('</body></html>\n')
             out = ''.join(out).encode()
-            self.send_header('Content-Length', str(len(out)))
-            self.send_header('Content-Type', 'text/html')
+            content_type = 'text/html'
         else:
             with open(path, 'rb') as f:
                 out = f.read()
-            self.send_header('Content-Length', len(out))
             if path.endswith('.egg'):
-                self.send_header('Content-Type', 'application/zip')
+                content_type = 'application/zip'
             elif path.endswith('.gz'):
-                self.send_header('Content-Type', 'application/x-gzip')
+                content_type = 'application/x-gzip'
             elif path.endswith('.zip'):
-                self.send_header('Content-Type', 'application/x-gzip')
+                content_type = 'application/x-gzip'
             else:
-                self.send_header('Content-Type', 'text/html')
+                content_type = 'text/html'
 
+        etag = '"%s"' % hashlib.md5(out).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        match = re.match(r'bytes=(\d+)-(\d*)$',
+                         self.headers.get('Range', ''))
+        if match and self.headers.get('If-Range', etag) == etag:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or len(out) - 1), len(out) - 1)
+            if start > end:
+                self.send_response(416)
+                self.send_header('Content-Range', 'bytes */%d' % len(out))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %d-%d/%d'
+                             % (start, end, len(out)))
+            out = out[start:end + 1]
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(out)))
+        self.send_header('Content-Type', content_type)
+        self.send_header('ETag', etag)
         self.end_headers()
 
         self.wfile.write(out)
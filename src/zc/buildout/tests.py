@@ -1178,6 +1178,59 @@ Buildout's _dir_hash() used to break on non-ascii filenames on python 2.
 
     """
 
+def dir_hash_cache():
+    """
+With the dir-hash-cache option, the digests of the files of develop
+directories are kept in an index, so that files whose size,
+modification time and inode didn't change are not read again:
+
+    >>> import os, time
+    >>> import zc.buildout.buildout
+    >>> mkdir('d')
+    >>> write('d', 'a.py', 'a')
+    >>> write('d', 'b.py', 'b')
+    >>> old = time.time() - 10
+    >>> def age(*path):
+    ...     os.utime(join(*path), (old, old))
+    >>> age('d', 'a.py')
+    >>> age('d', 'b.py')
+
+    >>> zc.buildout.buildout._dir_hash_setup('cache', None)
+    >>> digest = zc.buildout.buildout._dir_hash('d')
+    >>> len(os.listdir('cache'))
+    1
+
+    >>> write('d', 'a.py', 'x')
+    >>> age('d', 'a.py')
+    >>> zc.buildout.buildout._dir_hashes.clear()
+    >>> zc.buildout.buildout._dir_hash('d') == digest
+    True
+
+    >>> write('d', 'a.py', 'xx')
+    >>> age('d', 'a.py')
+    >>> zc.buildout.buildout._dir_hashes.clear()
+    >>> zc.buildout.buildout._dir_hash('d') == digest
+    False
+
+The dir-hash-algorithm option selects the digest used:
+
+    >>> zc.buildout.buildout._dir_hash_setup('cache', 'sha256')
+    >>> len(zc.buildout.buildout._dir_hash('d'))
+    64
+    >>> zc.buildout.buildout._dir_hash_setup(None, None)
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ... dir-hash-algorithm = foo
+    ... ''')
+    >>> print_(system(buildout), end='')
+    While:
+      Initializing.
+    Error: Unsupported dir-hash-algorithm foo
+    """
+
 def o_option_sets_offline():
     """
     >>> print_(system(join(sample_buildout, 'bin', 'buildout')+' -vvo'), end='')
@@ -1254,64 +1307,1012 @@ Now, if we update the recipe egg:
     ...     update = install
     ... ''')
 
-    >>> write('recipe', 'setup.py',
-    ... '''
-    ... from setuptools import setup
-    ... setup(name='recipe', version='2', py_modules=['recipe'],
-    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
-    ...       )
-    ... ''')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe', version='2', py_modules=['recipe'],
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+
+
+    >>> print_(system(buildout+' setup recipe bdist_egg')) # doctest: +ELLIPSIS
+    Running setup script 'recipe/setup.py'.
+    ...
+
+We won't get the update if we specify -N:
+
+    >>> print_(system(buildout+' -N'), end='')
+    Updating foo.
+    recipe v1
+
+or if we use -o:
+
+    >>> print_(system(buildout+' -o'), end='')
+    Updating foo.
+    recipe v1
+
+But we will if we use neither of these:
+
+    >>> print_(system(buildout), end='')
+    Getting distribution for 'recipe'.
+    Got recipe 2.
+    Uninstalling foo.
+    Installing foo.
+    recipe v2
+
+We can also select a particular recipe version:
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = foo
+    ... find-links = %s
+    ...
+    ... [foo]
+    ... recipe = recipe ==1
+    ... ''' % join('recipe', 'dist'))
+
+    >>> print_(system(buildout), end='')
+    Uninstalling foo.
+    Installing foo.
+    recipe v1
+
+    """
+
+def update_adds_to_uninstall_list():
+    """
+
+Paths returned by the update method are added to the list of paths to
+uninstall
+
+    >>> mkdir('recipe')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe',
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+
+    >>> write('recipe', 'recipe.py',
+    ... '''
+    ... import os
+    ... class Recipe:
+    ...     def __init__(*_): pass
+    ...     def install(self):
+    ...         r = ('a', 'b', 'c')
+    ...         for p in r: os.mkdir(p)
+    ...         return r
+    ...     def update(self):
+    ...         r = ('c', 'd', 'e')
+    ...         for p in r:
+    ...             if not os.path.exists(p):
+    ...                os.mkdir(p)
+    ...         return r
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = foo
+    ...
+    ... [foo]
+    ... recipe = recipe
+    ... ''')
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipe'
+    Installing foo.
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipe'
+    Updating foo.
+
+    >>> cat('.installed.cfg') # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
+    [buildout]
+    ...
+    [foo]
+    __buildout_installed__ = a
+    	b
+    	c
+    	d
+    	e
+    __buildout_signature__ = ...
+
+"""
+
+def install_parts_in_parallel():
+    """
+With the jobs option, parts that don't depend on each other are
+installed at the same time, in separate processes:
+
+    >>> mkdir('recipe')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe',
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+
+    >>> write('recipe', 'recipe.py',
+    ... '''
+    ... import os, time, zc.buildout
+    ... class Recipe:
+    ...     def __init__(self, buildout, name, options):
+    ...         self.name, self.options = name, options
+    ...         options.get('after')
+    ...     def install(self):
+    ...         for p in self.options.get('needs', '').split():
+    ...             assert os.path.exists(p), p
+    ...         time.sleep(float(self.options.get('sleep', 0)))
+    ...         if self.options.get('fail'):
+    ...             raise zc.buildout.UserError('%s failed' % self.name)
+    ...         open(self.name, 'w').close()
+    ...         return self.name
+    ...     def update(self):
+    ...         pass
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = a b c
+    ... jobs = 2
+    ...
+    ... [a]
+    ... recipe = recipe
+    ... sleep = 1
+    ...
+    ... [b]
+    ... recipe = recipe
+    ... needs = a
+    ... after = ${a:recipe}
+    ...
+    ... [c]
+    ... recipe = recipe
+    ... fail = 1
+    ... ''')
+
+b references a, so it waits for it. When c fails, no new part is
+started but a is still recorded as installed:
+
+    >>> print_('\\n'.join(sorted(system(buildout).splitlines())))
+      Installing c.
+      Installing.
+    Develop: '/sample-buildout/recipe'
+    Error: c failed
+    Installing a.
+    Installing c.
+    While:
+
+    >>> import zc.buildout.configparser
+    >>> def installed():
+    ...     with open('.installed.cfg') as f:
+    ...         cfg = zc.buildout.configparser.parse(f, '.installed.cfg')
+    ...     print_(sorted(cfg['buildout']['parts'].split()), sorted(cfg))
+    >>> installed()
+    ['a'] ['a', 'buildout']
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = a b c
+    ...
+    ... [a]
+    ... recipe = recipe
+    ... sleep = 1
+    ...
+    ... [b]
+    ... recipe = recipe
+    ... needs = a
+    ... after = ${a:recipe}
+    ...
+    ... [c]
+    ... recipe = recipe
+    ... ''')
+
+    >>> print_('\\n'.join(sorted(system(buildout+' -j 3').splitlines())))
+    Develop: '/sample-buildout/recipe'
+    Installing b.
+    Installing c.
+    Updating a.
+    >>> installed()
+    ['a', 'b', 'c'] ['a', 'b', 'buildout', 'c']
+
+An invalid number of jobs is an error:
+
+    >>> print_(system(buildout+' -j 0'), end='')
+    While:
+      Initializing.
+    Error: Invalid number of jobs 0
+
+Other options giving numbers are checked the same way:
+
+    >>> for option in ('download-jobs=x', 'download-segments=0',
+    ...                'http-connections-per-host=-1',
+    ...                'http-connections-per-host=0'):
+    ...     print_(system(buildout+' '+option), end='')
+    While:
+      Initializing.
+    Error: Invalid number of download jobs x
+    While:
+      Initializing.
+    Error: Invalid number of download segments 0
+    While:
+      Initializing.
+    Error: Invalid number of http connections per host -1
+    Develop: '/sample-buildout/recipe'
+    Updating a.
+    Updating b.
+    Updating c.
+    """
+
+def picked_versions_of_parts_installed_in_parallel():
+    """
+Versions picked by recipes run in child processes are reported, like
+the ones picked by recipes run by buildout itself:
+
+    >>> mkdir('recipe')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe',
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+    >>> write('recipe', 'recipe.py',
+    ... '''
+    ... import zc.buildout.easy_install
+    ... class Recipe:
+    ...     def __init__(self, buildout, name, options):
+    ...         self.buildout, self.options = buildout, options
+    ...     def install(self):
+    ...         zc.buildout.easy_install.install(
+    ...             [self.options['egg']],
+    ...             self.buildout['buildout']['eggs-directory'],
+    ...             links=[self.options['link']],
+    ...             index=self.options['link'] + 'index/')
+    ...         return ()
+    ...     update = install
+    ... ''')
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = a b
+    ... jobs = 2
+    ... show-picked-versions = true
+    ...
+    ... [a]
+    ... recipe = recipe
+    ... egg = demo ==0.2
+    ... link = %(link_server)s
+    ...
+    ... [b]
+    ... recipe = recipe
+    ... egg = demoneeded ==1.1
+    ... link = %(link_server)s
+    ... ''' % globals())
+    >>> print_(system(buildout), end='') # doctest: +ELLIPSIS
+    Develop: '/sample-buildout/recipe'
+    ...
+    Versions had to be automatically picked.
+    The following part definition lists the versions picked:
+    [versions]
+    <BLANKLINE>
+    # Required by:
+    # demo==0.2
+    demoneeded = 1.1
+    ...
+    """
+
+def wait_for_child_done_but_not_exited():
+    """
+Children write to a pipe when they are done.  If one didn't exit yet,
+the parent waits for it instead of polling until it does:
+
+    >>> import time
+    >>> from zc.buildout.buildout import _wait_child
+    >>> done_r, done_w = os.pipe()
+    >>> pid = os.fork()
+    >>> if not pid:
+    ...     try:
+    ...         os.write(done_w, b'.')
+    ...         time.sleep(1)
+    ...     finally:
+    ...         os._exit(3)
+    >>> os.close(done_w)
+
+    >>> waitpid = os.waitpid
+    >>> calls = []
+    >>> def counting_waitpid(pid, options):
+    ...     calls.append(options)
+    ...     return waitpid(pid, options)
+    >>> os.waitpid = counting_waitpid
+    >>> _wait_child({pid: ('part', done_r)}) == (pid, 3 << 8)
+    True
+    >>> os.waitpid = waitpid
+    >>> len(calls) < 10
+    True
+    >>> os.close(done_r)
+    """
+
+def parse_cache():
+    """
+With the parse-cache option, parsed configuration files are kept in a
+directory and reused as long as they don't change.  Like extends-cache,
+the option applies to the files extended by the file defining it:
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... extends = base.cfg
+    ... parse-cache = parse-cache
+    ... ''')
+
+    >>> write('base.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ...
+    ... [x]
+    ... y = 1
+    ...
+    ... [x:os.environ.get('PARSE_CACHE_TEST') == '2']
+    ... y = 2
+    ... ''')
+
+Files modified in the last seconds aren't cached, so let's make it
+older:
+
+    >>> import os, time
+    >>> old = time.time() - 60
+    >>> os.utime('base.cfg', (old, old))
+    >>> from zc.buildout.buildout import Buildout
+    >>> Buildout('buildout.cfg', [])['x']['y']
+    '1'
+    >>> len(os.listdir('parse-cache'))
+    1
+
+The result of section expressions is checked when a cached file is
+used:
+
+    >>> os.environ['PARSE_CACHE_TEST'] = '2'
+    >>> Buildout('buildout.cfg', [])['x']['y']
+    '2'
+    >>> del os.environ['PARSE_CACHE_TEST']
+    >>> Buildout('buildout.cfg', [])['x']['y']
+    '1'
+
+Changing the file also invalidates the cache:
+
+    >>> write('base.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ...
+    ... [x]
+    ... y = 3
+    ... ''')
+    >>> os.utime('base.cfg', (old, old))
+    >>> Buildout('buildout.cfg', [])['x']['y']
+    '3'
+    >>> len(os.listdir('parse-cache'))
+    1
+
+A file modified in the last seconds could change again without its
+size and modification time changing, so its cached result isn't used
+nor replaced:
+
+    >>> now = int(time.time())
+    >>> template = '''
+    ... [buildout]
+    ... parts =
+    ...
+    ... [x]
+    ... y = %s
+    ... '''
+    >>> for y in '45':
+    ...     write('base.cfg', template % y)
+    ...     os.utime('base.cfg', (now, now))
+    ...     print_(Buildout('buildout.cfg', [])['x']['y'])
+    4
+    5
+    >>> os.utime('base.cfg', (old - 60, old - 60))
+    >>> Buildout('buildout.cfg', [])['x']['y']
+    '5'
+    """
+
+def substitution_templates_are_compiled_once():
+    """
+Values are split into literal text and references only once, and the
+result is shared by all sections using the same raw value:
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ...
+    ... [a]
+    ... x = ${b:y} $${c:z} ${:name}
+    ... name = a
+    ...
+    ... [b]
+    ... y = 1
+    ... name = b
+    ... x = ${b:y} $${c:z} ${:name}
+    ... ''')
+
+    >>> from zc.buildout.buildout import Buildout, Options
+    >>> Options._compiled.clear()
+    >>> buildout_ = Buildout('buildout.cfg', [])
+    >>> buildout_['a']['x'], buildout_['b']['x']
+    ('1 ${c:z} a', '1 ${c:z} b')
+    >>> for (literals, refs) in Options._compiled['${b:y} $${c:z} ${:name}']:
+    ...     print_(literals, refs)
+    ('', ' ') (('b', 'y'),)
+    ('{c:z} ', '') (('', 'name'),)
+
+Errors are reported in the order of the references, so an invalid
+reference isn't reported before the expansion of earlier ones fails:
+
+    >>> for template in ('${b:nope} ${b:y:z}', '${b:y} ${b:y:z}'):
+    ...     try:
+    ...         buildout_['a']._sub(template, set())
+    ...     except zc.buildout.UserError:
+    ...         print_(sys.exc_info()[1])
+    Referenced option does not exist: b nope
+    The substitution, ${b:y:z},
+    has too many colons.
+
+    """
+
+def part_signatures_resolve_each_recipe_once():
+    """
+Recipes shared by several parts are resolved once when computing part
+signatures, and dependency sections are hashed once, until they get a
+signature of their own:
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts = a b c e
+    ...
+    ... [a]
+    ... recipe = zc.buildout:debug
+    ... x = ${d:y}
+    ...
+    ... [b]
+    ... recipe = zc.buildout:debug
+    ... x = ${d:y} ${c:x}
+    ...
+    ... [c]
+    ... recipe = zc.buildout:debug
+    ... x = ${d:y}
+    ...
+    ... [d]
+    ... y = 1
+    ...
+    ... [e]
+    ... recipe = zc.buildout:debug
+    ... x = ${c:x}
+    ... ''')
+
+    >>> from zc.buildout.buildout import Buildout
+    >>> buildout_ = Buildout('buildout.cfg', [])
+    >>> for part in 'abce':
+    ...     _ = buildout_[part]
+    >>> resolve = pkg_resources.working_set.resolve
+    >>> resolved = []
+    >>> def counting_resolve(requirements, *args, **kw):
+    ...     resolved.extend(requirements)
+    ...     return resolve(requirements, *args, **kw)
+    >>> pkg_resources.working_set.resolve = counting_resolve
+    >>> buildout_._compute_part_signatures(['a', 'b', 'c', 'e'])
+    >>> pkg_resources.working_set.resolve = resolve
+    >>> resolved
+    [Requirement.parse('zc.buildout')]
+
+    >>> def sig(part):
+    ...     return [s for s in buildout_[part]['__buildout_signature__'].split()
+    ...             if ':' in s]
+    >>> sig('a') == sig('c') != sig('b')
+    True
+    >>> import hashlib
+    >>> def digest(section):
+    ...     m = hashlib.md5()
+    ...     for item in sorted(buildout_[section].items()):
+    ...         m.update(('%r\\0%r\\0' % item).encode())
+    ...     return section + ':' + m.hexdigest()
+    >>> sig('a') == [digest('d')]
+    True
+    >>> sig('e') == [digest('c')]
+    True
+    >>> del buildout_['c']._data['__buildout_signature__']
+    >>> sig('b') == [digest('c'), digest('d')]
+    True
+    """
+
+def benchmark():
+    """
+The benchmark suite generates a synthetic profile and times the steps of
+a run that don't install anything:
+
+    >>> import zc.buildout.benchmark
+    >>> zc.buildout.benchmark.main(['--sections', '10', '--repeat', '2',
+    ...                             '--extends', '2', '--develop', '1'])
+    ... # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
+    profile: density=1.0, develop=1, extends=2, options=20, remote=False,
+             sections=10
+    load         first: ...s  best: ...s  mean: ...s
+    open         first: ...s  best: ...s  mean: ...s
+    initialize   first: ...s  best: ...s  mean: ...s
+    signatures   first: ...s  best: ...s  mean: ...s
+    save         first: ...s  best: ...s  mean: ...s
+    develop-hash first: ...s  best: ...s  mean: ...s
+
+Extended files can be served by a local server, benchmarks can be
+selected, and results can be saved as JSON:
+
+    >>> zc.buildout.benchmark.main(['--sections', '10', '--repeat', '2',
+    ...                             '--remote', '--json', 'results.json',
+    ...                             'load', 'open'])
+    >>> import json
+    >>> with open('results.json') as f:
+    ...     results = json.load(f)
+    >>> print_(' '.join(sorted(results)))
+    benchmarks profile python time version
+    >>> results['profile']['remote']
+    True
+    >>> for result in results['benchmarks']:
+    ...     print_(result['name'], len(result['timings']),
+    ...            result['best'] <= result['mean'])
+    load 2 True
+    open 2 True
+    """
+
+def profile_run():
+    """
+The --profile-run option records the time spent in each phase of a run
+and in each part, and writes a report in the trace event format:
+
+    >>> mkdir('recipe')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe',
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+
+    >>> write('recipe', 'recipe.py',
+    ... '''
+    ... class Recipe:
+    ...     def __init__(self, buildout, name, options):
+    ...         self.options = options
+    ...     def install(self):
+    ...         open(self.options['path'], 'w').close()
+    ...         return self.options['path']
+    ...     update = install
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = a b
+    ...
+    ... [a]
+    ... recipe = recipe
+    ... path = a
+    ...
+    ... [b]
+    ... recipe = recipe
+    ... path = b
+    ... ''')
+
+    >>> print_(system(buildout+' --profile-run timing.json'), end='')
+    Develop: '/sample-buildout/recipe'
+    Installing a.
+    Installing b.
+
+    >>> import json
+    >>> with open('timing.json') as f:
+    ...     report = json.load(f)
+    >>> events = report['traceEvents']
+    >>> for event in events:
+    ...     if event['cat'] == 'part':
+    ...         print_(event['name'], event['args']['part'])
+    install a
+    install b
+    >>> names = set(event['name'] for event in events)
+    >>> sorted(name for name in ('initialize', 'load configuration', 'develop',
+    ...                          'signatures', 'install', 'subprocess')
+    ...        if name not in names)
+    []
+    >>> event = events[-1]
+    >>> print_(event['name'], event['ph'], event['dur'] >= 0,
+    ...        ' '.join(sorted(event['args'])))
+    install X True children_cpu cpu
+
+A summary of the time spent by kind of phase is also included:
+
+    >>> for total in report['phases']:
+    ...     if total['category'] == 'part':
+    ...         print_(total['name'], total['count'])
+    install 2
+
+Parts installed in parallel are timed in their processes:
+
+    >>> remove('timing.json')
+    >>> print_('\\n'.join(sorted(system(
+    ...     buildout+' -j2 --profile-run timing.json a:path=c').splitlines())))
+    Develop: '/sample-buildout/recipe'
+    Installing a.
+    Uninstalling a.
+    Updating b.
+    >>> with open('timing.json') as f:
+    ...     events = json.load(f)['traceEvents']
+    >>> for name, part in sorted((event['name'], event['args']['part'])
+    ...                          for event in events
+    ...                          if event['cat'] == 'part'):
+    ...     print_(name, part)
+    install a
+    uninstall a
+    update b
+    >>> pids = set(event['pid'] for event in events)
+    >>> len(pids)
+    3
+    """
+
+def installed_format_sqlite():
+    """
+With installed-format set to sqlite, the options of installed parts are
+saved in an sqlite database rather than a configuration file:
+
+    >>> mkdir('recipe')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe',
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+
+    >>> write('recipe', 'recipe.py',
+    ... '''
+    ... class Recipe:
+    ...     def __init__(self, buildout, name, options):
+    ...         self.options = options
+    ...     def install(self):
+    ...         open(self.options['path'], 'w').close()
+    ...         return self.options['path']
+    ...     update = install
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = a b
+    ... installed-format = sqlite
+    ...
+    ... [a]
+    ... recipe = recipe
+    ... path = a
+    ...
+    ... [b]
+    ... recipe = recipe
+    ... path = b
+    ... ''')
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipe'
+    Installing a.
+    Installing b.
+    >>> with open('.installed.cfg', 'rb') as f:
+    ...     f.read(15) == b'SQLite format 3'
+    True
+
+Parts are read from the database as they are used:
+
+    >>> from zc.buildout.buildout import Buildout
+    >>> installed = Buildout('buildout.cfg', [])._read_installed_part_options()
+    >>> sorted(installed), len(installed)
+    (['a', 'b', 'buildout'], 3)
+    >>> sorted(installed._loaded)
+    []
+    >>> 'a' in installed, 'c' in installed, installed.get('c')
+    (True, False, None)
+    >>> print_(installed['a']['__buildout_installed__'])
+    a
+    >>> sorted(installed._loaded)
+    ['a']
+
+Only the sections whose installed options changed are written when
+saving, so that saving doesn't depend on the number of parts:
+
+    >>> from zc.buildout.buildout import _save_installed
+    >>> installed['a']['path'] = installed['b']['path'] = 'changed'
+    >>> sorted(_save_installed('.installed.cfg', installed, installed.saved,
+    ...                        set(['b'])))
+    ['a', 'b', 'buildout']
+    >>> installed = Buildout('buildout.cfg', [])._read_installed_part_options()
+    >>> print_(installed['a']['path'], installed['b']['path'])
+    a changed
+
+    >>> print_(system(buildout+' b:path=c'), end='')
+    Develop: '/sample-buildout/recipe'
+    Uninstalling b.
+    Updating a.
+    Installing b.
+    >>> ls('.')
+    -  .installed.cfg
+    -  a
+    d  bin
+    -  buildout.cfg
+    -  c
+    d  develop-eggs
+    d  eggs
+    d  parts
+    d  recipe
+
+Going back to the default format converts the file:
+
+    >>> print_(system(buildout+' installed-format=cfg'), end='')
+    Develop: '/sample-buildout/recipe'
+    Uninstalling b.
+    Updating a.
+    Installing b.
+    >>> cat('.installed.cfg') # doctest: +ELLIPSIS
+    [buildout]
+    installed_develop_eggs = /sample-buildout/develop-eggs/recipe.egg-link
+    parts = a b
+    <BLANKLINE>
+    [a]
+    __buildout_installed__ = a
+    ...
+
+Other formats are rejected:
+
+    >>> print_(system(buildout+' installed-format=xml'), end='')
+    While:
+      Initializing.
+    Error: Invalid installed-format xml
+    """
+
+def check_installed_files():
+    """
+Parts whose options didn't change are reinstalled if some of their
+installed files are missing.  The check-installed-files option selects
+how this is checked: ``all`` files one after the other (the default),
+``parallel`` using threads, or only the ``roots``, i.e. files that
+aren't inside an installed directory:
+
+    >>> mkdir('recipe')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe',
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+
+    >>> write('recipe', 'recipe.py',
+    ... '''
+    ... import os
+    ... class Recipe:
+    ...     def __init__(self, buildout, name, options):
+    ...         self.name = name
+    ...     def install(self):
+    ...         os.mkdir(self.name)
+    ...         paths = [self.name]
+    ...         for i in range(3):
+    ...             path = os.path.join(self.name, str(i))
+    ...             open(path, 'w').close()
+    ...             paths.append(path)
+    ...         return paths
+    ...     def update(self):
+    ...         pass
+    ... ''')
+
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... develop = recipe
+    ... parts = a
+    ...
+    ... [a]
+    ... recipe = recipe
+    ... ''')
+
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipe'
+    Installing a.
 
+    >>> remove('a', '1')
+    >>> print_(system(buildout+' check-installed-files=roots'), end='')
+    Develop: '/sample-buildout/recipe'
+    Updating a.
+    >>> print_(system(buildout+' check-installed-files=parallel'), end='')
+    Develop: '/sample-buildout/recipe'
+    Uninstalling a.
+    Installing a.
+    >>> print_(system(buildout+' check-installed-files=parallel'), end='')
+    Develop: '/sample-buildout/recipe'
+    Updating a.
 
-    >>> print_(system(buildout+' setup recipe bdist_egg')) # doctest: +ELLIPSIS
-    Running setup script 'recipe/setup.py'.
-    ...
+    >>> remove('a', '1')
+    >>> print_(system(buildout), end='')
+    Develop: '/sample-buildout/recipe'
+    Uninstalling a.
+    Installing a.
 
-We won't get the update if we specify -N:
+    >>> remove('a')
+    >>> print_(system(buildout+' check-installed-files=roots'), end='')
+    Develop: '/sample-buildout/recipe'
+    Uninstalling a.
+    Installing a.
 
-    >>> print_(system(buildout+' -N'), end='')
-    Updating foo.
-    recipe v1
+    >>> print_(system(buildout+' check-installed-files=some'), end='')
+    While:
+      Initializing.
+    Error: Invalid check-installed-files some
 
-or if we use -o:
+The threads are created once and used for the checks of all parts:
 
-    >>> print_(system(buildout+' -o'), end='')
-    Updating foo.
-    recipe v1
+    >>> buildout_ = zc.buildout.buildout.Buildout(
+    ...     'buildout.cfg',
+    ...     [('buildout', 'check-installed-files', 'parallel')])
+    >>> files = 'a\\na/0\\na/1\\na/2'
+    >>> buildout_._installed_files_exist(files)
+    True
+    >>> pool = buildout_._check_pool
+    >>> buildout_._installed_files_exist(files + '\\na/3')
+    False
+    >>> buildout_._check_pool is pool
+    True
+    >>> buildout_._close_check_pool()
+    >>> buildout_._check_pool is None
+    True
 
-But we will if we use neither of these:
+    >>> from zc.buildout.buildout import _installed_roots
+    >>> _installed_roots(['/a', '/a/b', '/a/b/c', '/ab', 'd', 'd/e'])
+    ['/a', '/ab', 'd']
+    """
 
-    >>> print_(system(buildout), end='')
-    Getting distribution for 'recipe'.
-    Got recipe 2.
-    Uninstalling foo.
-    Installing foo.
-    recipe v2
+def uninstall_jobs_and_trash():
+    """
+The uninstall-jobs option sets the number of threads removing the files
+of directories installed by parts.  With uninstall-trash, directories
+are moved to a trash directory and removed in the background while
+parts get installed:
 
-We can also select a particular recipe version:
+    >>> mkdir('recipe')
+    >>> write('recipe', 'setup.py',
+    ... '''
+    ... from setuptools import setup
+    ... setup(name='recipe',
+    ...       entry_points={'zc.buildout': ['default = recipe:Recipe']},
+    ...       )
+    ... ''')
+
+    >>> write('recipe', 'recipe.py',
+    ... '''
+    ... import os
+    ... class Recipe:
+    ...     def __init__(self, buildout, name, options):
+    ...         self.name, self.options = name, options
+    ...     def install(self):
+    ...         print(sorted(os.listdir('.')))
+    ...         for i in range(int(self.options['n'])):
+    ...             path = os.path.join(self.name, str(i))
+    ...             os.makedirs(path)
+    ...             open(os.path.join(path, 'f'), 'w').close()
+    ...         return self.name
+    ...     update = install
+    ... ''')
 
     >>> write('buildout.cfg',
     ... '''
     ... [buildout]
-    ... parts = foo
-    ... find-links = %s
+    ... develop = recipe
+    ... parts = a
+    ... uninstall-jobs = 4
+    ... uninstall-trash = true
     ...
-    ... [foo]
-    ... recipe = recipe ==1
-    ... ''' % join('recipe', 'dist'))
+    ... [a]
+    ... recipe = recipe
+    ... n = 20
+    ... ''')
 
     >>> print_(system(buildout), end='')
-    Uninstalling foo.
-    Installing foo.
-    recipe v1
+    Develop: '/sample-buildout/recipe'
+    Installing a.
+    ['bin', 'buildout.cfg', 'develop-eggs', 'eggs', 'parts', 'recipe']
+
+Directories left in the trash by interrupted runs are removed too:
 
+    >>> mkdir('.trash')
+    >>> mkdir('.trash', 'old')
+    >>> print_(system(buildout+' a:n=3'), end='')
+    Develop: '/sample-buildout/recipe'
+    Uninstalling a.
+    Installing a.
+    ['.installed.cfg', '.trash', 'bin', 'buildout.cfg', 'develop-eggs', 'eggs', 'parts', 'recipe']
+    >>> ls('a')
+    d  0
+    d  1
+    d  2
+    >>> os.path.exists('.trash')
+    False
+
+    >>> print_(system(buildout+' uninstall-jobs=0'), end='')
+    While:
+      Initializing.
+    Error: Invalid number of uninstall jobs 0
     """
 
-def update_adds_to_uninstall_list():
+def redo_pyc_compiles_in_batch():
+    """
+When installing eggs, modules that were compiled are compiled again, in
+the installing process, and for the other optimization level, in a
+single interpreter per egg:
+
+    >>> mkdir('egg')
+    >>> mkdir('egg', 'pkg')
+    >>> for name in ('a', 'b', 'bad'):
+    ...     write('egg', 'pkg', name + '.py', 'x = 1\\n')
+    ...     write('egg', 'pkg', name + '.pyc', '')
+    >>> write('egg', 'pkg', 'bad.py', 'x = \\n')
+    >>> write('egg', 'pkg', 'c.py', 'x = 1\\n')
+
+    >>> def compiled(name):
+    ...     path = join('egg', 'pkg', name + '.py')
+    ...     if sys.version_info < (3, 2):
+    ...         paths = path + 'c', path + 'o'
+    ...     else:
+    ...         import importlib.util
+    ...         paths = (importlib.util.cache_from_source(path, False),
+    ...                  importlib.util.cache_from_source(path, True))
+    ...     return [os.path.exists(p) for p in paths]
+
+    >>> calls = []
+    >>> import subprocess
+    >>> Popen = subprocess.Popen
+    >>> def counting_Popen(*args, **kw):
+    ...     calls.append(args)
+    ...     return Popen(*args, **kw)
+    >>> subprocess.Popen = counting_Popen
+    >>> from zope.testing.loggingsupport import InstalledHandler
+    >>> handler = InstalledHandler('zc.buildout.easy_install')
+    >>> import logging
+    >>> logger = logging.getLogger('zc.buildout.easy_install')
+    >>> logger.propagate = False
+    >>> zc.buildout.easy_install.redo_pyc('egg')
+    >>> subprocess.Popen = Popen
+    >>> print_(handler)
+    zc.buildout.easy_install WARNING
+      Couldn't compile egg/pkg/bad.py
+    >>> handler.uninstall()
+    >>> logger.propagate = True
+    >>> len(calls) == (sys.version_info < (3, 2))
+    True
+
+    >>> compiled('a'), compiled('b'), compiled('c'), compiled('bad')
+    ([True, True], [True, True], [False, False], [False, False])
     """
 
-Paths returned by the update method are added to the list of paths to
-uninstall
+def skip_if_unchanged():
+    """
+With the skip-if-unchanged option, buildout saves a fingerprint of the
+installation and doesn't even load recipes if nothing changed since
+the last run.  This is only done when newest is false:
 
     >>> mkdir('recipe')
     >>> write('recipe', 'setup.py',
@@ -1324,51 +2325,204 @@ uninstall
 
     >>> write('recipe', 'recipe.py',
     ... '''
-    ... import os
     ... class Recipe:
-    ...     def __init__(*_): pass
+    ...     def __init__(self, buildout, name, options):
+    ...         self.name, self.options = name, options
+    ...         options.get('x')
     ...     def install(self):
-    ...         r = ('a', 'b', 'c')
-    ...         for p in r: os.mkdir(p)
-    ...         return r
+    ...         open(self.name, 'w').close()
+    ...         return self.name
     ...     def update(self):
-    ...         r = ('c', 'd', 'e')
-    ...         for p in r:
-    ...             if not os.path.exists(p):
-    ...                os.mkdir(p)
-    ...         return r
+    ...         print('%s updated' % self.name)
     ... ''')
 
     >>> write('buildout.cfg',
     ... '''
     ... [buildout]
     ... develop = recipe
-    ... parts = foo
+    ... parts = a
+    ... newest = false
+    ... skip-if-unchanged = true
     ...
-    ... [foo]
+    ... [a]
     ... recipe = recipe
     ... ''')
 
     >>> print_(system(buildout), end='')
     Develop: '/sample-buildout/recipe'
-    Installing foo.
-
+    Installing a.
     >>> print_(system(buildout), end='')
+    Nothing changed.
+
+Changes to the configuration, on the command line, in develop
+directories or in installed files are detected:
+
+    >>> print_(system(buildout+' a:x=1'), end='')
     Develop: '/sample-buildout/recipe'
-    Updating foo.
+    Uninstalling a.
+    Installing a.
+    >>> print_(system(buildout+' a:x=1'), end='')
+    Nothing changed.
 
-    >>> cat('.installed.cfg') # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
-    [buildout]
-    ...
-    [foo]
-    __buildout_installed__ = a
-    	b
-    	c
-    	d
-    	e
-    __buildout_signature__ = ...
+    >>> write('recipe', 'README.txt', '')
+    >>> print_(system(buildout+' a:x=1'), end='')
+    Develop: '/sample-buildout/recipe'
+    Uninstalling a.
+    Installing a.
+    >>> print_(system(buildout+' a:x=1'), end='')
+    Nothing changed.
 
-"""
+    >>> remove('a')
+    >>> print_(system(buildout+' a:x=1'), end='')
+    Develop: '/sample-buildout/recipe'
+    Uninstalling a.
+    Installing a.
+
+The check is not done when newest is true:
+
+    >>> print_(system(buildout+' -n a:x=1'), end='')
+    Develop: '/sample-buildout/recipe'
+    Updating a.
+    a updated
+
+The digests of the files of develop directories are indexed next to
+the installed file, so that they aren't read again while they don't
+change.  Files modified in the last seconds aren't indexed, so let's
+make them older:
+
+    >>> import time
+    >>> old = time.time() - 60
+    >>> for dirpath, dirnames, filenames in os.walk('recipe'):
+    ...     for name in filenames:
+    ...         os.utime(os.path.join(dirpath, name), (old, old))
+    >>> buildout_ = zc.buildout.buildout.Buildout(
+    ...     'buildout.cfg', [('a', 'x', '1')])
+    >>> fingerprint = buildout_._fingerprint()
+    >>> len(os.listdir('.installed.cfg.dir-hashes'))
+    1
+
+    >>> file_hash_update = zc.buildout.buildout._file_hash_update
+    >>> read = []
+    >>> def recording_file_hash_update(hash, path):
+    ...     read.append(path)
+    ...     file_hash_update(hash, path)
+    >>> zc.buildout.buildout._file_hash_update = recording_file_hash_update
+    >>> buildout_._fingerprint() == fingerprint
+    True
+    >>> read
+    []
+    >>> zc.buildout.buildout._file_hash_update = file_hash_update
+    """
+
+def prefetch_remote_extends():
+    """
+With the download-jobs option, remote files in the extends tree are
+downloaded concurrently before being merged in the usual order:
+
+    >>> server_data = tmpdir('server_data')
+    >>> server_url = start_server(server_data)
+    >>> write(server_data, 'a.cfg',
+    ... '''
+    ... [buildout]
+    ... extends = c.cfg
+    ... [x]
+    ... a = a
+    ... y = a
+    ... ''')
+    >>> write(server_data, 'b.cfg',
+    ... '''
+    ... [x]
+    ... b = b
+    ... y = b
+    ... ''')
+    >>> write(server_data, 'c.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ... [x]
+    ... c = c
+    ... y = c
+    ... ''')
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... extends = %(url)sa.cfg %(url)sb.cfg
+    ... download-jobs = 2
+    ... ''' % dict(url=server_url))
+
+    >>> import zc.buildout.buildout
+    >>> zc.buildout.buildout._open_download_cache.clear()
+    >>> sorted(zc.buildout.buildout.Buildout('buildout.cfg', [])['x'].items())
+    [('a', 'a'), ('b', 'b'), ('c', 'c'), ('y', 'b')]
+    >>> sorted(url[len(server_url):]
+    ...        for url in zc.buildout.buildout._open_download_cache)
+    ['a.cfg', 'b.cfg', 'c.cfg']
+
+Each file is parsed once, the files found when prefetching being
+reused when they are opened:
+
+    >>> import zc.buildout.configparser
+    >>> parse = zc.buildout.configparser.parse
+    >>> parsed = []
+    >>> def counting_parse(fp, fpname, *args):
+    ...     parsed.append(os.path.basename(fpname))
+    ...     return parse(fp, fpname, *args)
+    >>> zc.buildout.configparser.parse = counting_parse
+    >>> zc.buildout.buildout._open_download_cache.clear()
+    >>> _ = zc.buildout.buildout.Buildout('buildout.cfg', [])
+    ... # doctest: +ELLIPSIS
+    Downloading ...
+    >>> zc.buildout.configparser.parse = parse
+    >>> sorted(parsed)
+    ['a.cfg', 'b.cfg', 'buildout.cfg', 'c.cfg']
+
+Recursive includes are still detected:
+
+    >>> write(server_data, 'c.cfg',
+    ... '''
+    ... [buildout]
+    ... extends = a.cfg
+    ... ''')
+    >>> zc.buildout.buildout._open_download_cache.clear()
+    >>> print_(system(buildout), end='') # doctest: +ELLIPSIS
+    While:
+      Initializing.
+    Error: Recursive file include [...] http://localhost:.../a.cfg
+
+Files that can't be downloaded are only tried once when prefetching,
+then again when they are opened, which reports the error:
+
+    >>> write(server_data, 'c.cfg',
+    ... '''
+    ... [buildout]
+    ... extends = missing.cfg
+    ... ''')
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... extends = %(url)sc.cfg
+    ... download-jobs = 2
+    ... ''' % dict(url=server_url))
+    >>> zc.buildout.buildout._open_download_cache.clear()
+    >>> from zc.buildout.download import Download
+    >>> download_call = Download.__call__
+    >>> downloads = []
+    >>> def call(self, url, *args, **kw):
+    ...     downloads.append(url[len(server_url):])
+    ...     return download_call(self, url, *args, **kw)
+    >>> Download.__call__ = call
+    >>> try:
+    ...     zc.buildout.buildout.Buildout('buildout.cfg', [])
+    ... except zc.buildout.UserError:
+    ...     print_(sys.exc_info()[1]) # doctest: +ELLIPSIS
+    Downloading ...
+    Error downloading extends for URL http://localhost:.../missing.cfg: ...
+    >>> Download.__call__ = download_call
+    >>> downloads
+    ['c.cfg', 'missing.cfg', 'missing.cfg']
+
+    >>> zc.buildout.buildout._open_download_cache.clear()
+    """
 
 def log_when_there_are_not_local_distros():
     """
@@ -2911,6 +4065,27 @@ def test_constrained_requirement():
     ...         g = IncompatibleConstraintError
     ...     if str(g) != str(e):
     ...         print_('failed', o, c, g, '!=', e)
+
+    Parsed and constrained requirements are shared by all installers,
+    up to a limit:
+
+    >>> from zc.buildout.easy_install import _parse_requirement
+    >>> o = _parse_requirement('x>1')
+    >>> o is _parse_requirement('x>1')
+    True
+    >>> _constrained_requirement('2', o) is _constrained_requirement(
+    ...     '2', pkg_resources.Requirement.parse('x>1'))
+    True
+    >>> _constrained_requirement('3', o)
+    Requirement.parse('x==3')
+    >>> old_max = zc.buildout.easy_install._requirements_max
+    >>> zc.buildout.easy_install._requirements_max = 2
+    >>> _ = _parse_requirement('y'), _parse_requirement('z')
+    >>> len(zc.buildout.easy_install._requirements)
+    2
+    >>> 'x>1' in zc.buildout.easy_install._requirements
+    False
+    >>> zc.buildout.easy_install._requirements_max = old_max
     """
 
 def test_distutils_scripts_using_import_are_properly_parsed():
@@ -3115,6 +4290,468 @@ def error_installing_in_offline_mode_if_dont_have_needed_dist():
     <BLANKLINE>
     """
 
+def download_jobs_fetch_distributions_concurrently():
+    r"""
+When download_jobs is greater than 1, the distributions needed by each
+level of requirements are fetched concurrently.  The result is the same
+as when they are fetched one by one:
+
+    >>> import zc.buildout.easy_install
+    >>> def install(dest, jobs):
+    ...     old = zc.buildout.easy_install.download_jobs(jobs)
+    ...     try:
+    ...         ws = zc.buildout.easy_install.install(
+    ...             ['demo', 'other'], dest,
+    ...             links=[link_server], index=link_server+'index/')
+    ...     finally:
+    ...         zc.buildout.easy_install.download_jobs(old)
+    ...     return [(dist.project_name, dist.version) for dist in ws]
+
+    >>> dest1, dest2 = tmpdir('sequential'), tmpdir('concurrent')
+    >>> sequential = install(dest1, 1)
+    >>> sequential
+    [('demo', '0.3'), ('other', '1.0'), ('demoneeded', '1.1')]
+    >>> install(dest2, 4) == sequential
+    True
+    >>> sorted(os.listdir(dest1)) == sorted(os.listdir(dest2))
+    True
+
+Index lookups are done one by one, but downloads overlap.  Let's serve
+the links through a server holding each distribution until another one
+is requested, or a few seconds passed:
+
+    >>> import threading
+    >>> try:
+    ...     from http.server import HTTPServer, BaseHTTPRequestHandler
+    ...     from socketserver import ThreadingMixIn
+    ...     from urllib.request import urlopen
+    ...     from urllib.error import HTTPError
+    ... except ImportError:
+    ...     from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    ...     from SocketServer import ThreadingMixIn
+    ...     from urllib2 import urlopen, HTTPError
+    >>> upstream = link_server
+    >>> condition = threading.Condition()
+    >>> downloads = [0, 0] # in progress, maximum
+    >>> class Handler(BaseHTTPRequestHandler):
+    ...     def do_GET(self):
+    ...         try:
+    ...             f = urlopen(upstream + self.path[1:])
+    ...         except HTTPError as e:
+    ...             f = e
+    ...         data = f.read()
+    ...         if self.path.endswith('.egg'):
+    ...             with condition:
+    ...                 downloads[0] += 1
+    ...                 downloads[1] = max(downloads)
+    ...                 condition.notify_all()
+    ...                 if downloads[0] < 2:
+    ...                     condition.wait(5)
+    ...                 downloads[0] -= 1
+    ...         self.send_response(f.code)
+    ...         self.send_header('Content-Length', str(len(data)))
+    ...         self.send_header('Content-Type', f.info()['Content-Type'])
+    ...         self.end_headers()
+    ...         self.wfile.write(data)
+    ...     def log_message(self, *args):
+    ...         pass
+    >>> class Server(ThreadingMixIn, HTTPServer):
+    ...     daemon_threads = True
+    >>> server = Server(('localhost', 0), Handler)
+    >>> thread = threading.Thread(target=server.serve_forever)
+    >>> thread.daemon = True
+    >>> thread.start()
+
+    >>> link_server = 'http://localhost:%s/' % server.server_address[1]
+    >>> install(tmpdir('overlapping'), 4) == sequential
+    True
+    >>> downloads
+    [0, 2]
+    >>> link_server = upstream
+    >>> server.shutdown()
+    >>> server.server_close()
+    """
+
+def index_cache():
+    r"""
+With an index cache, index and find-links pages are kept with their
+links and revalidated with their ETag:
+
+    >>> import zc.buildout.easy_install
+    >>> old_cache = zc.buildout.easy_install.index_cache('cache')
+    >>> def install(dest):
+    ...     zc.buildout.easy_install.clear_index_cache()
+    ...     ws = zc.buildout.easy_install.install(
+    ...         ['demoneeded'], dest, links=[link_server],
+    ...         index=link_server+'index/')
+    ...     return [(dist.project_name, dist.version) for dist in ws]
+    >>> install(tmpdir('dest1'))
+    [('demoneeded', '1.1')]
+
+    >>> _ = get(link_server+'enable_server_logging')
+    GET 200 /enable_server_logging
+    >>> install(tmpdir('dest2'))
+    GET 304 /
+    GET 404 /index/demoneeded/
+    GET 304 /index/
+    GET 200 /demoneeded-1.1.zip
+    [('demoneeded', '1.1')]
+
+Pages are not revalidated for index-cache-ttl seconds:
+
+    >>> old_ttl = zc.buildout.easy_install.index_cache_ttl(3600)
+    >>> install(tmpdir('dest3'))
+    GET 404 /index/demoneeded/
+    GET 200 /demoneeded-1.1.zip
+    [('demoneeded', '1.1')]
+
+    >>> _ = get(link_server+'disable_server_logging')
+    >>> _ = zc.buildout.easy_install.index_cache_ttl(old_ttl)
+    >>> _ = zc.buildout.easy_install.index_cache(old_cache)
+    >>> zc.buildout.easy_install.clear_index_cache()
+    """
+
+def http_connections_per_host():
+    r"""
+With http-connections-per-host, HTTP connections are kept alive and
+reused by downloads and index pages.  Let's count the connections made
+to a server supporting keep-alive:
+
+    >>> import threading
+    >>> try:
+    ...     from http.server import HTTPServer, BaseHTTPRequestHandler
+    ...     from socketserver import ThreadingMixIn
+    ... except ImportError:
+    ...     from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    ...     from SocketServer import ThreadingMixIn
+    >>> connections = []
+    >>> class Handler(BaseHTTPRequestHandler):
+    ...     protocol_version = 'HTTP/1.1'
+    ...     def setup(self):
+    ...         connections.append(self.client_address)
+    ...         BaseHTTPRequestHandler.setup(self)
+    ...     def do_GET(self):
+    ...         out = ('<html><body>%s</body></html>' % self.path).encode()
+    ...         self.send_response(200)
+    ...         self.send_header('Content-Length', str(len(out)))
+    ...         self.send_header('Content-Type', 'text/html')
+    ...         self.end_headers()
+    ...         self.wfile.write(out)
+    ...     def log_message(self, *args):
+    ...         pass
+    >>> class Server(ThreadingMixIn, HTTPServer):
+    ...     daemon_threads = True
+    >>> server = Server(('localhost', 0), Handler)
+    >>> thread = threading.Thread(target=server.serve_forever)
+    >>> thread.setDaemon(True)
+    >>> thread.start()
+    >>> url = 'http://localhost:%s/' % server.server_address[1]
+
+    >>> import zc.buildout.download, zc.buildout.httpclient
+    >>> download = zc.buildout.download.Download()
+    >>> def fetch(*names):
+    ...     for name in names:
+    ...         path, is_temp = download(url + name)
+    ...         print_(open(path).read())
+    ...         remove(path)
+    >>> fetch('a', 'b')
+    <html><body>/a</body></html>
+    <html><body>/b</body></html>
+    >>> len(connections)
+    2
+
+    >>> del connections[:]
+    >>> zc.buildout.httpclient.connections_per_host(2)
+    0
+    >>> fetch('a', 'b', 'c')
+    <html><body>/a</body></html>
+    <html><body>/b</body></html>
+    <html><body>/c</body></html>
+    >>> len(connections)
+    1
+
+Index pages are fetched through the same connections:
+
+    >>> index = zc.buildout.easy_install.AllowHostsPackageIndex(url)
+    >>> f = index.open_url(url + 'index')
+    >>> print_(f.read().decode())
+    <html><body>/index</body></html>
+    >>> f.close()
+    >>> len(connections)
+    1
+
+At most the given number of connections is opened to a host, requests
+waiting for a connection to be available:
+
+    >>> opened = [zc.buildout.httpclient.urlopen(url + name)
+    ...           for name in 'ab']
+    >>> len(connections)
+    2
+    >>> result = []
+    >>> waiting = threading.Thread(target=lambda: result.append(
+    ...     zc.buildout.httpclient.urlopen(url + 'c').read().decode()))
+    >>> waiting.start()
+    >>> waiting.join(.5)
+    >>> result
+    []
+    >>> for f in opened:
+    ...     print_(f.read().decode())
+    <html><body>/a</body></html>
+    <html><body>/b</body></html>
+    >>> waiting.join()
+    >>> print_(result[0], len(connections))
+    <html><body>/c</body></html> 2
+
+    >>> zc.buildout.httpclient.connections_per_host(0)
+    2
+    >>> server.shutdown()
+    >>> server.server_close()
+    """
+
+def egg_store():
+    r"""
+With an egg store, egg archives are unpacked once in the store, in a
+directory named after the archive and its digest, and their files are
+shared with the eggs directories, by cloning or hard-linking them:
+
+    >>> import zc.buildout.easy_install
+    >>> old_store = zc.buildout.easy_install.egg_store(
+    ...     os.path.join(tmpdir('eggstore'), 'store'))
+    >>> store = zc.buildout.easy_install.egg_store()
+    >>> def install(dest):
+    ...     ws = zc.buildout.easy_install.install(
+    ...         ['demo==0.2'], dest, links=[link_server],
+    ...         index=link_server+'index/')
+    ...     return [(dist.project_name, dist.version) for dist in ws]
+    >>> dest1 = tmpdir('dest1')
+    >>> install(dest1)
+    [('demo', '0.2'), ('demoneeded', '1.1')]
+    >>> install(tmpdir('dest2'))
+    [('demo', '0.2'), ('demoneeded', '1.1')]
+    >>> ls(store) # doctest: +ELLIPSIS
+    d  demo-0.2-py...egg-...
+
+    >>> [entry] = os.listdir(store)
+    >>> [egg] = os.listdir(join(store, entry))
+    >>> ls(dest1, egg)
+    d  EGG-INFO
+    -  eggrecipedemo.py
+    >>> def read(*path):
+    ...     with open(join(*path)) as f:
+    ...         return f.read()
+    >>> (read(dest1, egg, 'eggrecipedemo.py') ==
+    ...  read(store, entry, egg, 'eggrecipedemo.py'))
+    True
+
+    >>> _ = zc.buildout.easy_install.egg_store(old_store)
+    """
+
+def dist_index_cache():
+    r"""
+With a distribution index cache, the eggs found in a directory are
+remembered as long as its modification time doesn't change:
+
+    >>> import zc.buildout.easy_install
+    >>> old_cache = zc.buildout.easy_install.dist_index_cache(
+    ...     os.path.join(tmpdir('distindex'), 'cache'))
+    >>> cache = zc.buildout.easy_install.dist_index_cache()
+    >>> dest = tmpdir('dest')
+    >>> ws = zc.buildout.easy_install.install(
+    ...     ['demo==0.2'], dest, links=[link_server],
+    ...     index=link_server+'index/')
+
+Recently modified directories aren't indexed, since they may be modified
+again without their modification time changing:
+
+    >>> os.path.exists(cache)
+    False
+    >>> import time
+    >>> mtime = time.time() - 10
+    >>> os.utime(dest, (mtime, mtime))
+    >>> zc.buildout.easy_install._dist_indexes.clear()
+    >>> env = zc.buildout.easy_install.Installer(dest)._env
+    >>> len(os.listdir(cache))
+    1
+    >>> [(dist.project_name, dist.version) for dist in env['demo']]
+    [('demo', '0.2')]
+
+The index is then used, also by new processes:
+
+    >>> zc.buildout.easy_install._dist_indexes.clear()
+    >>> find_distributions = pkg_resources.find_distributions
+    >>> def no_scan(path, only=False):
+    ...     assert path != dest, path
+    ...     return find_distributions(path, only)
+    >>> pkg_resources.find_distributions = no_scan
+    >>> installer = zc.buildout.easy_install.Installer(dest, newest=False)
+    >>> pkg_resources.find_distributions = find_distributions
+    >>> dist, _ = installer._satisfied(
+    ...     pkg_resources.Requirement.parse('demo'))
+    >>> dist.project_name, dist.version, dist.location == join(
+    ...     dest, os.path.basename(dist.location))
+    ('demo', '0.2', True)
+    >>> [str(req) for req in dist.requires()]
+    ['demoneeded']
+
+When the directory is modified, it is scanned again:
+
+    >>> remove(dest, os.path.basename(dist.location))
+    >>> os.utime(dest, (mtime + 1, mtime + 1))
+    >>> env = zc.buildout.easy_install.Installer(dest)._env
+    >>> env['demo'], len(env['demoneeded'])
+    ([], 1)
+
+Directories with develop egg links aren't indexed, because the
+metadata of develop eggs are outside of them:
+
+    >>> develop = tmpdir('develop')
+    >>> foo = tmpdir('foo')
+    >>> mkdir(foo, 'foo.egg-info')
+    >>> write(foo, 'foo.egg-info', 'PKG-INFO', 'Name: foo\\nVersion: 1\\n')
+    >>> write(develop, 'foo.egg-link', foo)
+    >>> os.utime(develop, (mtime, mtime))
+    >>> print_(zc.buildout.easy_install._indexed_distributions(
+    ...     cache, develop))
+    None
+
+    >>> _ = zc.buildout.easy_install.dist_index_cache(old_cache)
+    """
+
+def resolution_cache():
+    r"""
+With a resolution cache, working sets resolved from pinned versions are
+kept, so that resolving the same requirements again is a lookup:
+
+    >>> import time
+    >>> import zc.buildout.easy_install
+    >>> old_cache = zc.buildout.easy_install.resolution_cache(
+    ...     os.path.join(tmpdir('resolutions'), 'cache'))
+    >>> cache = zc.buildout.easy_install.resolution_cache()
+    >>> dest = tmpdir('dest')
+    >>> def install(**versions):
+    ...     ws = zc.buildout.easy_install.install(
+    ...         ['demo'], dest, links=[link_server],
+    ...         index=link_server+'index/', versions=versions)
+    ...     return [(dist.project_name, dist.version) for dist in ws]
+    >>> install(demo='0.2', demoneeded='1.1')
+    [('demo', '0.2'), ('demoneeded', '1.1')]
+
+Nothing is kept while the eggs directory was just modified:
+
+    >>> os.path.exists(cache)
+    False
+    >>> mtime = time.time() - 10
+    >>> os.utime(dest, (mtime, mtime))
+    >>> install(demo='0.2', demoneeded='1.1')
+    [('demo', '0.2'), ('demoneeded', '1.1')]
+    >>> len(os.listdir(cache))
+    1
+
+    >>> zc.buildout.easy_install._resolutions.clear()
+    >>> _install = zc.buildout.easy_install.Installer._install
+    >>> def no_install(*args):
+    ...     raise AssertionError('resolved')
+    >>> zc.buildout.easy_install.Installer._install = no_install
+    >>> install(demo='0.2', demoneeded='1.1')
+    [('demo', '0.2'), ('demoneeded', '1.1')]
+
+Other versions, or a modified eggs directory, lead to a new resolution:
+
+    >>> install(demo='0.2', demoneeded='1.0')
+    Traceback (most recent call last):
+    ...
+    AssertionError: resolved
+    >>> os.utime(dest, (mtime + 1, mtime + 1))
+    >>> install(demo='0.2', demoneeded='1.1')
+    Traceback (most recent call last):
+    ...
+    AssertionError: resolved
+    >>> zc.buildout.easy_install.Installer._install = _install
+
+Resolutions of versions that aren't all pinned are not kept:
+
+    >>> install(demo='0.2', demoneeded='1.1')
+    [('demo', '0.2'), ('demoneeded', '1.1')]
+    >>> len(os.listdir(cache))
+    2
+    >>> install(demo='0.2')
+    [('demo', '0.2'), ('demoneeded', '1.1')]
+    >>> len(os.listdir(cache))
+    2
+
+    >>> _ = zc.buildout.easy_install.resolution_cache(old_cache)
+    """
+
+def download_cache_size():
+    r"""
+Files found in the download cache are marked as used by setting their
+access time.  The cache-gc command removes the least recently used
+files until the caches fit in the given size, keeping the ones used in
+the last hour:
+
+    >>> import time
+    >>> mkdir('cache')
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ... download-cache = cache
+    ... ''')
+    >>> now = time.time()
+    >>> for name, age in ('a', 3), ('b', 2), ('c', 0):
+    ...     write('cache', name, 'x' * 400)
+    ...     os.utime(join('cache', name), (now - age * 3600, now - 5 * 3600))
+    >>> write('cache', 'd.part', 'x' * 100)
+    >>> write('cache', 'd.part.info', '"etag"')
+    >>> os.utime(join('cache', 'd.part'), (now - 7200, now - 7200))
+
+    >>> import zc.buildout.download
+    >>> download = zc.buildout.download.Download(
+    ...     dict(directory=sample_buildout, **{'download-cache': 'cache'}),
+    ...     namespace='')
+    >>> _ = download.download_cached('http://example.com/a')
+    >>> print_(system(buildout + ' cache-gc 1K'), end='')
+    Removed 3 files (506 bytes) from caches.
+    >>> ls('cache')
+    -  .buildout-gc.lock
+    -  a
+    -  c
+    d  dist
+
+Without a size, only partial downloads and unreferenced files are
+removed.  With the download-cache-size option, the caches are collected
+at the end of runs, unless they were collected in the last hour:
+
+    >>> os.utime(join('cache', 'a'), (now - 7200, now - 7200))
+    >>> print_(system(buildout + ' cache-gc'), end='')
+    >>> os.utime(join('cache', '.buildout-gc.lock'), (now - 7200, now - 7200))
+    >>> write('buildout.cfg',
+    ... '''
+    ... [buildout]
+    ... parts =
+    ... download-cache = cache
+    ... download-cache-size = 500
+    ... ''')
+    >>> print_(system(buildout), end='')
+    Removed 1 files (400 bytes) from caches.
+    >>> ls('cache')
+    -  .buildout-gc.lock
+    -  c
+    d  dist
+
+    >>> os.utime(join('cache', 'c'), (now - 7200, now - 7200))
+    >>> print_(system(buildout + ' buildout:download-cache-size=0'), end='')
+    >>> ls('cache')
+    -  .buildout-gc.lock
+    -  c
+    d  dist
+
+    >>> print_(system(buildout + ' buildout:download-cache-size=1X'), end='')
+    While:
+      Initializing.
+    Error: Invalid download-cache-size 1X
+    """
+
 def error_building_in_offline_mode_if_dont_have_needed_dist():
     r"""
     >>> zc.buildout.easy_install.build(
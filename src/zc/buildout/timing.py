@@ -0,0 +1,132 @@
+##############################################################################
+#
+# Copyright (c) 2006 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Timing of the phases of a buildout run
+
+Recording is enabled by the ``--profile-run`` command-line option.
+Phases are recorded as complete events of the trace event format, so
+that the report can be loaded in trace viewers such as chrome://tracing.
+Besides wall time, events have the CPU time used by the process and by
+its waited-for subprocesses while they ran.  Since the CPU time is the
+one of the whole process, it also includes the one of other threads.
+"""
+
+import json
+import os
+import threading
+import time
+
+_events = None
+_origin = None
+
+def start():
+    """Start recording events, forgetting previous ones
+    """
+    global _events, _origin
+    _events = []
+    _origin = time.time()
+
+def recording():
+    return _events is not None
+
+def _cpu():
+    times = os.times()
+    return times[0] + times[1], times[2] + times[3]
+
+class phase(object):
+    """Context manager recording the time spent in a phase
+
+    Nothing is done if recording isn't enabled.
+    """
+
+    def __init__(self, name, category='buildout', **args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        if _events is not None:
+            self.start = time.time()
+            self.cpu = _cpu()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if _events is not None and hasattr(self, 'start'):
+            cpu, children = _cpu()
+            args = dict(self.args, cpu=cpu - self.cpu[0],
+                        children_cpu=children - self.cpu[1])
+            if exc_type is not None:
+                args['error'] = exc_type.__name__
+            record(self.name, self.category, self.start,
+                   time.time() - self.start, **args)
+
+def record(name, category, start, duration, **args):
+    """Record a phase that started at the given time
+    """
+    if _events is not None:
+        _events.append(dict(
+            name=name, cat=category, ph='X',
+            ts=int((start - _origin) * 1e6), dur=int(duration * 1e6),
+            pid=os.getpid(), tid=threading.current_thread().ident,
+            args=args))
+
+def mark():
+    """Return a marker for events(), e.g. before forking
+    """
+    return len(_events) if _events is not None else 0
+
+def events(marker=0):
+    """Return the events recorded since marker
+    """
+    return _events[marker:] if _events is not None else []
+
+def extend(events):
+    """Add events recorded by another process
+    """
+    if _events is not None:
+        _events.extend(events)
+
+def summary():
+    """Return the total time and number of events by category and name
+
+    Times include the ones of nested phases.
+    """
+    result = {}
+    for event in _events or ():
+        key = event['cat'], event['name']
+        total = result.get(key)
+        if total is None:
+            total = result[key] = dict(
+                category=event['cat'], name=event['name'],
+                count=0, wall=0.0, cpu=0.0, children_cpu=0.0)
+        total['count'] += 1
+        total['wall'] += event['dur'] / 1e6
+        total['cpu'] += event['args'].get('cpu', 0.0)
+        total['children_cpu'] += event['args'].get('children_cpu', 0.0)
+    return sorted(result.values(), key=lambda total: -total['wall'])
+
+def stop(path):
+    """Stop recording and write the report to path
+    """
+    global _events
+    report = dict(traceEvents=_events or [], displayTimeUnit='ms',
+                  phases=summary())
+    _events = None
+    tmp = path + '.tmp'
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+        os.rename(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)